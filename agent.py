@@ -1,140 +1,745 @@
-# agent.py
-from langchain_openai import ChatOpenAI
-from langgraph_supervisor import create_supervisor
-from langgraph.prebuilt import create_react_agent
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime
+import asyncio
+import os
+import sqlite3
+import threading
+import uuid
 
-class Agent:
-    def __init__(self, model_name="gpt-4.1", user_role=None):
-        """Initialize the agent with OpenAI API key and model name."""
-        self.model = ChatOpenAI(model=model_name)
-        self.user_role = user_role
-        self.graph = None
-        self._initialize_workflow()
-        
-    def _initialize_workflow(self):
-        """Initialize the student, professor, and administrative agents and create the supervisor workflow."""
-        # Import tools here to avoid circular imports
-        from tools import subir_tema_siu, crear_recordatorio_evento, gestionar_archivo_materia, enviar_recordatorio_horas_siu, consultar_faltas, gestionar_recordatorio_examen, procesar_redencion_gastos, crear_post_linkedin
-        
-        # Get current date
+# Only the standard library is imported here: langchain, langgraph and the modules of the tools,
+# caches and tracing are imported when the first graph is built or the first turn runs, so
+# importing this module (e.g. from server.py, or chat.py before the login) stays fast.
+
+# Compiled graphs shared by every session of the process, keyed by (model_name, user_role, scope, parallel, router, tiers)
+_graph_cache = {}
+_graph_cache_lock = threading.Lock()
+
+# Checkpointer shared by the cached graphs, conversations are told apart by thread id
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+AGENT_SCOPES = ("full", "role", "single")
+
+# Subagent that serves each role selected at login
+ROLE_AGENTS = {
+    "alumno": "student_agent",
+    "profesor": "professor_agent",
+    "administrativo": "administrative_agent"
+}
+
+ROLE_NAMES = {
+    "alumno": "student",
+    "profesor": "professor", 
+    "administrativo": "administrative staff"
+}
+
+AGENT_DESCRIPTIONS = {
+    "student_agent": "a student agent",
+    "professor_agent": "a professor agent",
+    "administrative_agent": "an administrative agent"
+}
+
+AGENT_ROUTING = {
+    "student_agent": "For student-related tasks, use student_agent. ",
+    "professor_agent": "For professor-related tasks, use professor_agent. ",
+    "administrative_agent": "For administrative staff tasks, use administrative_agent. "
+}
+
+# Define tool capabilities for each agent
+AGENT_TOOLS_INFO = {
+    "student_agent": ("STUDENT AGENT TOOLS", """
+        - consultar_faltas: Check how many absences a student has in their courses and if they risk failing due to attendance
+        - gestionar_recordatorio_examen: Send exam reminders or check exam dates for courses"""),
+    "professor_agent": ("PROFESSOR AGENT TOOLS", """
+        - subir_tema_siu: Upload class topics to SIU system (validates against syllabus - NO NEED TO ASK FOR THE TOPIC)
+        - crear_recordatorio_evento: Create academic event reminders for students in AI and Big Data courses
+        - gestionar_archivo_materia: Manage course files (upload, hide, show, or delete files in virtual campus)"""),
+    "administrative_agent": ("ADMINISTRATIVE AGENT TOOLS", """
+        - enviar_recordatorio_horas_siu: Send reminders to professors who haven't logged their teaching hours
+        - procesar_redencion_gastos: Process expense reimbursements (automatically classifies as reimbursable or non-reimbursable)
+        - crear_post_linkedin: Create and publish professional content on LinkedIn using AI""")
+}
+
+
+# Listed with the tools of an agent that has background tools, when background jobs are on
+JOB_STATUS_TOOL_INFO = """
+        - consultar_estado_tarea: Check whether a queued task (reminder, email, post) finished, with the job id returned when it was queued"""
+
+# Tool usage rule of the prompts, in the serial and in the parallel execution mode
+SERIAL_TOOL_RULE = "Always use one tool at a time and only when necessary."
+PARALLEL_TOOL_RULE = (
+    "Use tools only when necessary. When a request needs several independent tool calls, for example "
+    "the absences of several courses and an exam date, make all of them in the same turn instead of one at a time."
+)
+
+
+def _tool_rule(prompt, parallel):
+    """Swap the one-tool-at-a-time rule of a prompt for the parallel one when fan-out is enabled."""
+    return prompt.replace(SERIAL_TOOL_RULE, PARALLEL_TOOL_RULE) if parallel else prompt
+
+
+def _with_context(prompt, context=""):
+    """
+    Build a prompt callable that appends the per-user context and today's date to a static prompt.
+
+    Providers cache prompts by prefix, so everything that varies by role or by day goes after
+    the static instructions and tool catalog, which stay byte-identical across calls. The date
+    is resolved on every call instead of when the graph is built, so cached graphs keep giving
+    the right date after midnight.
+
+    Args:
+        prompt: Static system prompt
+        context: Dynamic part that depends on the user, e.g. the role selected at login
+
+    Returns:
+        Function that maps the agent state to the messages sent to the model
+    """
+    from langchain_core.messages import SystemMessage
+
+    def build_messages(state):
         current_date = datetime.now().strftime("%Y-%m-%d")
-        
-        # Create student agent
-        student_agent = create_react_agent(
-            model=self.model,
-            tools=[consultar_faltas, gestionar_recordatorio_examen],
-            name="student_agent",
-            prompt=
-            f"""
+        return [SystemMessage(content=f"{prompt}\n{context}Today's date is {current_date}.")] + state["messages"]
+    return build_messages
+
+
+def _subagent_specs():
+    """Return the tools and prompt of each subagent, keyed by subagent name."""
+    # Import tools here to avoid circular imports
+    from jobs import consultar_estado_tarea, has_background_tools
+    from tools import subir_tema_siu, crear_recordatorio_evento, gestionar_archivo_materia, enviar_recordatorio_horas_siu, consultar_faltas, gestionar_recordatorio_examen, procesar_redencion_gastos, crear_post_linkedin
+
+    specs = {
+        "student_agent": {
+            "tools": [consultar_faltas, gestionar_recordatorio_examen],
+            "prompt": """
             You are a student agent responsible for helping students with academic tasks. You have access to tools that can help students submit assignments and manage their academic records. 
             Always use one tool at a time and only when necessary.
             Do not answer back to the student, you report back to the supervisor agent so tha he can answer back to the student.
-            Today's date is {current_date}.
             """
-        )
-        
-        # Create professor agent
-        professor_agent = create_react_agent(
-            model=self.model,
-            tools=[crear_recordatorio_evento, subir_tema_siu, gestionar_archivo_materia],
-            name="professor_agent",
-            prompt=
-            f"""
+        },
+        "professor_agent": {
+            "tools": [crear_recordatorio_evento, subir_tema_siu, gestionar_archivo_materia],
+            "prompt": """
             You are a professor agent responsible for helping professors with academic management. You have access to tools that can create academic event reminders and manage course information. 
             Always use one tool at a time and only when necessary. The SIU is the name for the learning management system of the university.
             Do not answer back to the professor, you report back to the supervisor agent so tha he can answer back to the professor.
-            Today's date is {current_date}.
             """
-        )
-        
-        # Create administrative agent
-        administrative_agent = create_react_agent(
-            model=self.model,
-            tools=[enviar_recordatorio_horas_siu, procesar_redencion_gastos, crear_post_linkedin],
-            name="administrative_agent",
-            prompt=
-            f"""
+        },
+        "administrative_agent": {
+            "tools": [enviar_recordatorio_horas_siu, procesar_redencion_gastos, crear_post_linkedin],
+            "prompt": """
             You are an administrative agent responsible for helping administrative staff with university management tasks. You have access to tools that can help with administrative procedures. 
             Always use one tool at a time and only when necessary.
             Do not answer back to the administrative staff, you report back to the supervisor agent so tha he can answer back to the administrative staff.
-            Today's date is {current_date}.
             """
+        }
+    }
+    # Agents whose tools are queued as background jobs can check on them later
+    for spec in specs.values():
+        if has_background_tools(spec["tools"]):
+            spec["tools"].append(consultar_estado_tarea)
+            spec["prompt"] += "When a tool answers that a task was queued, report its job id so its status can be checked later.\n"
+    return specs
+
+
+def _agent_tools_info(agent_name):
+    """Describe the tools of a subagent, with the job status tool when it has background tools."""
+    from jobs import consultar_estado_tarea
+
+    info = AGENT_TOOLS_INFO[agent_name][1]
+    if consultar_estado_tarea in _subagent_specs()[agent_name]["tools"]:
+        info += JOB_STATUS_TOOL_INFO
+    return info
+
+
+def _role_info(user_role):
+    """Describe the role the user selected at login, for the supervisor prompt."""
+    if not user_role:
+        return ""
+    role_in_english = ROLE_NAMES.get(user_role, user_role)
+    return f"The user has identified themselves as: {user_role} ({role_in_english}). "
+
+
+def _tools_info(agent_names):
+    """Describe the tools of the given subagents, for the supervisor prompt."""
+    sections = "\n".join(
+        f"        {AGENT_TOOLS_INFO[name][0]}:{_agent_tools_info(name)}\n"
+        for name in agent_names
+    )
+    return (
+        "\n        IMPORTANT: Here are the specific tools each subagent has access to:\n\n"
+        f"{sections}\n"
+        "        When a user asks what you can help with, explain the relevant capabilities based on their role.\n        "
+    )
+
+
+def _is_answer_token(chunk, metadata):
+    """Check whether a streamed message chunk is part of the answer to the user."""
+    from langchain_core.messages import AIMessage
+
+    if not isinstance(chunk, AIMessage) or not isinstance(chunk.content, str) or not chunk.content:
+        return False
+    if chunk.tool_calls or getattr(chunk, "tool_call_chunks", None):
+        return False
+    if chunk.name and chunk.name != "supervisor":
+        return False
+    # The answer comes from the model node of the supervisor, or of the agent in the single agent scope
+    namespace = metadata.get("langgraph_checkpoint_ns", "")
+    return metadata.get("langgraph_node") == "agent" and namespace.split(":")[0] in ("supervisor", "agent")
+
+
+def create_checkpointer(backend=None, path=None):
+    """
+    Create the checkpointer that stores the conversation state of each thread.
+
+    Args:
+        backend: "memory" or "sqlite" (env AGENT_CHECKPOINTER, default "memory")
+        path: SQLite database file for the "sqlite" backend (env AGENT_CHECKPOINT_DB, default "checkpoints.sqlite")
+
+    Returns:
+        The checkpointer. The memory backend keeps at most AGENT_CHECKPOINT_MAX_THREADS threads
+        (default 1000) and drops the ones idle for AGENT_CHECKPOINT_TTL seconds (default 0, no
+        limit). The SQLite backend only supports the sync invoke path.
+    """
+    backend = backend or os.getenv("AGENT_CHECKPOINTER", "memory")
+    if backend == "memory":
+        from checkpoints import BoundedMemorySaver
+        return BoundedMemorySaver(
+            max_threads=int(os.getenv("AGENT_CHECKPOINT_MAX_THREADS", "1000")),
+            ttl=float(os.getenv("AGENT_CHECKPOINT_TTL", "0"))
         )
+    if backend == "sqlite":
+        try:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+        except ImportError as e:
+            raise ImportError("The sqlite checkpointer requires the langgraph-checkpoint-sqlite package") from e
+        path = path or os.getenv("AGENT_CHECKPOINT_DB", "checkpoints.sqlite")
+        saver = SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+        saver.setup()
+        return saver
+    raise ValueError(f"Unknown checkpointer backend '{backend}', expected 'memory' or 'sqlite'")
 
-        # Create supervisor workflow
-        role_info = ""
-        if self.user_role:
-            role_mapping = {
-                "alumno": "student",
-                "profesor": "professor", 
-                "administrativo": "administrative staff"
-            }
-            role_in_english = role_mapping.get(self.user_role, self.user_role)
-            role_info = f"The user has identified themselves as: {self.user_role} ({role_in_english}). "
-        
-        # Define tool capabilities for each agent
-        tools_info = """
-        IMPORTANT: Here are the specific tools each subagent has access to:
-        
-        STUDENT AGENT TOOLS:
-        - consultar_faltas: Check how many absences a student has in their courses and if they risk failing due to attendance
-        - gestionar_recordatorio_examen: Send exam reminders or check exam dates for courses
-        
-        PROFESSOR AGENT TOOLS:
-        - subir_tema_siu: Upload class topics to SIU system (validates against syllabus - NO NEED TO ASK FOR THE TOPIC)
-        - crear_recordatorio_evento: Create academic event reminders for students in AI and Big Data courses
-        - gestionar_archivo_materia: Manage course files (upload, hide, show, or delete files in virtual campus)
-        
-        ADMINISTRATIVE AGENT TOOLS:
-        - enviar_recordatorio_horas_siu: Send reminders to professors who haven't logged their teaching hours
-        - procesar_redencion_gastos: Process expense reimbursements (automatically classifies as reimbursable or non-reimbursable)
-        - crear_post_linkedin: Create and publish professional content on LinkedIn using AI
-        
-        When a user asks what you can help with, explain the relevant capabilities based on their role.
-        """
-        
-        workflow = create_supervisor(
-            [student_agent, professor_agent, administrative_agent],
-            model=self.model,
-            output_mode="last_message",
-            prompt=(
-                f"You are a team supervisor managing a student agent, professor agent, and administrative agent. "
-                f"{role_info}"
-                f"{tools_info}\n"
-                "For student-related tasks, use student_agent. "
-                "For professor-related tasks, use professor_agent. "
-                "For administrative staff tasks, use administrative_agent. "
-                "The subagents are in charge of using their tools if applicable, confirming whether the tool call was successful or not, and then their turn ends. "
-                "After a subagent completes its task, you should respond to the user with the appropriate information. "
-                + ("" if self.user_role else "If the user's role (student, professor, or administrative staff) is not clear from their message, you must first ask them to specify their role before proceeding with any task. "
-                "For example, you could say: 'Para poder ayudarte mejor, ¿podrías indicarme si eres estudiante, profesor o personal administrativo?' ") +
-                "Do not mention other agents, neither any delegation of tasks, to the final user. You are the supervisor, you will be the one to answer back to the student, professor, and administrative staff. "
-                "When users ask how you can help or what you can do, explain the specific capabilities available for their role based on the tools information above. "
-                f"Today's date is {current_date}."
-            )
+
+def get_checkpointer():
+    """Return the process-wide checkpointer, creating it on first use."""
+    global _checkpointer
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                _checkpointer = create_checkpointer()
+    return _checkpointer
+
+
+def _build_single_agent(model, user_role, checkpointer, history_hook, parallel, models):
+    """Build one ReAct agent with the tools of the user's role that answers the user directly."""
+    from langgraph.prebuilt import create_react_agent
+    from history import HistoryState
+    from parallel import create_tool_node
+    from tiers import ROUTING, tiered
+
+    agent_name = ROLE_AGENTS[user_role]
+    spec = _subagent_specs()[agent_name]
+    return create_react_agent(
+        model=tiered(ROUTING, models, model, answers=True, tools=spec["tools"]),
+        tools=create_tool_node(spec["tools"]),
+        # Named like the supervisor so callers keep finding the answer by message name
+        name="supervisor",
+        prompt=_with_context(_tool_rule(
+            "You are the assistant of Universidad Austral. "
+            f"\n        IMPORTANT: Here are the specific tools you have access to:\n{_agent_tools_info(agent_name)}\n\n"
+            f"{SERIAL_TOOL_RULE} The SIU is the name for the learning management system of the university. "
+            "After using a tool, confirm whether the tool call was successful or not and respond to the user with the appropriate information. "
+            "When users ask how you can help or what you can do, explain the specific capabilities available based on the tools information above. ",
+            parallel
+        ), _role_info(user_role)),
+        pre_model_hook=history_hook,
+        state_schema=HistoryState,
+        checkpointer=checkpointer
+    )
+
+
+def _with_router(workflow, route, agent_names):
+    """
+    Rebuild a supervisor workflow with the router as its entry point.
+
+    create_supervisor always enters through the supervisor, so its nodes and edges are copied
+    into a new graph of the same state schema that enters through the router instead, which
+    goes to a subagent or falls back to the supervisor.
+    """
+    from langgraph.graph import START, StateGraph
+
+    graph = StateGraph(workflow.state_schema, context_schema=workflow.context_schema)
+    for name, spec in workflow.nodes.items():
+        graph.add_node(name, spec.runnable, metadata=spec.metadata, input_schema=spec.input_schema,
+                       destinations=spec.ends)
+    for start, end in workflow.edges:
+        if start != START:
+            graph.add_edge(start, end)
+    graph.add_node("router", route, destinations=(*agent_names, "supervisor"))
+    graph.set_entry_point("router")
+    return graph
+
+
+def build_graph(model, user_role=None, scope="full", checkpointer=None, history_turns=None, parallel=None,
+                router=None, models=None):
+    """
+    Create the student, professor, and administrative agents and compile the supervisor workflow.
+
+    Args:
+        model: Chat model used by the supervisor and the subagents
+        user_role: Role selected by the user ("alumno", "profesor" or "administrativo"), if known
+        scope: Which agents to load once the role is known:
+            - "full": supervisor with the three subagents
+            - "role": supervisor with only the subagent of the user's role
+            - "single": a single ReAct agent with the role's tools, without a supervisor hop
+            Without a known role the full graph is always built.
+        checkpointer: Checkpointer that keeps the state of each conversation thread
+        history_turns: Turns sent verbatim to the supervisor, older ones are summarized.
+            See history.create_history_hook.
+        parallel: Let the supervisor delegate independent tasks to several subagents at once and
+            the agents make independent tool calls in the same turn, run concurrently by the
+            tool scheduler (env AGENT_PARALLEL_TOOLS, default off). Serial tools keep running
+            one at a time in either mode.
+        router: Put the keyword pre-router in front of the supervisor, so that messages it
+            classifies with confidence go straight to their subagent without the supervisor's
+            routing call (env AGENT_ROUTER, default off). See router.create_router_node.
+        models: Chat model per node, overriding `model`: "routing" for the supervisor's routing
+            calls, "answer" for its answers after a subagent reported back, and each subagent
+            name for its tool calls. A node whose model differs from the answer model escalates
+            invalid tool calls to it. See tiers.TieredModel.
+
+    Returns:
+        The compiled graph
+    """
+    from langgraph.prebuilt import create_react_agent
+    from langgraph_supervisor import create_supervisor
+    from history import HistoryState, create_handoff_node, create_history_hook
+    from parallel import create_tool_node, parallel_tools_enabled
+    from router import create_router_node, router_enabled
+    from tiers import ROUTING, tiered
+
+    if scope not in AGENT_SCOPES:
+        raise ValueError(f"Unknown agent scope '{scope}', expected one of {AGENT_SCOPES}")
+    if user_role not in ROLE_AGENTS:
+        scope = "full"
+
+    if parallel is None:
+        parallel = parallel_tools_enabled()
+    if router is None:
+        router = router_enabled()
+    models = models or {}
+    # Summarizing old turns is a routine task, it goes to the routing model
+    history_hook = create_history_hook(models.get(ROUTING, model), history_turns)
+
+    if scope == "single":
+        return _build_single_agent(model, user_role, checkpointer, history_hook, parallel, models)
+
+    agent_names = list(AGENT_TOOLS_INFO) if scope == "full" else [ROLE_AGENTS[user_role]]
+    specs = _subagent_specs()
+
+    # Create the subagents
+    subagents = [
+        create_react_agent(
+            model=tiered(name, models, model, tools=specs[name]["tools"]),
+            tools=create_tool_node(specs[name]["tools"]),
+            name=name,
+            prompt=_with_context(_tool_rule(specs[name]["prompt"], parallel))
+        )
+        for name in agent_names
+    ]
+
+    # Create supervisor workflow
+    if scope == "full":
+        team = "You are a team supervisor managing a student agent, professor agent, and administrative agent. "
+    else:
+        team = f"You are a team supervisor managing {AGENT_DESCRIPTIONS[agent_names[0]]}. "
+    routing = "".join(AGENT_ROUTING[name] for name in agent_names)
+    if parallel and len(agent_names) > 1:
+        routing += "When a request has independent parts for different agents, delegate all of them in the same turn. "
+
+    workflow = create_supervisor(
+        subagents,
+        model=tiered(ROUTING, models, model, answers=True, parallel_tool_calls=parallel),
+        tools=create_handoff_node(agent_names),
+        output_mode="last_message",
+        parallel_tool_calls=parallel,
+        pre_model_hook=history_hook,
+        state_schema=HistoryState,
+        prompt=_with_context(
+            team
+            + _tools_info(agent_names) + "\n"
+            + routing
+            + "The subagents are in charge of using their tools if applicable, confirming whether the tool call was successful or not, and then their turn ends. "
+            "After a subagent completes its task, you should respond to the user with the appropriate information. "
+            "Do not mention other agents, neither any delegation of tasks, to the final user. You are the supervisor, you will be the one to answer back to the student, professor, and administrative staff. "
+            "When users ask how you can help or what you can do, explain the specific capabilities available for their role based on the tools information above. ",
+            # The role comes last, so the prompt of the full graph has the same prefix for every role
+            _role_info(user_role)
+            + ("" if user_role else "If the user's role (student, professor, or administrative staff) is not clear from their message, you must first ask them to specify their role before proceeding with any task. "
+            "For example, you could say: 'Para poder ayudarte mejor, ¿podrías indicarme si eres estudiante, profesor o personal administrativo?' ")
         )
+    )
+    
+    if router:
+        workflow = _with_router(workflow, create_router_node(agent_names, user_role), agent_names)
+
+    # Compile workflow
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def get_compiled_graph(model_name="gpt-4.1", user_role=None, scope="full", parallel=None, router=None, tiers=None):
+    """
+    Return the compiled graph for a model, role and scope, building it only the first time.
+
+    Args:
+        model_name: OpenAI model name
+        user_role: Role selected by the user, if known
+        scope: Agent scope, see build_graph
+        parallel: Parallel tool execution, see build_graph
+        router: Keyword pre-router, see build_graph
+        tiers: Use a smaller model for routing and tool calls, and `model_name` for the answers
+            (env AGENT_MODEL_TIERS, default off). See tiers.node_model_names.
+
+    Returns:
+        The compiled graph, shared across sessions
+    """
+    from parallel import parallel_tools_enabled
+    from router import router_enabled
+    from tiers import model_tiers_enabled, node_model_names
+
+    if parallel is None:
+        parallel = parallel_tools_enabled()
+    if router is None:
+        router = router_enabled()
+    if tiers is None:
+        tiers = model_tiers_enabled()
+    key = (model_name, user_role, scope, parallel, router, tiers)
+    graph = _graph_cache.get(key)
+    if graph is None:
+        with _graph_cache_lock:
+            graph = _graph_cache.get(key)
+            if graph is None:
+                from langchain_openai import ChatOpenAI
+                from ratelimit import model_rate_limits
+                node_models = node_model_names(model_name, AGENT_TOOLS_INFO) if tiers else {}
+                # One client per model name, shared by the nodes that use it
+                clients = {}
+                for name in (model_name, *node_models.values()):
+                    if name not in clients:
+                        clients[name] = ChatOpenAI(model=name, **model_rate_limits(name))
+                models = {node: clients[name] for node, name in node_models.items()}
+                graph = build_graph(clients[model_name], user_role, scope, get_checkpointer(),
+                                    parallel=parallel, router=router, models=models)
+                _graph_cache[key] = graph
+    return graph
+
+
+def prewarm_graphs(model_name="gpt-4.1", scope="full", roles=None):
+    """
+    Compile the graphs of the given roles ahead of their first session.
+
+    Meant to run in a background thread after startup, so the first login of each role finds
+    its graph, the tools and the model client already loaded.
+
+    Args:
+        model_name: OpenAI model name
+        scope: Agent scope, see build_graph
+        roles: Roles to compile, every role by default
+    """
+    for role in roles or ROLE_AGENTS:
+        get_compiled_graph(model_name, role, scope)
+
+
+def clear_graph_cache():
+    """Drop every cached graph, e.g. after changing the tools or prompts."""
+    with _graph_cache_lock:
+        _graph_cache.clear()
+
+
+class Agent:
+    def __init__(self, model_name="gpt-4.1", user_role=None, model=None, scope="full", parallel=None, router=None,
+                 models=None, tiers=None):
+        """
+        Initialize the agent for a model name and user role.
+
+        Agents created with a model name share the process-wide compiled graph for that
+        (model_name, user_role, scope). Passing an already built chat model compiles a
+        private graph instead, with `models` overriding it per node. See build_graph for the
+        available scopes, the parallel mode, the pre-router and the per-node models, and
+        get_compiled_graph for the model tiers of the shared graphs.
+
+        Conversation state lives in the checkpointer, keyed by thread id, so each turn
+        only needs to send the new messages.
+        """
+        self.model_name = model_name
+        self.model = model
+        self.user_role = user_role
+        self.scope = scope
+        self.parallel = parallel
+        self.router = router
+        self.models = models
+        self.tiers = tiers
+        self.graph = None
+        self._initialize_workflow()
         
-        # Compile workflow
-        self.graph = workflow.compile()
+    def _initialize_workflow(self):
+        """Get the supervisor workflow for this agent, from the process-wide cache when possible."""
+        if self.model is not None:
+            self.graph = build_graph(self.model, self.user_role, self.scope, create_checkpointer("memory"),
+                                     parallel=self.parallel, router=self.router, models=self.models)
+        else:
+            self.graph = get_compiled_graph(self.model_name, self.user_role, self.scope, self.parallel, self.router,
+                                            self.tiers)
     
-    def invoke(self, messages):
+    def _config(self, thread_id):
+        if self.graph is None:
+            raise ValueError("Workflow has not been initialized")
+        # Without a thread id every call starts a new conversation
+        return {"configurable": {"thread_id": thread_id or str(uuid.uuid4())}}
+
+    @staticmethod
+    def _cache_candidate(messages):
+        """Tell whether a turn's new messages are a single user message the response cache may answer."""
+        from langchain_core.messages import HumanMessage
+        from response_cache import get_response_cache
+
+        return get_response_cache() is not None and len(messages) == 1 and isinstance(messages[0], HumanMessage)
+
+    def _cache_lookup(self, messages, history):
         """
-        Invoke the agent with a list of messages.
+        Look a new user message up in the response cache, returning (answer or None, vector).
+
+        Only the first turn of a thread is looked up, like only first turns are stored: a
+        follow-up message depends on the conversation before it.
+        """
+        from response_cache import get_response_cache
+
+        if history or not self._cache_candidate(messages):
+            return None, None
+        return get_response_cache().lookup(self._cache_key(), str(messages[0].content))
+
+    def _cache_key(self):
+        # Agents of another role, scope or model answer the same message differently
+        model = self.model_name if self.model is None else getattr(self.model, "model_name", type(self.model).__name__)
+        return self.user_role, self.scope, model
+
+    def _cached_update(self, messages, answer):
+        from langchain_core.messages import AIMessage
+
+        # Written as the node that answers the user, so the thread ends the turn as if it had run
+        node = "supervisor" if "supervisor" in self.graph.nodes else "agent"
+        return {"messages": [*messages, AIMessage(content=answer, name="supervisor")]}, node
+
+    def _after_turn(self, conversation, vector):
+        """Feed the finished turn to the pre-router log and the response cache."""
+        from response_cache import get_response_cache, is_cacheable_turn
+        from router import log_turn_routing
+
+        if os.getenv("AGENT_ROUTER_LOG"):
+            # Supervisor routing decisions become training data for the pre-router
+            log_turn_routing(conversation, self.user_role)
+        cache = get_response_cache()
+        if cache is not None and vector is not None and conversation:
+            cache.store(self._cache_key(), vector, conversation[-1].content, is_cacheable_turn(conversation))
+
+    def _needs_conversation(self, vector):
+        return vector is not None or bool(os.getenv("AGENT_ROUTER_LOG"))
+
+    def _start_turn(self, thread_id):
+        from tracing import create_tracer
+
+        config = self._config(thread_id)
+        tracer = create_tracer(config["configurable"]["thread_id"])
+        if tracer is not None:
+            config["callbacks"] = [tracer]
+        return config, tracer
+
+    @contextmanager
+    def _turn(self, messages, thread_id):
+        """
+        Run one turn: yields the config and the cached answer, if any.
+
+        The turn is traced by a TurnTracer unless AGENT_TRACING is off. A cached answer is
+        already written to the thread when it is yielded, so the graph must not run.
+        """
+        config, tracer = self._start_turn(thread_id)
+        try:
+            answer, vector = None, None
+            if self._cache_candidate(messages):
+                history = self.graph.get_state(config).values.get("messages")
+                answer, vector = self._cache_lookup(messages, history)
+            if answer is not None:
+                update, node = self._cached_update(messages, answer)
+                self.graph.update_state(config, update, as_node=node)
+            yield config, answer
+            if answer is None and self._needs_conversation(vector):
+                self._after_turn(self.graph.get_state(config).values.get("messages", []), vector)
+        finally:
+            if tracer is not None:
+                tracer.finish()
+
+    @asynccontextmanager
+    async def _aturn(self, messages, thread_id):
+        """Async version of _turn."""
+        config, tracer = self._start_turn(thread_id)
+        try:
+            answer, vector = None, None
+            if self._cache_candidate(messages):
+                history = (await self.graph.aget_state(config)).values.get("messages")
+                answer, vector = await asyncio.to_thread(self._cache_lookup, messages, history)
+            if answer is not None:
+                update, node = self._cached_update(messages, answer)
+                await self.graph.aupdate_state(config, update, as_node=node)
+            yield config, answer
+            if answer is None and self._needs_conversation(vector):
+                state = await self.graph.aget_state(config)
+                self._after_turn(state.values.get("messages", []), vector)
+        finally:
+            if tracer is not None:
+                tracer.finish()
+
+    def invoke(self, messages, thread_id=None):
+        """
+        Invoke the agent with the new messages of a conversation.
         
         Args:
-            messages: List of message objects
+            messages: List of new message objects, usually the latest HumanMessage
+            thread_id: Conversation id. Previous turns of the thread are loaded from the checkpointer.
             
         Returns:
-            Dictionary with updated messages
+            Dictionary with the updated messages of the whole conversation
         """
-        if self.graph is None:
-            raise ValueError("Workflow has not been initialized")
-        
         # Initialize the state with the provided messages
         initial_state = {"messages": messages}
         
         # Run the graph synchronously and obtain the output
-        #graph_output = self.graph.stream(initial_state, stream_mode="updates")
-        graph_output = self.graph.invoke(initial_state)
-        return graph_output
\ No newline at end of file
+        with self._turn(messages, thread_id) as (config, cached):
+            if cached is not None:
+                return self.graph.get_state(config).values
+            graph_output = self.graph.invoke(initial_state, config=config)
+        return graph_output
+
+    async def ainvoke(self, messages, thread_id=None):
+        """
+        Invoke the agent asynchronously with the new messages of a conversation.
+
+        Tools call their webhooks with the async HTTP client, so the event loop can serve
+        other conversations while this one waits on the model or a webhook.
+
+        Args:
+            messages: List of new message objects, usually the latest HumanMessage
+            thread_id: Conversation id. Previous turns of the thread are loaded from the checkpointer.
+
+        Returns:
+            Dictionary with the updated messages of the whole conversation
+        """
+        initial_state = {"messages": messages}
+        async with self._aturn(messages, thread_id) as (config, cached):
+            if cached is not None:
+                return (await self.graph.aget_state(config)).values
+            return await self.graph.ainvoke(initial_state, config=config)
+
+    async def astream(self, messages, thread_id=None):
+        """
+        Stream the state updates of each graph node asynchronously.
+
+        Args:
+            messages: List of new message objects, usually the latest HumanMessage
+            thread_id: Conversation id. Previous turns of the thread are loaded from the checkpointer.
+
+        Yields:
+            Dictionaries mapping the node name to its state update
+        """
+        initial_state = {"messages": messages}
+        async with self._aturn(messages, thread_id) as (config, cached):
+            if cached is not None:
+                update, node = self._cached_update(messages, cached)
+                yield {node: update}
+                return
+            async for update in self.graph.astream(initial_state, config=config, stream_mode="updates"):
+                yield update
+
+    def stream_answer(self, messages, thread_id=None):
+        """
+        Stream the tokens of the answer to the user as the model generates them.
+
+        Only tokens of the supervisor are yielded, subagent, tool and handoff messages are
+        filtered out, so the first token arrives as soon as the supervisor starts answering.
+        An answer from the response cache is yielded at once.
+
+        Args:
+            messages: List of new message objects, usually the latest HumanMessage
+            thread_id: Conversation id. Previous turns of the thread are loaded from the checkpointer.
+
+        Yields:
+            Text fragments of the supervisor answer
+        """
+        initial_state = {"messages": messages}
+        with self._turn(messages, thread_id) as (config, cached):
+            if cached is not None:
+                yield cached
+                return
+            stream = self.graph.stream(initial_state, config=config, stream_mode="messages", subgraphs=True)
+            for _, (chunk, metadata) in stream:
+                if _is_answer_token(chunk, metadata):
+                    yield chunk.content
+
+    async def astream_answer(self, messages, thread_id=None):
+        """Async version of stream_answer."""
+        initial_state = {"messages": messages}
+        async with self._aturn(messages, thread_id) as (config, cached):
+            if cached is not None:
+                yield cached
+                return
+            stream = self.graph.astream(initial_state, config=config, stream_mode="messages", subgraphs=True)
+            async for _, (chunk, metadata) in stream:
+                if _is_answer_token(chunk, metadata):
+                    yield chunk.content
+
+    def get_history(self, thread_id):
+        """
+        Get the messages stored in the checkpoint of a conversation.
+
+        Args:
+            thread_id: Conversation id
+
+        Returns:
+            List of message objects, empty if the thread has no checkpoint yet
+        """
+        state = self.graph.get_state(self._config(thread_id))
+        return state.values.get("messages", [])
+
+    def end_conversation(self, thread_id):
+        """
+        Delete the checkpoints of a conversation, e.g. when the user logs out.
+
+        Args:
+            thread_id: Conversation id
+        """
+        from memo import get_tool_memo
+
+        if thread_id and self.graph is not None and self.graph.checkpointer is not None:
+            self.graph.checkpointer.delete_thread(thread_id)
+        memo = get_tool_memo()
+        if thread_id and memo is not None:
+            memo.forget(thread_id)
+
+    async def aend_conversation(self, thread_id):
+        """
+        Async version of end_conversation.
+
+        Also closes the webhook connections of the running event loop when no other request
+        of the loop is using them, so a loop whose conversations all ended holds no pool.
+
+        Args:
+            thread_id: Conversation id
+        """
+        from memo import get_tool_memo
+        from webhooks import aclose_transport
+
+        if thread_id and self.graph is not None and self.graph.checkpointer is not None:
+            await self.graph.checkpointer.adelete_thread(thread_id)
+        memo = get_tool_memo()
+        if thread_id and memo is not None:
+            memo.forget(thread_id)
+        await aclose_transport(idle_only=True)
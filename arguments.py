@@ -0,0 +1,279 @@
+import difflib
+import json
+import re
+import threading
+import unicodedata
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+from typing import Annotated, Any, Dict, List, Literal, Optional, Tuple, Type, get_args, get_origin
+
+from langchain_core.messages import ToolMessage
+from pydantic import BaseModel, BeforeValidator, ValidationError, ValidationInfo
+
+MONTHS = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7, "agosto": 8,
+    "septiembre": 9, "setiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12
+}
+
+RELATIVE_DAYS = {"hoy": 0, "today": 0, "manana": 1, "tomorrow": 1, "ayer": -1, "yesterday": -1}
+
+# Fields whose value would have failed validation without its normalizer, in the validation
+# running in this context, see collect_normalized
+_normalized: ContextVar[Optional[List[str]]] = ContextVar("normalized_arguments", default=None)
+
+
+def fold(text: str) -> str:
+    """Lowercase a text, drop its accents and collapse its spaces, for lenient comparisons."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.lower().split())
+
+
+def _record(info: ValidationInfo):
+    fields = _normalized.get()
+    if fields is not None:
+        fields.append(info.field_name)
+
+
+@contextmanager
+def collect_normalized():
+    """Collect the names of the fields a normalizer rescued from failing validation inside the block."""
+    fields: List[str] = []
+    token = _normalized.set(fields)
+    try:
+        yield fields
+    finally:
+        _normalized.reset(token)
+
+
+def _single_edit(a: str, b: str) -> bool:
+    """Tell whether two different texts are one inserted, deleted or swapped (adjacent) character apart."""
+    if a == b or abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+    short, long = sorted((a, b), key=len)
+    i = 0
+    while i < len(short) and short[i] == long[i]:
+        i += 1
+    return short[i:] == long[i + 1:]
+
+
+def closest_choice(value: str, choices: Tuple[str, ...]) -> Tuple[Optional[str], List[str]]:
+    """
+    Match a value against a set of choices, ignoring case, accents and single-character typos.
+
+    Only the whole name is corrected, and only when exactly one choice is a typo away: a
+    fragment or a different name ("Derecho", "Macroeconomía") may mean another course, so it
+    is never swapped for a choice.
+
+    Returns:
+        The matching choice, or None and the closest choices to suggest
+    """
+    folded = fold(value)
+    table = {fold(choice): choice for choice in choices}
+    if folded in table:
+        return table[folded], []
+    if len(folded) >= 4:
+        typos = [choice for key, choice in table.items() if _single_edit(folded, key)]
+        if len(typos) == 1:
+            return typos[0], []
+    containing = [choice for key, choice in table.items() if len(folded) >= 3 and folded in key]
+    close = [table[key] for key in difflib.get_close_matches(folded, table, n=3, cutoff=0.6)]
+    return None, containing or close
+
+
+def choice(*choices: str) -> Any:
+    """
+    Literal type of the given choices that also accepts them with another case, without accents
+    or with a single-character typo.
+
+    "contabilidad", "Estadistica" or "Estadísitca" are turned into the choice they mean; any
+    other value fails with the closest choices in the error.
+    """
+    def normalize(value: Any, info: ValidationInfo) -> Any:
+        if not isinstance(value, str) or value in choices:
+            return value
+        match, suggestions = closest_choice(value, choices)
+        if match is None:
+            hint = f"closest: {', '.join(suggestions)}" if suggestions else f"allowed: {', '.join(choices)}"
+            raise ValueError(f"'{value}' is not a valid option ({hint})")
+        _record(info)
+        return match
+
+    return Annotated[Literal[choices], BeforeValidator(normalize)]
+
+
+def parse_date(value: Any, today: Optional[date] = None) -> Optional[Tuple[int, int, Optional[int]]]:
+    """
+    Parse the ways a date is written in a chat: "13/06", "13-6-2025", "2025-06-13",
+    "13 de junio", "hoy", "mañana".
+
+    Returns:
+        The day, month and year (None if not given), or None if the value is not a date
+    """
+    if isinstance(value, (date, datetime)):
+        return value.day, value.month, value.year
+    text = fold(str(value))
+    today = today or date.today()
+    if text in RELATIVE_DAYS:
+        day = today + timedelta(days=RELATIVE_DAYS[text])
+        return day.day, day.month, day.year
+    match = re.fullmatch(r"(\d{4})-(\d{1,2})-(\d{1,2})", text)
+    if match:
+        year, month, day = map(int, match.groups())
+        return _valid(day, month, year)
+    match = re.fullmatch(r"(\d{1,2})\s*[/.-]\s*(\d{1,2})(?:\s*[/.-]\s*(\d{2}|\d{4}))?", text)
+    if match:
+        day, month, year = match.groups()
+        return _valid(int(day), int(month), _year(year))
+    match = re.fullmatch(r"(\d{1,2})\s*(?:de\s+)?([a-z]+)(?:\s*(?:de|del)?\s*(\d{4}))?", text)
+    if match and match.group(2) in MONTHS:
+        return _valid(int(match.group(1)), MONTHS[match.group(2)], _year(match.group(3)))
+    return None
+
+
+def _year(text: Optional[str]) -> Optional[int]:
+    if not text:
+        return None
+    return 2000 + int(text) if len(text) == 2 else int(text)
+
+
+def _valid(day: int, month: int, year: Optional[int]) -> Optional[Tuple[int, int, Optional[int]]]:
+    try:
+        # A leap year, so that 29/02 without a year is valid
+        date(year or 2000, month, day)
+    except ValueError:
+        return None
+    return day, month, year
+
+
+def _to_day_month(value: Any) -> Any:
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"'{value}' is not a date, expected day/month like 13/06")
+    # Not recorded: the text was already a valid str, reformatting it saves no model call
+    return f"{parsed[0]:02d}/{parsed[1]:02d}"
+
+
+def _capitalize(value: Any) -> Any:
+    return value[0].upper() + value[1:] if isinstance(value, str) and value else value
+
+
+# A date sent as day/month ("13/06"), written any way parse_date understands
+DayMonth = Annotated[str, BeforeValidator(_to_day_month)]
+
+# A name with its first letter capitalized
+Capitalized = Annotated[str, BeforeValidator(_capitalize)]
+
+
+def _allowed(annotation: Any) -> List[str]:
+    """Return the Literal values of a field annotation, looking inside Annotated, List and Optional."""
+    if get_origin(annotation) is Literal:
+        return list(get_args(annotation))
+    return [value for arg in get_args(annotation) for value in _allowed(arg)]
+
+
+class ArgumentMetrics:
+    """Counts per tool the calls checked before dispatch, rescued by a normalizer, and rejected."""
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, tool: str, outcome: Optional[str] = None):
+        with self._lock:
+            counts = self._counts.setdefault(tool, {"calls": 0, "normalized": 0, "rejected": 0})
+            counts["calls"] += 1
+            if outcome is not None:
+                counts[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """
+        Return the counters per tool.
+
+        `hops_saved` counts the calls a normalizer rescued: calls with a value the schema
+        without normalizers rejects (e.g. a misspelled choice), which would have cost the
+        model another call. Reformatting an already valid value, like a date, is not counted.
+        """
+        with self._lock:
+            return {tool: {**counts, "hops_saved": counts["normalized"]} for tool, counts in self._counts.items()}
+
+
+argument_metrics = ArgumentMetrics()
+
+
+def get_argument_metrics() -> Dict[str, Dict[str, int]]:
+    """Return the calls checked, normalized and rejected per tool, and the model hops saved."""
+    return argument_metrics.snapshot()
+
+
+def correction_message(tool: str, schema: Type[BaseModel], arguments: Dict[str, Any], error: ValidationError) -> str:
+    """
+    Describe the invalid arguments of a call, so the model can fix all of them in its next call.
+
+    Returns:
+        JSON with, per invalid argument, the value received, the problem and the allowed values
+    """
+    problems = []
+    for detail in error.errors():
+        field = str(detail["loc"][0]) if detail["loc"] else ""
+        problem = {
+            "argument": ".".join(str(part) for part in detail["loc"]),
+            "received": arguments.get(field),
+            "problem": "missing" if detail["type"] == "missing" else detail["msg"].removeprefix("Value error, ")
+        }
+        model_field = schema.model_fields.get(field)
+        allowed = _allowed(model_field.annotation) if model_field is not None else []
+        if allowed:
+            problem["allowed"] = allowed
+        problems.append(problem)
+    return json.dumps({
+        "status": "invalid_arguments",
+        "error": f"{tool} was not called. Fix these arguments and call it again; "
+                 "ask the user only for values you cannot infer.",
+        "problems": problems
+    }, ensure_ascii=False, default=str)
+
+
+def check_arguments(request) -> Optional[ToolMessage]:
+    """
+    Validate and normalize the arguments of a webhook tool call before it is dispatched.
+
+    Returns:
+        A ToolMessage with the correction for the model if the arguments are invalid, or None
+        to run the call. Calls to other tools (e.g. handoffs) are not checked.
+    """
+    from tool_registry import registry
+
+    call = request.tool_call
+    spec = registry.specs.get(call["name"])
+    if spec is None:
+        return None
+    with collect_normalized() as normalized:
+        try:
+            spec.args_schema.model_validate(call["args"])
+        except ValidationError as e:
+            argument_metrics.record(call["name"], "rejected")
+            return ToolMessage(
+                content=correction_message(call["name"], spec.args_schema, call["args"], e),
+                name=call["name"],
+                tool_call_id=call["id"],
+                status="error"
+            )
+    argument_metrics.record(call["name"], "normalized" if normalized else None)
+    return None
+
+
+def prevalidate(request, execute):
+    """Sync tool call interceptor that answers invalid calls with a correction instead of running them."""
+    correction = check_arguments(request)
+    return correction if correction is not None else execute(request)
+
+
+async def aprevalidate(request, execute):
+    """Async version of prevalidate."""
+    correction = check_arguments(request)
+    return correction if correction is not None else await execute(request)
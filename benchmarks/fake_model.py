@@ -0,0 +1,142 @@
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model stand-in for benchmarks, it never calls OpenAI.
+
+    On every call it picks the first tool of `tool_calls` that is bound to the model and has
+    not been called yet since the last user message, and calls it with the scripted arguments.
+    A list of calls in `tool_calls` is emitted together, as parallel tool calls.
+    When no scripted tool is left it answers with `answer`. Each call waits `latency` seconds
+    to simulate the model round trip; when streamed, the answer arrives word by word with
+    `token_latency` seconds between words.
+
+    `scripts` replays different sequences within one conversation: the first script whose
+    "match" text is in the last user message supplies the `tool_calls` and `answer` of the turn.
+
+    Responses carry usage metadata that mimics provider prefix caching: prompts are counted at
+    about four characters per token, and the longest prefix shared with a recent prompt is
+    reported as cached once it reaches `cache_min_tokens` (1024, like OpenAI), in steps of 128 tokens.
+
+    With `invalid_tool_call_rate`, that share of the scripted calls with arguments are emitted
+    with no arguments, like a small model that fails to extract them.
+    """
+
+    tool_calls: List[Union[Dict[str, Any], List[Dict[str, Any]]]] = []
+    scripts: List[Dict[str, Any]] = []
+    answer: str = "Listo."
+    latency: float = 0.5
+    token_latency: float = 0.0
+    cache_min_tokens: int = 1024
+    invalid_tool_call_rate: float = 0.0
+    _recent_prompts: List[str] = PrivateAttr(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _script(self, request: str) -> Dict[str, Any]:
+        for script in self.scripts:
+            if script["match"].lower() in request.lower():
+                return script
+        return {"tool_calls": self.tool_calls, "answer": self.answer}
+
+    def _next_message(self, messages: List[BaseMessage], tools: List[Dict[str, Any]]) -> AIMessage:
+        bound = {t["function"]["name"] for t in tools}
+        called = set()
+        request = ""
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                request = str(message.content)
+                break
+            if isinstance(message, ToolMessage):
+                called.add(message.name)
+
+        script = self._script(request)
+        for step in script.get("tool_calls", []):
+            # A list of calls is emitted as one message with parallel tool calls
+            calls = step if isinstance(step, list) else [step]
+            if all(call["name"] in bound for call in calls) and not any(call["name"] in called for call in calls):
+                return AIMessage(content="", tool_calls=[{
+                    "name": call["name"],
+                    "args": {} if call.get("args") and random.random() < self.invalid_tool_call_rate else call.get("args", {}),
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "tool_call"
+                } for call in calls])
+        return AIMessage(content=script.get("answer", self.answer))
+
+    def _usage(self, messages: List[BaseMessage], tools: List[Dict[str, Any]], output: AIMessage) -> Dict[str, Any]:
+        # Tools are sent before the messages, like in the OpenAI prompt layout
+        prompt = json.dumps(tools, sort_keys=True) + "".join(f"{m.type}:{m.content}" for m in messages)
+        shared = max((len(os.path.commonprefix([prompt, recent])) for recent in self._recent_prompts), default=0)
+        self._recent_prompts = [prompt, *self._recent_prompts[:63]]
+        cached = shared // 4 // 128 * 128 if shared // 4 >= self.cache_min_tokens else 0
+        output_tokens = len(json.dumps(output.tool_calls)) // 4 if output.tool_calls else len(output.content) // 4
+        return {
+            "input_tokens": len(prompt) // 4,
+            "output_tokens": output_tokens,
+            "total_tokens": len(prompt) // 4 + output_tokens,
+            "input_token_details": {"cache_read": cached}
+        }
+
+    def _respond(self, messages: List[BaseMessage], tools: List[Dict[str, Any]]) -> AIMessage:
+        message = self._next_message(messages, tools)
+        message.usage_metadata = self._usage(messages, tools, message)
+        return message
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, tools: Optional[List[Dict[str, Any]]] = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, tools or []))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, tools: Optional[List[Dict[str, Any]]] = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, tools or []))])
+
+    def _chunks(self, message: AIMessage):
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=message.usage_metadata, tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ]))
+            return
+        words = message.content.split(" ")
+        for i, word in enumerate(words):
+            # Usage comes with the last chunk, like OpenAI's stream_usage
+            usage = message.usage_metadata if i == len(words) - 1 else None
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word, usage_metadata=usage))
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, tools: Optional[List[Dict[str, Any]]] = None, **kwargs: Any):
+        time.sleep(self.latency)
+        for chunk in self._chunks(self._respond(messages, tools or [])):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            time.sleep(self.token_latency)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, tools: Optional[List[Dict[str, Any]]] = None, **kwargs: Any):
+        await asyncio.sleep(self.latency)
+        for chunk in self._chunks(self._respond(messages, tools or [])):
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            await asyncio.sleep(self.token_latency)
@@ -0,0 +1,96 @@
+"""
+Import-time profile of the entry points.
+
+Imports each module in a fresh interpreter with `python -X importtime` and reports the total
+import time and the packages that take the most of it. The report ends with the time of
+`import agent` alone, which only needs the standard library (langchain, langgraph and the tool
+modules load with the first graph), and, for the chat, the time to render the login screen in
+a fresh process (Streamlit's AppTest), which is what an autoscaled container pays before its
+first page.
+
+Usage:
+    python -m benchmarks.import_profile
+    python -m benchmarks.import_profile --modules agent tools --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ["agent", "tools", "server", "bulk", "graph"]
+
+CHAT_FIRST_PAINT = (
+    "import time; start = time.perf_counter()\n"
+    "from streamlit.testing.v1 import AppTest\n"
+    "AppTest.from_file('chat.py', default_timeout=120).run()\n"
+    "print(time.perf_counter() - start)"
+)
+
+
+def profile_import(module: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Import a module in a fresh interpreter.
+
+    Returns:
+        The total import time in seconds, and the self time in seconds per top-level package
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, env={**os.environ, "PYTHONPATH": ROOT}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    total = 0.0
+    packages: Counter = Counter()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        packages[name.split(".")[0]] += int(self_us) / 1e6
+        if name == module:
+            total = int(cumulative_us) / 1e6
+    return total, dict(packages)
+
+
+def chat_first_paint() -> float:
+    """Seconds to run chat.py up to the login screen in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-c", CHAT_FIRST_PAINT],
+        cwd=ROOT, capture_output=True, text=True, env={**os.environ, "PYTHONPATH": ROOT, "CHAT_PREWARM": "0"}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"chat.py failed:\n{result.stderr[-2000:]}")
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest packages shown per module")
+    parser.add_argument("--no-chat", action="store_true", help="Skip the chat login screen measurement")
+    args = parser.parse_args()
+
+    totals = {}
+    for module in args.modules:
+        start = time.perf_counter()
+        total, packages = totals[module] = profile_import(module)
+        wall = time.perf_counter() - start
+        print(f"{module}: {total * 1000:.0f} ms import ({wall * 1000:.0f} ms process)")
+        heaviest: List[Tuple[str, float]] = sorted(packages.items(), key=lambda item: -item[1])[:args.top]
+        for package, seconds in heaviest:
+            print(f"    {package:<28} {seconds * 1000:8.0f} ms")
+
+    agent_total = totals["agent"][0] if "agent" in totals else profile_import("agent")[0]
+    print(f"import agent: {agent_total * 1000:.0f} ms")
+    if not args.no_chat:
+        print(f"chat.py login screen: {chat_first_paint() * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+End-to-end latency benchmark of the agent graphs.
+
+Replays scripted conversations through the Agent supervisor graph (one scenario per user
+role) and through the employee/mail graph of graph.py, with the fake model and the local
+webhook simulator. Reports p50/p95/p99 per turn, per hop (graph node, e.g.
+"student_agent/tools") and per tool, so that a change can be compared against a baseline.
+
+The webhook response cache and the per-conversation tool memo are off, so every tool call
+measures the webhook path; `--caches` keeps them on and reports their hits apart.
+
+Usage:
+    python -m benchmarks.latency --turns 50
+    python -m benchmarks.latency --target agent --profile profile.json --output baseline.json
+    python -m benchmarks.latency --target agent --router
+    python -m benchmarks.latency --target agent --caches
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fake_model import FakeChatModel
+from benchmarks.simulator import WebhookSimulator
+from cache import get_cache_metrics
+from memo import get_memo_metrics
+from router import get_router_metrics
+
+AGENT_SCENARIOS = [
+    {
+        "role": "alumno",
+        "match": "faltas",
+        "message": "¿Cuántas faltas tengo en Contabilidad? Mi DNI es 44852795",
+        "tool_calls": [
+            {"name": "transfer_to_student_agent"},
+            {"name": "consultar_faltas", "args": {"dni": 44852795, "materias": ["Contabilidad"]}}
+        ],
+        "answer": "Tenés 2 faltas en Contabilidad, no estás en riesgo de quedar libre."
+    },
+    {
+        "role": "profesor",
+        "match": "tema",
+        "message": "Cargá en el SIU el tema de hoy: 2 horas de Big Data",
+        "tool_calls": [
+            {"name": "transfer_to_professor_agent"},
+            {"name": "subir_tema_siu", "args": {
+                "nombreProfesor": "juan Pérez", "materia": "Big Data", "horas": "2", "fecha": "2025-06-10"
+            }}
+        ],
+        "answer": "Listo, cargué la clase del 2025-06-10 en el SIU."
+    },
+    {
+        "role": "administrativo",
+        "match": "factura",
+        "message": "Procesá esta factura de comida por 12000 pesos",
+        "tool_calls": [
+            {"name": "transfer_to_administrative_agent"},
+            {"name": "procesar_redencion_gastos", "args": {
+                "fecha": "2025-06-10", "nombre": "Ana Gómez", "categoria": "Comida",
+                "descripcion": "Almuerzo de trabajo", "monto": "12000", "estado": "Pendiente"
+            }}
+        ],
+        "answer": "La factura es reembolsable."
+    }
+]
+
+APP_SCENARIOS = [
+    {
+        "match": "capacitación",
+        "message": "Registrá que Juan Pérez de Ventas completó la capacitación",
+        "tool_calls": [
+            {"name": "transfer_to_employee_agent"},
+            {"name": "add_employee_learning_status", "args": {
+                "nombre": "Juan", "apellido": "Pérez", "sector": "Ventas", "capacitacion": "SI"
+            }}
+        ],
+        "answer": "Registré la capacitación de Juan Pérez."
+    },
+    {
+        "match": "mail",
+        "message": "Escribí un mail a ana@austral.edu.ar recordándole la reunión",
+        "tool_calls": [
+            {"name": "transfer_to_mail_agent"},
+            {"name": "create_one_mail_draft", "args": {
+                "mail": "ana@austral.edu.ar", "asunto": "Reunión", "contenido": "Te recuerdo la reunión de mañana."
+            }}
+        ],
+        "answer": "Dejé el borrador del mail listo."
+    }
+]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile, `q` between 0 and 100."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+class LatencyCollector(BaseCallbackHandler):
+    """Record the duration of every graph node and tool run, keyed by hop path and tool name."""
+
+    def __init__(self):
+        self.hops: Dict[str, List[float]] = defaultdict(list)
+        self.tools: Dict[str, List[float]] = defaultdict(list)
+        self._starts = {}
+        self._active = set()
+        self._lock = threading.Lock()
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        namespace = metadata.get("langgraph_checkpoint_ns", "")
+        # Only the run of the node itself, not the runnables nested inside it. A subagent node
+        # wraps a subgraph run with the same namespace, which is the same hop.
+        if node and kwargs.get("name") == node and namespace not in self._active:
+            hop = "/".join(part.split(":")[0] for part in namespace.split("|") if part) or node
+            self._active.add(namespace)
+            self._starts[run_id] = ("hop", hop, time.perf_counter(), namespace)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "tool")
+        self._starts[run_id] = ("tool", name, time.perf_counter(), None)
+
+    def _finish(self, run_id):
+        started = self._starts.pop(run_id, None)
+        if started is None:
+            return
+        kind, key, start, namespace = started
+        self._active.discard(namespace)
+        with self._lock:
+            (self.hops if kind == "hop" else self.tools)[key].append(time.perf_counter() - start)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+
+def summarize(samples: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    """Return count and p50/p95/p99 in milliseconds for each key."""
+    return {
+        key: {
+            "count": len(values),
+            "p50": round(percentile(values, 50) * 1000, 1),
+            "p95": round(percentile(values, 95) * 1000, 1),
+            "p99": round(percentile(values, 99) * 1000, 1)
+        }
+        for key, values in sorted(samples.items()) if values
+    }
+
+
+def run_target(name, graphs, scenarios, turns, checkpointed) -> Dict[str, Dict]:
+    """
+    Run `turns` turns of every scenario through its graph.
+
+    Args:
+        name: Label of the target in the report
+        graphs: Compiled graph for each scenario, in the same order
+        scenarios: Scripted scenarios
+        turns: Turns per scenario
+        checkpointed: Whether the graphs have a checkpointer and need a thread id
+
+    Returns:
+        Latency summary per turn, per hop and per tool
+    """
+    collector = LatencyCollector()
+    turn_samples = defaultdict(list)
+    for graph, scenario in zip(graphs, scenarios):
+        label = f"{name}:{scenario.get('role', scenario['match'])}"
+        for _ in range(turns):
+            config = {"callbacks": [collector]}
+            if checkpointed:
+                config["configurable"] = {"thread_id": str(uuid.uuid4())}
+            start = time.perf_counter()
+            graph.invoke({"messages": [HumanMessage(content=scenario["message"])]}, config=config)
+            turn_samples[label].append(time.perf_counter() - start)
+    return {"turns": summarize(turn_samples), "hops": summarize(collector.hops), "tools": summarize(collector.tools)}
+
+
+def _print_table(title, rows):
+    print(f"\n{title}")
+    print(f"  {'':<40} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for key, row in rows.items():
+        print(f"  {key:<40} {row['count']:>6} {row['p50']:>9} {row['p95']:>9} {row['p99']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["all", "agent", "app"], default="all")
+    parser.add_argument("--turns", type=int, default=20, help="Turns per scenario")
+    parser.add_argument("--scope", default="full", help="Agent scope: full, role or single")
+    parser.add_argument("--router", action="store_true", help="Put the keyword pre-router in front of the supervisor")
+    parser.add_argument("--model-latency", type=float, default=0.3, help="Seconds per fake model call")
+    parser.add_argument("--profile", help="JSON latency and error profile of the webhook simulator")
+    parser.add_argument("--output", help="Write the report as JSON, to compare against a baseline")
+    parser.add_argument("--caches", action="store_true",
+                        help="Keep the webhook cache and the tool memo on, and report their hits")
+    args = parser.parse_args()
+
+    if not args.caches:
+        # Read when the first tool runs, so a cache hit never passes for a webhook call
+        os.environ["WEBHOOK_CACHE"] = "off"
+        os.environ["AGENT_TOOL_MEMO_TTL"] = "0"
+
+    profile = None
+    if args.profile:
+        with open(args.profile, encoding="utf-8") as f:
+            profile = json.load(f)
+    simulator = WebhookSimulator(profile).start()
+
+    report = {}
+    if args.target in ("all", "agent"):
+        from agent import Agent
+        model = FakeChatModel(latency=args.model_latency, scripts=AGENT_SCENARIOS)
+        graphs = [
+            Agent(user_role=s["role"], model=model, scope=args.scope, router=args.router).graph
+            for s in AGENT_SCENARIOS
+        ]
+        report["agent"] = run_target("agent", graphs, AGENT_SCENARIOS, args.turns, checkpointed=True)
+    if args.target in ("all", "app"):
+        from graph import build_app
+        model = FakeChatModel(latency=args.model_latency, scripts=APP_SCENARIOS)
+        graph = build_app(model)
+        report["app"] = run_target("app", [graph] * len(APP_SCENARIOS), APP_SCENARIOS, args.turns, checkpointed=False)
+    simulator.stop()
+
+    for target, sections in report.items():
+        for section, rows in sections.items():
+            _print_table(f"{target} - per {section[:-1]}", rows)
+    if args.router:
+        print(f"\nRouter: {get_router_metrics()}")
+    if args.caches:
+        report["caches"] = {"webhook_cache": get_cache_metrics(), "tool_memo": get_memo_metrics()}
+        print(f"\nWebhook cache: {report['caches']['webhook_cache']}")
+        print(f"Tool memo: {report['caches']['tool_memo']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
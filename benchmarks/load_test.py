@@ -0,0 +1,99 @@
+"""
+Load test comparing the sync and async execution paths of Agent.
+
+Runs the same number of student conversations through `Agent.invoke` on a fixed pool of
+worker threads (one conversation pins one thread, like a Streamlit session) and through
+`Agent.ainvoke` on a single event loop, with a fake model and the local webhook simulator that
+both add latency. Reports throughput, peak concurrent sessions and sessions per CPU second.
+
+Usage:
+    python -m benchmarks.load_test --sessions 200 --threads 8
+"""
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage
+
+from agent import Agent
+from benchmarks.fake_model import FakeChatModel
+from benchmarks.simulator import start_simulator
+from webhooks import aclose_transport
+
+
+class _Concurrency:
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *args):
+        with self.lock:
+            self.current -= 1
+
+
+def _report(label, sessions, wall, cpu, peak):
+    print(f"{label:>6}: {sessions} sessions in {wall:.2f}s | {sessions / wall:.1f} sessions/s | "
+          f"peak concurrent sessions {peak} | {sessions / max(cpu, 1e-9):.1f} sessions per CPU second")
+
+
+def run_sync(agent, sessions, threads):
+    concurrency = _Concurrency()
+
+    def session(i):
+        with concurrency:
+            agent.invoke([HumanMessage(content=f"¿Cuántas faltas tengo? Sesión {i}")])
+
+    start, cpu_start = time.perf_counter(), time.process_time()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(session, range(sessions)))
+    _report("sync", sessions, time.perf_counter() - start, time.process_time() - cpu_start, concurrency.peak)
+
+
+async def run_async(agent, sessions):
+    concurrency = _Concurrency()
+
+    async def session(i):
+        with concurrency:
+            await agent.ainvoke([HumanMessage(content=f"¿Cuántas faltas tengo? Sesión {i}")])
+
+    start, cpu_start = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    _report("async", sessions, time.perf_counter() - start, time.process_time() - cpu_start, concurrency.peak)
+    # The loop ends with asyncio.run, its webhook connections are closed first
+    await aclose_transport()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100, help="Number of conversations to run")
+    parser.add_argument("--threads", type=int, default=8, help="Worker threads for the sync path")
+    parser.add_argument("--model-latency", type=float, default=0.5, help="Seconds per fake model call")
+    parser.add_argument("--webhook-latency", type=float, default=0.2, help="Seconds per webhook call")
+    args = parser.parse_args()
+
+    simulator = start_simulator(args.webhook_latency)
+    model = FakeChatModel(
+        latency=args.model_latency,
+        tool_calls=[
+            {"name": "transfer_to_student_agent"},
+            {"name": "consultar_faltas", "args": {"dni": 44852795, "materias": ["Contabilidad"]}}
+        ],
+        answer="Tenés 2 faltas en Contabilidad."
+    )
+    agent = Agent(user_role="alumno", model=model)
+
+    run_sync(agent, args.sessions, args.threads)
+    asyncio.run(run_async(agent, args.sessions))
+    simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark of model tiering: one large model for every call vs a small model for routing and
+tool calls with the large one for the answers.
+
+Replays the turns of the three roles through Agent in both setups and reports the latency per
+turn, the model calls per turn and, for the tiered setup, the calls each node made on the small
+model, on the large one, and the invalid tool calls escalated to the large one. The fake models
+differ only in latency; `--invalid-rate` makes the small one drop the arguments of that share of
+its tool calls. With OpenAI model names the real models are called.
+
+Usage:
+    python -m benchmarks.model_tiers --turns 10
+    python -m benchmarks.model_tiers --turns 10 --invalid-rate 0.2
+    python -m benchmarks.model_tiers --model gpt-4.1 --small-model gpt-4.1-mini --turns 3
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+import uuid
+
+from langchain_core.messages import HumanMessage
+
+from agent import AGENT_SCOPES, Agent, clear_graph_cache
+from benchmarks.fake_model import FakeChatModel
+from benchmarks.latency import AGENT_SCENARIOS, percentile
+from benchmarks.role_scope import UsageCollector
+from benchmarks.simulator import start_simulator
+from tiers import ANSWER, ROUTING, get_tier_metrics
+
+
+def create_agents(args, tiered):
+    if args.model == "fake":
+        large = FakeChatModel(latency=args.large_latency, scripts=AGENT_SCENARIOS)
+        models = None
+        if tiered:
+            small = FakeChatModel(latency=args.small_latency, scripts=AGENT_SCENARIOS,
+                                  invalid_tool_call_rate=args.invalid_rate)
+            models = {ROUTING: small, ANSWER: large, **{name: small for name in
+                      ("student_agent", "professor_agent", "administrative_agent")}}
+        return [Agent(user_role=s["role"], model=large, models=models, scope=args.scope) for s in AGENT_SCENARIOS]
+    os.environ["AGENT_SMALL_MODEL"] = args.small_model
+    clear_graph_cache()
+    return [Agent(model_name=args.model, user_role=s["role"], scope=args.scope, tiers=tiered) for s in AGENT_SCENARIOS]
+
+
+def run_setup(args, tiered):
+    random.seed(args.seed)
+    agents = create_agents(args, tiered)
+    before = get_tier_metrics()
+    latencies, calls = [], []
+    for _ in range(args.turns):
+        for agent, scenario in zip(agents, AGENT_SCENARIOS):
+            collector = UsageCollector()
+            start = time.perf_counter()
+            agent.graph.invoke(
+                {"messages": [HumanMessage(content=scenario["message"])]},
+                config={"callbacks": [collector], "configurable": {"thread_id": str(uuid.uuid4())}}
+            )
+            latencies.append(time.perf_counter() - start)
+            calls.append(collector.calls)
+
+    name = "tiered" if tiered else "single"
+    print(f"{name:>6}: {statistics.mean(latencies) * 1000:8.1f} ms/turn mean | "
+          f"p50 {percentile(latencies, 50) * 1000:8.1f} ms | p95 {percentile(latencies, 95) * 1000:8.1f} ms | "
+          f"{statistics.mean(calls):4.1f} model calls/turn")
+    for node, counts in sorted(get_tier_metrics().items()):
+        earlier = before.get(node, {})
+        small, large, escalated = (counts[k] - earlier.get(k, 0) for k in ("small", "large", "escalated"))
+        print(f"        {node:<22} small {small:>4} | large {large:>4} | escalated {escalated:>4}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="fake", help="'fake' or the OpenAI model name of the answers")
+    parser.add_argument("--small-model", default="gpt-4.1-mini", help="OpenAI model name of routing and tool calls")
+    parser.add_argument("--scope", default="full", choices=AGENT_SCOPES)
+    parser.add_argument("--turns", type=int, default=10, help="Turns per role")
+    parser.add_argument("--large-latency", type=float, default=0.8, help="Seconds per large fake model call")
+    parser.add_argument("--small-latency", type=float, default=0.25, help="Seconds per small fake model call")
+    parser.add_argument("--invalid-rate", type=float, default=0.1,
+                        help="Share of the small fake model's tool calls emitted without arguments")
+    parser.add_argument("--webhook-latency", type=float, default=0.2, help="Seconds per webhook call")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    simulator = start_simulator(args.webhook_latency)
+    run_setup(args, tiered=False)
+    run_setup(args, tiered=True)
+    simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
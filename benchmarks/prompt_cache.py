@@ -0,0 +1,60 @@
+"""
+Cached vs uncached prompt tokens per agent.
+
+Replays the turns of the three roles through Agent, all on one model, and reports for the
+supervisor and each subagent the prompt tokens the provider read from its prefix cache, as
+recorded by the turn tracer. The fake model mimics OpenAI's prefix caching (1024-token minimum,
+128-token steps); with an OpenAI model name the usage reported by the API is used.
+
+Usage:
+    python -m benchmarks.prompt_cache --turns 10
+    python -m benchmarks.prompt_cache --model gpt-4.1 --turns 3
+"""
+import argparse
+import time
+import uuid
+
+from langchain_core.messages import HumanMessage
+
+from agent import AGENT_SCOPES, Agent
+from benchmarks.fake_model import FakeChatModel
+from benchmarks.latency import AGENT_SCENARIOS
+from benchmarks.simulator import start_simulator
+from tracing import get_prompt_cache_metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="fake", help="'fake' or an OpenAI model name")
+    parser.add_argument("--scope", default="full", choices=AGENT_SCOPES)
+    parser.add_argument("--turns", type=int, default=10, help="Turns per role")
+    parser.add_argument("--model-latency", type=float, default=0.05, help="Seconds per fake model call")
+    parser.add_argument("--min-cached-tokens", type=int, default=1024,
+                        help="Shortest prefix the fake model caches, lower it to check the stability of short prompts")
+    args = parser.parse_args()
+
+    simulator = start_simulator(0.05)
+    if args.model == "fake":
+        model = FakeChatModel(latency=args.model_latency, scripts=AGENT_SCENARIOS,
+                              cache_min_tokens=args.min_cached_tokens)
+        agents = [Agent(user_role=s["role"], model=model, scope=args.scope) for s in AGENT_SCENARIOS]
+    else:
+        agents = [Agent(model_name=args.model, user_role=s["role"], scope=args.scope) for s in AGENT_SCENARIOS]
+
+    start = time.perf_counter()
+    for _ in range(args.turns):
+        # Roles interleave, like concurrent sessions sharing the provider's cache
+        for agent, scenario in zip(agents, AGENT_SCENARIOS):
+            agent.invoke([HumanMessage(content=scenario["message"])], thread_id=str(uuid.uuid4()))
+    elapsed = time.perf_counter() - start
+    simulator.stop()
+
+    print(f"{args.turns * len(agents)} turns in {elapsed:.1f} s, scope {args.scope}\n")
+    print(f"  {'agent':<22} {'calls':>6} {'prompt':>9} {'cached':>9} {'uncached':>9} {'share':>7}")
+    for name, totals in sorted(get_prompt_cache_metrics().items()):
+        print(f"  {name:<22} {totals['calls']:>6} {totals['prompt_tokens']:>9} {totals['cached_tokens']:>9} "
+              f"{totals['uncached_tokens']:>9} {totals['cached_share']:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
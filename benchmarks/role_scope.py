@@ -0,0 +1,94 @@
+"""
+Benchmark of the agent scopes: tokens, model calls and latency per turn.
+
+Runs the same student turns through the full three-agent supervisor, the role-scoped
+supervisor and the single ReAct agent. With the default fake model the prompt tokens are
+estimated from the messages sent to the model; with an OpenAI model name the usage reported
+by the API is used.
+
+Usage:
+    python -m benchmarks.role_scope --turns 20
+    python -m benchmarks.role_scope --model gpt-4.1 --turns 5
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from agent import AGENT_SCOPES, Agent
+from benchmarks.fake_model import FakeChatModel
+from benchmarks.simulator import start_simulator
+
+
+class UsageCollector(BaseCallbackHandler):
+    """Count model calls and prompt/completion tokens of every model call in a run."""
+
+    def __init__(self):
+        self.calls = 0
+        self.estimated_prompt_tokens = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls += 1
+        self.estimated_prompt_tokens += sum(count_tokens_approximately(batch) for batch in messages)
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.prompt_tokens += usage["input_tokens"]
+                    self.completion_tokens += usage["output_tokens"]
+
+
+def run_scope(scope, args):
+    if args.model == "fake":
+        model = FakeChatModel(
+            latency=args.model_latency,
+            tool_calls=[
+                {"name": "transfer_to_student_agent"},
+                {"name": "consultar_faltas", "args": {"dni": 44852795, "materias": ["Contabilidad"]}}
+            ],
+            answer="Tenés 2 faltas en Contabilidad."
+        )
+        agent = Agent(user_role="alumno", model=model, scope=scope)
+    else:
+        agent = Agent(model_name=args.model, user_role="alumno", scope=scope)
+
+    latencies, calls, tokens = [], [], []
+    for _ in range(args.turns):
+        collector = UsageCollector()
+        start = time.perf_counter()
+        agent.graph.invoke(
+            {"messages": [HumanMessage(content="¿Cuántas faltas tengo en Contabilidad? Mi DNI es 44852795")]},
+            config={"callbacks": [collector], "configurable": {"thread_id": str(uuid.uuid4())}}
+        )
+        latencies.append(time.perf_counter() - start)
+        calls.append(collector.calls)
+        tokens.append(collector.prompt_tokens or collector.estimated_prompt_tokens)
+
+    print(f"{scope:>6}: {statistics.mean(latencies) * 1000:8.1f} ms/turn | "
+          f"{statistics.mean(calls):4.1f} model calls/turn | {statistics.mean(tokens):8.0f} prompt tokens/turn")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="fake", help="'fake' or an OpenAI model name")
+    parser.add_argument("--turns", type=int, default=10, help="Turns per scope")
+    parser.add_argument("--model-latency", type=float, default=0.3, help="Seconds per fake model call")
+    parser.add_argument("--webhook-latency", type=float, default=0.2, help="Seconds per webhook call")
+    args = parser.parse_args()
+
+    simulator = start_simulator(args.webhook_latency)
+    for scope in AGENT_SCOPES:
+        run_scope(scope, args)
+    simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
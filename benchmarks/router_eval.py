@@ -0,0 +1,49 @@
+"""
+Accuracy and latency of the pre-router.
+
+Trains the router on the curated examples (plus the logged traffic of AGENT_ROUTER_LOG, if set)
+and classifies a held-out labelled set. For each confidence threshold it reports the coverage
+(share of messages dispatched without the supervisor's routing call) and the precision of those
+direct dispatches, i.e. how often a bypass sends the message to the wrong subagent.
+
+Usage:
+    python -m benchmarks.router_eval
+    python -m benchmarks.router_eval --data logged_traffic.jsonl --thresholds 0.7 0.85 0.95
+"""
+import argparse
+import os
+import time
+
+from router import SUPERVISOR, get_router, load_examples
+
+DEFAULT_EVAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "router_eval.jsonl")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DEFAULT_EVAL_PATH, help="Labelled JSONL to evaluate on")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5, 0.7, 0.85, 0.95])
+    args = parser.parse_args()
+
+    router = get_router()
+    examples = load_examples([args.data])
+    start = time.perf_counter()
+    predictions = [router.predict(example["message"], example.get("role")) for example in examples]
+    elapsed = time.perf_counter() - start
+
+    correct = sum(label == example["agent"] for (label, _), example in zip(predictions, examples))
+    print(f"{len(examples)} messages | top-1 accuracy {correct / len(examples):.1%} | "
+          f"{elapsed / len(examples) * 1e6:.0f} µs per message")
+    print(f"\n  {'threshold':>9} {'coverage':>9} {'precision':>10} {'wrong bypasses':>15}")
+    for threshold in args.thresholds:
+        direct = [
+            (label, example) for (label, confidence), example in zip(predictions, examples)
+            if label != SUPERVISOR and confidence >= threshold
+        ]
+        right = sum(label == example["agent"] for label, example in direct)
+        precision = right / len(direct) if direct else 1.0
+        print(f"  {threshold:>9.2f} {len(direct) / len(examples):>9.1%} {precision:>10.1%} {len(direct) - right:>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Local stand-in for the Make.com webhooks.
+
+Every tool of the registry is served at /<tool_name>. Requests are validated against the
+tool's Pydantic model like the Make scenario would (400 on an invalid payload) and answered
+with a response shaped like the real scenario's. Latency and errors follow a configurable
+profile per tool.
+
+Usage:
+    python -m benchmarks.simulator --port 8765 --write-config webhooks.local.json
+    WEBHOOKS_CONFIG=webhooks.local.json streamlit run chat.py
+
+Profile file (JSON), every key optional:
+    {
+        "default": {"latency": {"distribution": "lognormal", "median": 0.8, "sigma": 0.4}, "error_rate": 0.01},
+        "consultar_faltas": {"latency": {"distribution": "fixed", "value": 0.3}, "timeout_rate": 0.05}
+    }
+Distributions: "fixed" (value), "uniform" (low, high), "lognormal" (median, sigma).
+"""
+import argparse
+import http.server
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from pydantic import ValidationError
+
+import tools  # noqa: F401  Registers every webhook tool
+from tool_registry import DEFAULT_CONFIG_PATH, load_webhook_config, registry
+
+DEFAULT_PROFILE = {
+    "default": {
+        "latency": {"distribution": "lognormal", "median": 0.8, "sigma": 0.4},
+        "error_rate": 0.0,
+        "timeout_rate": 0.0
+    }
+}
+
+
+def sample_latency(latency: Dict[str, Any]) -> float:
+    """Draw a latency in seconds from a distribution of the profile."""
+    distribution = latency.get("distribution", "fixed")
+    if distribution == "fixed":
+        return latency.get("value", 0.0)
+    if distribution == "uniform":
+        return random.uniform(latency.get("low", 0.0), latency.get("high", 1.0))
+    if distribution == "lognormal":
+        return random.lognormvariate(0, latency.get("sigma", 0.4)) * latency.get("median", 0.8)
+    raise ValueError(f"Unknown latency distribution '{distribution}'")
+
+
+def respond(name: str, payload: Dict[str, Any]) -> Any:
+    """Build a response shaped like the one of the real Make scenario."""
+    if name == "consultar_faltas":
+        materias = payload.get("materias") or ["Microeconomia", "Contabilidad", "Estadística"]
+        faltas = [{"materia": materia, "faltas": random.randint(0, 8), "maximo": 8} for materia in materias]
+        for item in faltas:
+            item["riesgoLibre"] = item["faltas"] >= 6
+        return {"dni": payload["dni"], "faltas": faltas}
+    if name == "gestionar_recordatorio_examen":
+        if payload["accion"] == "Consulta":
+            return {"materia": payload["materia"], "fechaExamen": "2025-07-14"}
+        return {"message": f"Recordatorio programado para {payload['mail']}"}
+    if name == "subir_tema_siu":
+        return f"Clase del {payload['fecha']} cargada correctamente"
+    if name == "crear_recordatorio_evento":
+        if payload["materia"].lower() in ("ia", "inteligencia artificial", "big data"):
+            return "Recordatorio cargado correctamente"
+        return "La materia no coincide"
+    if name == "gestionar_archivo_materia":
+        return {"message": f"Archivo '{payload['nombre_archivo']}' procesado: {payload['accion']}"}
+    if name == "enviar_recordatorio_horas_siu":
+        return {
+            "message": "Emails enviados",
+            "profesoresPendientes": [
+                {"nombre": "Juan Pérez", "horasFaltantes": 4, "horasRegistradas": 12},
+                {"nombre": "Ana Gómez", "horasFaltantes": 2, "horasRegistradas": 14}
+            ]
+        }
+    if name == "procesar_redencion_gastos":
+        reembolsable = payload["categoria"].lower() in ("viáticos", "viaticos", "comida", "capacitación", "capacitacion")
+        return {"estado": "Reembolsable" if reembolsable else "No reembolsable", "monto": payload["monto"]}
+    if name == "crear_post_linkedin":
+        return {"message": "Post publicado", "url": "https://www.linkedin.com/feed/update/urn:li:activity:0"}
+    return "Accepted"
+
+
+class WebhookSimulator:
+    """HTTP server that emulates every registered webhook, with latency and errors per profile."""
+
+    def __init__(self, profile: Optional[Dict[str, Any]] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        Initialize the simulator.
+
+        Args:
+            profile: Latency and error profile per tool name, with a "default" entry
+            host: Interface to listen on
+            port: Port to listen on, 0 picks a free one
+        """
+        self.profile = profile or DEFAULT_PROFILE
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        simulator = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                simulator._handle(self, self.path.strip("/"), body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _settings(self, name: str) -> Dict[str, Any]:
+        return {**self.profile.get("default", {}), **self.profile.get(name, {})}
+
+    def _handle(self, handler, name: str, body: bytes):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        settings = self._settings(name)
+        time.sleep(sample_latency(settings.get("latency", {})))
+
+        if random.random() < settings.get("timeout_rate", 0.0):
+            # Hang past any client read timeout
+            time.sleep(settings.get("timeout_seconds", 30))
+            return self._send(handler, 504, "Gateway Timeout")
+        if random.random() < settings.get("error_rate", 0.0):
+            return self._send(handler, 500, "Internal Server Error")
+
+        spec = registry.specs.get(name)
+        if spec is None:
+            return self._send(handler, 404, "There is no scenario listening for this webhook.")
+        try:
+            payload = spec.args_schema(**json.loads(body or b"{}")).model_dump()
+        except (ValueError, ValidationError):
+            return self._send(handler, 400, "Bad Request")
+        self._send(handler, 200, respond(name, payload))
+
+    @staticmethod
+    def _send(handler, status: int, content: Any):
+        if isinstance(content, str):
+            body, content_type = content.encode("utf-8"), "text/plain; charset=utf-8"
+        else:
+            body, content_type = json.dumps(content, ensure_ascii=False).encode("utf-8"), "application/json"
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def write_config(self, path: str):
+        """Write a webhooks config file that points every tool at this simulator."""
+        with open(DEFAULT_CONFIG_PATH, encoding="utf-8") as f:
+            config = json.load(f)
+        for name, settings in config["tools"].items():
+            settings["url"] = f"{self.base_url}/{name}"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(config, f, indent=4, ensure_ascii=False)
+
+    def start(self, configure_tools: bool = True) -> "WebhookSimulator":
+        """
+        Start serving in a background thread.
+
+        Args:
+            configure_tools: Point the tools of this process at the simulator
+        """
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        if configure_tools:
+            path = os.path.join(tempfile.mkdtemp(), "webhooks.json")
+            self.write_config(path)
+            load_webhook_config(path)
+        return self
+
+    def stop(self):
+        """Stop serving."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def start_simulator(latency: Optional[float] = None, profile: Optional[Dict[str, Any]] = None) -> WebhookSimulator:
+    """
+    Start a simulator and point the tools of this process at it.
+
+    Args:
+        latency: Fixed latency in seconds for every webhook, overrides the profile's default
+        profile: Latency and error profile, see the module docstring
+    """
+    profile = dict(profile or DEFAULT_PROFILE)
+    if latency is not None:
+        profile["default"] = {**profile.get("default", {}), "latency": {"distribution": "fixed", "value": latency}}
+    return WebhookSimulator(profile).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--profile", help="JSON file with the latency and error profile")
+    parser.add_argument("--write-config", help="Write a webhooks config file pointing at the simulator")
+    args = parser.parse_args()
+
+    profile = None
+    if args.profile:
+        with open(args.profile, encoding="utf-8") as f:
+            profile = json.load(f)
+
+    simulator = WebhookSimulator(profile, args.host, args.port)
+    if args.write_config:
+        simulator.write_config(args.write_config)
+        print(f"Wrote {args.write_config}")
+    print(f"Simulating {len(registry.specs)} webhooks at {simulator.base_url}")
+    try:
+        simulator.server.serve_forever()
+    except KeyboardInterrupt:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
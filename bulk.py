@@ -0,0 +1,210 @@
+"""
+Bulk submission of the administrative webhook tools.
+
+Month-end batches (expense receipts, LinkedIn posts) are submitted straight to the tool's
+webhook instead of one chat turn per row: every row of the file is validated against the
+tool's Pydantic model in a single pass, then the valid rows are posted with bounded
+concurrency, with progress on stderr and a per-row result report.
+
+Nothing is submitted if a row is invalid, unless --skip-invalid is given, so a batch is never
+half-processed because of a typo in row 250.
+
+Usage:
+    python bulk.py gastos.csv
+    python bulk.py gastos.csv --concurrency 8 --report resultado.csv
+    python bulk.py posts.jsonl --tool crear_post_linkedin --dry-run
+
+CSV files need a header row with the field names of the tool's model; JSONL files one object per line.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+import tools  # noqa: F401  Registers every webhook tool
+from ratelimit import BACKGROUND, request_priority
+from tool_registry import registry
+
+# Tools that can be submitted in bulk
+BULK_TOOLS = ("procesar_redencion_gastos", "crear_post_linkedin")
+
+
+def read_rows(path: str) -> List[Dict[str, Any]]:
+    """Read the rows of a CSV (with header) or JSONL file."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            return [json.loads(line) for line in f if line.strip()]
+        return [dict(row) for row in csv.DictReader(f)]
+
+
+def validate_rows(name: str, rows: List[Dict[str, Any]]) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Dict[str, Any]]]:
+    """
+    Validate every row against the tool's model.
+
+    Args:
+        name: Registered tool name
+        rows: Rows read from the input file
+
+    Returns:
+        The valid rows as (row number, payload) pairs, and one result per invalid row with its errors
+    """
+    args_schema = registry.specs[name].args_schema
+    valid, invalid = [], []
+    for number, row in enumerate(rows, start=1):
+        try:
+            payload = args_schema.model_validate(row).model_dump()
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+            invalid.append({"row": number, "status": "invalid", "error": errors, "input": row})
+        else:
+            valid.append((number, payload))
+    return valid, invalid
+
+
+class BulkReport:
+    """Results of a bulk submission, one per row, with running counts for the progress line."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.results: List[Dict[str, Any]] = []
+        self.counts = {"ok": 0, "failed": 0, "invalid": 0, "skipped": 0}
+        self.started_at = time.perf_counter()
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, result: Dict[str, Any]):
+        with self._lock:
+            self.results.append(result)
+            self.counts[result["status"]] += 1
+            self.elapsed = time.perf_counter() - self.started_at
+
+    @property
+    def done(self) -> int:
+        return len(self.results)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            submitted = self.counts["ok"] + self.counts["failed"]
+            return {
+                "total": self.total,
+                **self.counts,
+                "seconds": round(self.elapsed, 2),
+                "rows_per_second": round(submitted / self.elapsed, 2) if self.elapsed else 0.0
+            }
+
+
+def _submit(name: str, number: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Submissions are not idempotent: never served from the response cache nor retried.
+    # They run behind the chat turns in the webhook rate limits.
+    with request_priority(BACKGROUND):
+        response = registry.invoke(name, payload, use_cache=False)
+    if isinstance(response, dict) and response.get("status") == "failed":
+        return {"row": number, "status": "failed", "error": response.get("error"), "input": payload}
+    return {"row": number, "status": "ok", "response": response, "input": payload}
+
+
+def run_bulk(name: str, rows: List[Dict[str, Any]], concurrency: Optional[int] = None,
+             skip_invalid: bool = False, dry_run: bool = False,
+             on_progress: Optional[Callable[[BulkReport], None]] = None) -> BulkReport:
+    """
+    Validate and submit a batch of rows to a webhook tool.
+
+    Args:
+        name: Registered tool name
+        rows: Tool arguments, one dictionary per row
+        concurrency: Maximum requests in flight (env BULK_CONCURRENCY, default 4)
+        skip_invalid: Submit the valid rows even if some are invalid
+        dry_run: Only validate, submit nothing
+        on_progress: Called with the report after every submitted row
+
+    Returns:
+        The report, with results sorted by row number
+    """
+    if name not in registry.specs:
+        raise ValueError(f"Unknown tool '{name}'")
+    if concurrency is None:
+        concurrency = int(os.getenv("BULK_CONCURRENCY", "4"))
+
+    report = BulkReport(len(rows))
+    valid, invalid = validate_rows(name, rows)
+    for result in invalid:
+        report.add(result)
+
+    if dry_run or (invalid and not skip_invalid):
+        for number, payload in valid:
+            report.add({"row": number, "status": "skipped", "input": payload})
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = [executor.submit(_submit, name, number, payload) for number, payload in valid]
+            for future in as_completed(futures):
+                report.add(future.result())
+                if on_progress is not None:
+                    on_progress(report)
+
+    report.results.sort(key=lambda result: result["row"])
+    return report
+
+
+def write_report(report: BulkReport, path: str):
+    """Write the per-row results to a CSV or JSONL file."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            for result in report.results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            return
+        fields = list(dict.fromkeys(key for result in report.results for key in result["input"]))
+        writer = csv.DictWriter(f, fieldnames=["row", "status", *fields, "error", "response"])
+        writer.writeheader()
+        for result in report.results:
+            response = result.get("response")
+            writer.writerow({
+                "row": result["row"],
+                "status": result["status"],
+                **result["input"],
+                "error": result.get("error", ""),
+                "response": json.dumps(response, ensure_ascii=False) if response is not None else ""
+            })
+
+
+def _print_progress(report: BulkReport):
+    counts = report.counts
+    print(f"\r[{report.done}/{report.total}] {counts['ok']} ok, {counts['failed']} failed, "
+          f"{counts['invalid']} invalid", end="", file=sys.stderr, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="CSV or JSONL file with one row per submission")
+    parser.add_argument("--tool", default="procesar_redencion_gastos", choices=BULK_TOOLS)
+    parser.add_argument("--concurrency", type=int, help="Maximum requests in flight (default BULK_CONCURRENCY or 4)")
+    parser.add_argument("--skip-invalid", action="store_true", help="Submit the valid rows even if some are invalid")
+    parser.add_argument("--dry-run", action="store_true", help="Only validate the file")
+    parser.add_argument("--report", help="Write the per-row results to this CSV or JSONL file")
+    args = parser.parse_args()
+
+    report = run_bulk(args.tool, read_rows(args.path), concurrency=args.concurrency,
+                      skip_invalid=args.skip_invalid, dry_run=args.dry_run, on_progress=_print_progress)
+    if report.counts["ok"] or report.counts["failed"]:
+        print(file=sys.stderr)
+
+    for result in report.results:
+        if result["status"] in ("invalid", "failed"):
+            print(f"Row {result['row']} {result['status']}: {result['error']}", file=sys.stderr)
+    if report.counts["invalid"] and not (args.skip_invalid or args.dry_run):
+        print("Nothing was submitted, fix the invalid rows or pass --skip-invalid", file=sys.stderr)
+    print(json.dumps(report.snapshot(), ensure_ascii=False))
+
+    if args.report:
+        write_report(report, args.report)
+    sys.exit(1 if report.counts["failed"] or report.counts["invalid"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Returned by get() on a miss, so that cached None or empty responses are still hits
+MISS = object()
+
+
+def make_key(name: str, payload: Optional[Dict[str, Any]]) -> str:
+    """Build the cache key of a tool call from the tool name and its validated payload."""
+    body = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return f"{name}:{hashlib.sha256(body.encode('utf-8')).hexdigest()}"
+
+
+class TTLCache:
+    """In-process cache with a time to live per entry and least-recently-used eviction."""
+
+    def __init__(self, maxsize: int = 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of entries, the least recently used one is evicted first
+        """
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for a key, or MISS if it is absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISS
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return MISS
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        """Store a value for `ttl` seconds."""
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """
+    Cache stored in a SQLite file, shared by every worker process on the same host.
+
+    Values must be JSON serializable. Expired entries are dropped when read, and the least
+    recently used entries are evicted when the cache grows over `maxsize`.
+    """
+
+    def __init__(self, path: str, maxsize: int = 10000):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite database file
+            maxsize: Maximum number of entries
+        """
+        self.maxsize = maxsize
+        self._connection = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS webhook_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for a key, or MISS if it is absent or expired."""
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT value, expires_at FROM webhook_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return MISS
+            if row[1] <= now:
+                self._connection.execute("DELETE FROM webhook_cache WHERE key = ?", (key,))
+                return MISS
+            self._connection.execute("UPDATE webhook_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float):
+        """Store a value for `ttl` seconds."""
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO webhook_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + ttl, now)
+            )
+            self._connection.execute(
+                "DELETE FROM webhook_cache WHERE key IN ("
+                "SELECT key FROM webhook_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,)
+            )
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM webhook_cache")
+
+
+class CacheMetrics:
+    """Hits and misses per tool."""
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, hit: bool):
+        with self._lock:
+            counts = self._counts.setdefault(name, {"hits": 0, "misses": 0})
+            counts["hits" if hit else "misses"] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {name: dict(counts) for name, counts in self._counts.items()}
+
+
+cache_metrics = CacheMetrics()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def create_cache(backend: Optional[str] = None):
+    """
+    Create the response cache of the webhook tools.
+
+    Args:
+        backend: "memory", "sqlite" or "off" (env WEBHOOK_CACHE, default "memory").
+            The size comes from WEBHOOK_CACHE_SIZE and the SQLite file from WEBHOOK_CACHE_PATH.
+
+    Returns:
+        The cache, or None if caching is off
+    """
+    backend = backend or os.getenv("WEBHOOK_CACHE", "memory")
+    maxsize = int(os.getenv("WEBHOOK_CACHE_SIZE", "1024"))
+    if backend == "off":
+        return None
+    if backend == "memory":
+        return TTLCache(maxsize)
+    if backend == "sqlite":
+        return SQLiteCache(os.getenv("WEBHOOK_CACHE_PATH", "webhook_cache.sqlite"), maxsize)
+    raise ValueError(f"Unknown cache backend '{backend}', expected 'memory', 'sqlite' or 'off'")
+
+
+def get_cache():
+    """Return the process-wide response cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = create_cache() or False
+    return _cache or None
+
+
+def get_cache_metrics() -> Dict[str, Dict[str, int]]:
+    """Return the cache hits and misses per tool."""
+    return cache_metrics.snapshot()
@@ -1,11 +1,54 @@
+import logging
+import os
+import threading
+import uuid
 import streamlit as st
 from dotenv import load_dotenv
-from agent import Agent
-from langchain_core.messages import HumanMessage, AIMessage
+# The agent modules are imported after the login screen is shown, see start_prewarm
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Agents to load once the role is known: "full", "role" or "single" (see agent.build_graph)
+AGENT_SCOPE = os.getenv("AGENT_SCOPE", "full")
+
+# Messages rendered on each rerun, older ones are shown on demand
+VISIBLE_MESSAGES = int(os.getenv("CHAT_VISIBLE_MESSAGES", "50"))
+
+# Agent server (server.py) that runs the graphs, by default they run in this process
+AGENT_SERVER_URL = os.getenv("AGENT_SERVER_URL")
+
+
+# Compile the graphs in the background once the login screen is shown (CHAT_PREWARM, default on)
+PREWARM = os.getenv("CHAT_PREWARM", "1").lower() not in ("0", "false", "no")
+
+
+def create_agent(user_role):
+    """Create the agent of a session, a client of the agent server if one is configured."""
+    if AGENT_SERVER_URL:
+        from remote_agent import RemoteAgent
+        return RemoteAgent(AGENT_SERVER_URL, user_role)
+    from agent import Agent
+    return Agent(user_role=user_role, scope=AGENT_SCOPE)
+
+
+@st.cache_resource(show_spinner=False)
+def start_prewarm():
+    """Import the agent modules and compile the graph of every role in a background thread, once per process."""
+    def prewarm():
+        if AGENT_SERVER_URL:
+            import remote_agent  # noqa: F401
+            return
+        from agent import prewarm_graphs
+        prewarm_graphs(scope=AGENT_SCOPE)
+
+    thread = threading.Thread(target=prewarm, name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
 # Initialize session state for user role
 if "user_role" not in st.session_state:
     st.session_state.user_role = None
@@ -33,30 +76,44 @@ if st.session_state.user_role is None:
     with col1:
         if st.button("👨‍🎓 Alumno", use_container_width=True):
             st.session_state.user_role = "alumno"
-            st.session_state.agent = Agent(user_role="alumno")
+            st.session_state.agent = create_agent("alumno")
             st.rerun()
     
     with col2:
         if st.button("👨‍🏫 Profesor", use_container_width=True):
             st.session_state.user_role = "profesor"
-            st.session_state.agent = Agent(user_role="profesor")
+            st.session_state.agent = create_agent("profesor")
             st.rerun()
     
     with col3:
         if st.button("💼 Administrativo", use_container_width=True):
             st.session_state.user_role = "administrativo"
-            st.session_state.agent = Agent(user_role="administrativo")
+            st.session_state.agent = create_agent("administrativo")
             st.rerun()
+    
+    # The login screen is already on its way to the browser, load the agent meanwhile
+    if PREWARM:
+        start_prewarm()
 
 else:
+    from langchain_core.messages import HumanMessage
+    from remote_agent import ServerBusyError
+    from tracing import get_session_summary
+    from transcript import Transcript, entries_from_messages
+
     # Chat interface
     # Add logout button in sidebar
     with st.sidebar:
         st.write(f"**Rol actual:** {st.session_state.user_role.capitalize()}")
         if st.button("Cerrar sesión"):
+            # Free the conversation of this session, in the checkpointer and the transcript
+            st.session_state.agent.end_conversation(st.session_state.get("thread_id"))
+            if st.session_state.get("transcript") is not None:
+                st.session_state.transcript.clear()
+            st.session_state.transcript = None
             st.session_state.user_role = None
             st.session_state.agent = None
-            st.session_state.messages = []
+            st.session_state.thread_id = None
             st.rerun()
     
     # Add the image at the bottom, centered
@@ -68,59 +125,62 @@ else:
     
     st.markdown("---")
     
-    # Initialize chat history
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
-    
-    # Display all previous chat messages
-    for message in st.session_state.messages:
-        if isinstance(message, HumanMessage) and message.content:
-            with st.chat_message("user"):
-                st.markdown(message.content)
-        elif isinstance(message, AIMessage) and message.content and message.name == "supervisor":
-            with st.chat_message("assistant"):
-                st.markdown(message.content)
+    # Each conversation is a thread in the agent's checkpointer
+    if not st.session_state.get("thread_id"):
+        st.session_state.thread_id = str(uuid.uuid4())
+    
+    # What the chat shows is kept in a compact transcript, apart from the graph state
+    if st.session_state.get("transcript") is None:
+        st.session_state.transcript = Transcript(st.session_state.thread_id)
+        st.session_state.visible_messages = VISIBLE_MESSAGES
+        for entry in entries_from_messages(st.session_state.agent.get_history(st.session_state.thread_id)):
+            st.session_state.transcript.append(*entry)
+    transcript = st.session_state.transcript
+    
+    # Display the most recent chat messages
+    if len(transcript) > st.session_state.visible_messages:
+        if st.button("Mostrar mensajes anteriores"):
+            st.session_state.visible_messages += VISIBLE_MESSAGES
+            st.rerun()
+    for entry in transcript.last(st.session_state.visible_messages):
+        with st.chat_message(entry.role):
+            st.markdown(entry.content)
     
     # React to user input
     if prompt := st.chat_input("Escribe tu mensaje aquí..."):
-        # Create a HumanMessage and add it to chat history
+        # Create a HumanMessage, previous turns are already in the checkpoint
         human_message = HumanMessage(content=prompt)
-        st.session_state.messages.append(human_message)
     
         # Display user message in chat message container
         st.chat_message("user").markdown(prompt)
     
-        # Debug: Print input to the graph in terminal
-        print("\n===== DEBUG - INPUT TO AGENT =====")
-        print(f"User role: {st.session_state.user_role}")
-        for i, msg in enumerate(st.session_state.messages):
-            print(f"Message {i}: {msg.__class__.__name__} - Content: {msg.content[:100]}...")
-    
-        # Invoke the agent to get a list of AI messages with a spinner to show processing
-        with st.spinner("Pensando..."):
-            response = st.session_state.agent.invoke(st.session_state.messages)
-    
-            # Debug: Print output from the graph in terminal
-            print("\n===== DEBUG - OUTPUT FROM AGENT =====")
-            print(f"Response keys: {list(response.keys())}")
-            print(f"Number of messages: {len(response['messages'])}")
-    
-            # Update the session state with the new response
-            st.session_state.messages = response["messages"]
-    
-            # Find the last supervisor message with content
-            last_supervisor_message = None
-            for message in reversed(response["messages"]):
-                if isinstance(message, AIMessage) and message.content and message.name == "supervisor":
-                    last_supervisor_message = message
-                    break
-    
-            # Debug: Print details about the last message in terminal
-            print(f"\n===== DEBUG - LAST SUPERVISOR MESSAGE =====")
-            if last_supervisor_message:
-                print(f"Type: {type(last_supervisor_message)}")
-                print(f"Name: {last_supervisor_message.name}")
-                print(f"Content preview: {last_supervisor_message.content[:100]}...")
-    
-                # Display the last supervisor message
-                st.chat_message("assistant").markdown(last_supervisor_message.content)
\ No newline at end of file
+        logger.debug("Turn of %s in thread %s: %s", st.session_state.user_role,
+                     st.session_state.thread_id, human_message.content[:100])
+    
+        # Stream the supervisor answer into the chat as its tokens are generated
+        with st.chat_message("assistant"):
+            try:
+                answer = st.write_stream(
+                    st.session_state.agent.stream_answer([human_message], thread_id=st.session_state.thread_id)
+                )
+            except ServerBusyError:
+                answer = None
+                st.warning("El servicio está ocupado en este momento, por favor intentá de nuevo en unos segundos.")
+    
+        if answer is not None:
+            transcript.append("user", prompt)
+            transcript.append("assistant", answer if isinstance(answer, str) else "".join(map(str, answer)))
+    
+        logger.debug("Answer: %s", str(answer)[:100])
+    
+    # Timing and tokens of the conversation, recorded by the turn tracer
+    summary = get_session_summary(st.session_state.thread_id)
+    if summary:
+        with st.sidebar.expander("Rendimiento de la sesión"):
+            st.write(f"**Turnos:** {summary['turns']} (último {summary['last_turn_ms'] / 1000:.1f} s, "
+                     f"promedio {summary['avg_turn_ms'] / 1000:.1f} s)")
+            st.write(f"**Modelo:** {summary['model_calls']} llamadas, {summary['model_ms'] / 1000:.1f} s, "
+                     f"{summary['prompt_tokens']} tokens de entrada ({summary.get('cached_prompt_tokens', 0)} en caché), "
+                     f"{summary['completion_tokens']} de salida")
+            st.write(f"**Webhooks:** {summary['webhook_calls']} llamadas, {summary['webhook_ms'] / 1000:.1f} s, "
+                     f"{summary['webhook_errors']} errores")
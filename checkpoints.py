@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    In-memory checkpointer that keeps a bounded number of threads.
+
+    Threads are only deleted by Agent.end_conversation, so conversations whose user never logs
+    out would stay in memory for the life of the process. This saver tracks when each thread was
+    last read or written and, on every write, deletes the least recently used threads past
+    `max_threads` and the ones idle for more than `ttl` seconds. The async methods of
+    InMemorySaver call the sync ones, so both paths are bounded.
+    """
+
+    def __init__(self, max_threads: int = 1000, ttl: float = 0, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the saver.
+
+        Args:
+            max_threads: Threads kept at most, 0 for no limit
+            ttl: Seconds a thread is kept without being used, 0 for no limit
+            clock: Time source, for tests
+        """
+        super().__init__()
+        self.max_threads = max_threads
+        self.ttl = ttl
+        self._clock = clock
+        self._last_used: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_tuple(self, config):
+        checkpoint = super().get_tuple(config)
+        if checkpoint is not None:
+            with self._lock:
+                self._touch(config["configurable"]["thread_id"])
+        return checkpoint
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with self._lock:
+            saved = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = config["configurable"]["thread_id"]
+            self._touch(thread_id)
+            self._evict(thread_id)
+        return saved
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            super().delete_thread(thread_id)
+            self._last_used.pop(thread_id, None)
+
+    def last_used(self) -> Dict[str, float]:
+        """Return the threads kept, from the least to the most recently used, with their last use."""
+        with self._lock:
+            return dict(self._last_used)
+
+    def _touch(self, thread_id: str):
+        self._last_used[thread_id] = self._clock()
+        self._last_used.move_to_end(thread_id)
+
+    def _evict(self, keep: str):
+        now = self._clock()
+        for thread_id, used in list(self._last_used.items()):
+            over = self.max_threads and len(self._last_used) > self.max_threads
+            expired = self.ttl and now - used > self.ttl
+            if thread_id == keep or not (over or expired):
+                break
+            super().delete_thread(thread_id)
+            del self._last_used[thread_id]
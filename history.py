@@ -0,0 +1,180 @@
+import logging
+import os
+import threading
+from dataclasses import replace
+from typing import Any, Dict, List, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.prebuilt.chat_agent_executor import AgentState
+from langgraph.types import Command
+from typing_extensions import NotRequired
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryState(AgentState):
+    """Agent state with the rolling summary of the turns that no longer fit the history window."""
+    summary: NotRequired[str]
+    summarized_turns: NotRequired[int]
+
+
+def _without_remaining_steps(result: Any) -> Any:
+    # A handoff copies the whole supervisor state into its update of the outer graph, including
+    # the managed `remaining_steps` value of the supervisor agent, which has no channel there
+    if isinstance(result, Command) and isinstance(result.update, dict) and "remaining_steps" in result.update:
+        return replace(result, update={k: v for k, v in result.update.items() if k != "remaining_steps"})
+    return result
+
+
+def create_handoff_node(agent_names: Sequence[str]):
+    """
+    Build the supervisor's tool node with the default handoff tool of each subagent.
+
+    create_supervisor uses HistoryState for both the supervisor agent and the outer graph, so
+    the summary keys reach the outer graph on a handoff; the supervisor's `remaining_steps` is
+    left out of that update, as the outer graph has nowhere to store it.
+    """
+    from langgraph.prebuilt import ToolNode
+    from langgraph_supervisor import create_handoff_tool
+
+    def wrap(request, execute):
+        return _without_remaining_steps(execute(request))
+
+    async def awrap(request, execute):
+        return _without_remaining_steps(await execute(request))
+
+    return ToolNode([create_handoff_tool(agent_name=name) for name in agent_names],
+                    wrap_tool_call=wrap, awrap_tool_call=awrap)
+
+
+class HistoryMetrics:
+    """Counts the model input tokens before and after the history stage, to verify the saving."""
+
+    def __init__(self):
+        self.calls = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.summaries = 0
+        self._lock = threading.Lock()
+
+    def record(self, tokens_before: int, tokens_after: int, summarized: bool):
+        with self._lock:
+            self.calls += 1
+            self.tokens_before += tokens_before
+            self.tokens_after += tokens_after
+            self.summaries += int(summarized)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Return the counters accumulated so far."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "tokens_before": self.tokens_before,
+                "tokens_after": self.tokens_after,
+                "tokens_saved": self.tokens_before - self.tokens_after,
+                "summaries": self.summaries
+            }
+
+
+history_metrics = HistoryMetrics()
+
+
+def _split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Split a conversation into turns, each one starting at a user message."""
+    turns = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _visible_messages(turn: List[BaseMessage]) -> List[BaseMessage]:
+    """
+    Keep the user message and the answers of a finished turn.
+
+    Tool calls, handoffs and tool results are internal chatter the user never saw, and
+    dropping the AI message together with its tool results keeps the history valid.
+    """
+    return [
+        message for message in turn
+        if isinstance(message, HumanMessage)
+        or (isinstance(message, AIMessage) and message.content and not message.tool_calls)
+    ]
+
+
+def _transcript(turns: List[List[BaseMessage]]) -> str:
+    lines = []
+    for turn in turns:
+        for message in _visible_messages(turn):
+            speaker = "User" if isinstance(message, HumanMessage) else (message.name or "Assistant")
+            lines.append(f"{speaker}: {message.content}")
+    return "\n".join(lines)
+
+
+def create_history_hook(model=None, keep_turns=None):
+    """
+    Build the pre-model stage that bounds the context sent to the model.
+
+    The current turn is always sent whole. The previous `keep_turns` turns are sent without
+    their tool and handoff messages, and older turns are folded into a rolling summary that
+    is stored in the state, so each turn is summarized only once.
+
+    Args:
+        model: Chat model used to write the summary. Without a model older turns are dropped.
+        keep_turns: Number of turns kept verbatim, including the current one
+                    (env AGENT_HISTORY_TURNS, default 6)
+
+    Returns:
+        Function to pass as `pre_model_hook`, or None if keep_turns is 0
+    """
+    if keep_turns is None:
+        keep_turns = int(os.getenv("AGENT_HISTORY_TURNS", "6"))
+    if keep_turns <= 0:
+        return None
+
+    # Summaries are internal, keep their tokens out of the streamed answer
+    summary_model = model.with_config(tags=["nostream"]) if model is not None else None
+
+    def summarize(summary: str, turns: List[List[BaseMessage]]) -> str:
+        prompt = (
+            "Update the summary of a conversation between a university user and an assistant. "
+            "Keep names, IDs, courses, dates and the outcome of every request. Reply only with the summary.\n\n"
+            f"Current summary:\n{summary or '(empty)'}\n\n"
+            f"New messages:\n{_transcript(turns)}"
+        )
+        return summary_model.invoke([HumanMessage(content=prompt)]).content
+
+    def history_hook(state: Dict[str, Any]) -> Dict[str, Any]:
+        messages = list(state["messages"])
+        turns = _split_turns(messages)
+        summary = state.get("summary", "")
+        summarized_turns = state.get("summarized_turns", 0)
+
+        old_turns = turns[:-keep_turns]
+        update = {}
+        if summary_model is not None and len(old_turns) > summarized_turns:
+            summary = summarize(summary, old_turns[summarized_turns:])
+            update = {"summary": summary, "summarized_turns": len(old_turns)}
+
+        llm_input = []
+        if summary:
+            llm_input.append(SystemMessage(content=f"Summary of the earlier conversation: {summary}"))
+        for turn in turns[-keep_turns:-1]:
+            llm_input.extend(_visible_messages(turn))
+        llm_input.extend(turns[-1] if turns else [])
+
+        tokens_before = count_tokens_approximately(messages)
+        tokens_after = count_tokens_approximately(llm_input)
+        history_metrics.record(tokens_before, tokens_after, bool(update))
+        logger.debug("History stage: %d -> %d input tokens", tokens_before, tokens_after)
+
+        return {"llm_input_messages": llm_input, **update}
+
+    return history_hook
+
+
+def get_history_metrics() -> Dict[str, int]:
+    """Return the token counts recorded by the history stage."""
+    return history_metrics.snapshot()
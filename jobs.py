@@ -0,0 +1,320 @@
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+def background_jobs_enabled() -> bool:
+    """Tell whether slow side-effect tools are queued instead of awaited (env AGENT_BACKGROUND_JOBS, default off)."""
+    return os.getenv("AGENT_BACKGROUND_JOBS", "0").lower() in ("1", "true", "yes")
+
+
+class JobQueue:
+    """
+    Durable queue of webhook calls, stored in a SQLite file.
+
+    Every process on the host can enqueue and claim jobs. A claimed job is leased for `lease`
+    seconds; if its worker dies before finishing it, the job is claimed again once the lease expires.
+    """
+
+    def __init__(self, path: str, lease: float = 300):
+        """
+        Initialize the queue.
+
+        Args:
+            path: SQLite database file
+            lease: Seconds a claimed job belongs to its worker
+        """
+        self.lease = lease
+        self._connection = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, tool TEXT NOT NULL, payload TEXT NOT NULL, status TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, available_at REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, available_at)")
+        self._connection.commit()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def enqueue(self, tool: str, payload: Optional[Dict[str, Any]]) -> str:
+        """
+        Add a webhook call to the queue.
+
+        Args:
+            tool: Registered tool name
+            payload: Validated payload
+
+        Returns:
+            The job id
+        """
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO jobs (id, tool, payload, status, created_at, updated_at, available_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, tool, json.dumps(payload, ensure_ascii=False), now, now, now)
+            )
+        self._wakeup.set()
+        return job_id
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Take the oldest job that is due, or whose worker's lease expired, or None if there is none."""
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ?, available_at = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE status IN ('queued', 'running') AND available_at <= ? "
+                "ORDER BY available_at LIMIT 1) "
+                "RETURNING id, tool, payload, attempts",
+                (now, now + self.lease, now)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "tool": row[1], "payload": json.loads(row[2]), "attempts": row[3]}
+
+    def complete(self, job_id: str, result: Any):
+        """Mark a job as done with the webhook response."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, updated_at = ? WHERE id = ?",
+                (json.dumps(result, ensure_ascii=False), time.time(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str, retry_in: Optional[float] = None):
+        """Record a failed attempt: the job is queued again after `retry_in` seconds, or failed for good without it."""
+        now = time.time()
+        with self._lock, self._connection:
+            if retry_in is None:
+                self._connection.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                    (error, now, job_id)
+                )
+            else:
+                self._connection.execute(
+                    "UPDATE jobs SET status = 'queued', error = ?, updated_at = ?, available_at = ? WHERE id = ?",
+                    (error, now, now + retry_in, job_id)
+                )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the state of a job, or None if the id is unknown."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT id, tool, status, attempts, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "tool": row[1],
+            "status": row[2],
+            "attempts": row[3],
+            "result": json.loads(row[4]) if row[4] is not None else None,
+            "error": row[5],
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row[6])),
+            "updated_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row[7]))
+        }
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of jobs per status."""
+        with self._lock:
+            return dict(self._connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def wait(self, timeout: float):
+        """Sleep until a job is enqueued in this process or `timeout` seconds pass."""
+        if self._wakeup.wait(timeout):
+            self._wakeup.clear()
+
+
+class JobWorker:
+    """
+    Background threads that drain a job queue to the webhooks.
+
+    Failed calls are retried with jittered exponential backoff up to `max_attempts` times. A call
+    that timed out may have reached the scenario, so a retry can repeat its side effect.
+    """
+
+    def __init__(self, queue: JobQueue, execute: Callable[[str, Dict[str, Any]], Any], threads: int = 2,
+                 max_attempts: int = 3, backoff: float = 5, poll_interval: float = 1):
+        """
+        Initialize the worker.
+
+        Args:
+            queue: Queue to drain
+            execute: Function posting a payload to a tool's webhook, returning the response
+                or a dictionary with "status": "failed"
+            threads: Jobs run at once
+            max_attempts: Attempts per job before it is marked as failed
+            backoff: Upper bound in seconds of the first retry delay, doubled on every attempt
+            poll_interval: Seconds between checks for jobs enqueued by other processes
+        """
+        self.queue = queue
+        self.execute = execute
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self._stopped = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True) for i in range(max(1, threads))
+        ]
+
+    def start(self) -> "JobWorker":
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self.queue._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=10)
+
+    def run_once(self) -> bool:
+        """Run the next due job, if any. Returns whether a job was run."""
+        job = self.queue.claim()
+        if job is None:
+            return False
+        try:
+            result = self.execute(job["tool"], job["payload"])
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}", "status": "failed"}
+        if isinstance(result, dict) and result.get("status") == "failed":
+            retry_in = None
+            if job["attempts"] < self.max_attempts:
+                retry_in = random.uniform(0, self.backoff * (2 ** (job["attempts"] - 1)))
+            logger.warning("Job %s (%s) attempt %d failed: %s", job["id"], job["tool"], job["attempts"], result.get("error"))
+            self.queue.fail(job["id"], str(result.get("error")), retry_in)
+        else:
+            self.queue.complete(job["id"], result)
+        return True
+
+    def _run(self):
+        while not self._stopped.is_set():
+            if not self.run_once():
+                self.queue.wait(self.poll_interval)
+
+
+class EstadoTarea(BaseModel):
+    job_id: str
+
+
+def _post_job(tool: str, payload: Dict[str, Any]) -> Any:
+    from ratelimit import BACKGROUND, request_priority
+    from tool_registry import registry
+
+    # Queued jobs yield the webhook rate limits to the chat turns
+    with request_priority(BACKGROUND):
+        return registry.invoke(tool, payload, use_cache=False)
+
+
+_job_queue = None
+_job_worker = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Return the process-wide job queue, without starting a worker.
+
+    The queue lives in AGENT_JOBS_DB (default jobs.sqlite).
+    """
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue(os.getenv("AGENT_JOBS_DB", "jobs.sqlite"))
+    return _job_queue
+
+
+def start_job_worker() -> JobWorker:
+    """
+    Start the background worker of the process-wide job queue, once per process.
+
+    The webhook tools must be registered in the process (import tools). JOBS_WORKERS sets the
+    jobs run at once (default 2), JOBS_MAX_ATTEMPTS the attempts per job (default 3) and
+    JOBS_BACKOFF the first retry delay bound in seconds (default 5).
+    """
+    global _job_worker
+    if _job_worker is None:
+        queue = get_job_queue()
+        with _job_queue_lock:
+            if _job_worker is None:
+                _job_worker = JobWorker(
+                    queue,
+                    _post_job,
+                    threads=int(os.getenv("JOBS_WORKERS", "2")),
+                    max_attempts=int(os.getenv("JOBS_MAX_ATTEMPTS", "3")),
+                    backoff=float(os.getenv("JOBS_BACKOFF", "5"))
+                ).start()
+    return _job_worker
+
+
+def get_job_status(job_id: str) -> Dict[str, Any]:
+    """Return the state of a queued job, for the status tool."""
+    job = get_job_queue().get(job_id.strip())
+    if job is None:
+        return {"error": f"No task with id '{job_id}'", "status": "failed"}
+    return job
+
+
+consultar_estado_tarea = StructuredTool.from_function(
+    func=get_job_status,
+    name="consultar_estado_tarea",
+    description=(
+        "Consulta el estado de una tarea que quedó en cola (recordatorios, posts de LinkedIn) con el job_id "
+        "devuelto al encolarla.\n\n"
+        "Args:\n    job_id: Id de la tarea\n\n"
+        "Returns:\n    Dictionary with the status (queued, running, done or failed), attempts, and the "
+        "webhook result or error"
+    ),
+    args_schema=EstadoTarea
+)
+
+
+def has_background_tools(tools: List[Any]) -> bool:
+    """Tell whether any of the given tools runs as a background job."""
+    from tool_registry import registry
+
+    return background_jobs_enabled() and any(
+        tool.name in registry.specs and registry.specs[tool.name].background for tool in tools
+    )
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the background job worker, or show the state of a job.")
+    parser.add_argument("job_id", nargs="?", help="Show this job instead of running the worker")
+    args = parser.parse_args()
+
+    if args.job_id:
+        # Only reads the queue, jobs are left to the workers
+        print(json.dumps(get_job_status(args.job_id), ensure_ascii=False, indent=2))
+        return
+    import tools  # noqa: F401  Registers every webhook tool
+
+    worker = start_job_worker()
+    print(f"Draining {os.getenv('AGENT_JOBS_DB', 'jobs.sqlite')}: {worker.queue.counts()}")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from langchain_core.runnables.config import var_child_runnable_config
+
+
+def current_thread_id() -> Optional[str]:
+    """Return the conversation id of the graph run the caller is part of, or None outside a graph."""
+    config = var_child_runnable_config.get() or {}
+    thread_id = (config.get("configurable") or {}).get("thread_id")
+    return str(thread_id) if thread_id is not None else None
+
+
+def _failed(result: Any) -> bool:
+    return isinstance(result, dict) and result.get("status") == "failed"
+
+
+class ToolMemo:
+    """
+    Per-conversation memo of idempotent tool results.
+
+    Identical calls (same tool and validated payload) within a conversation share one webhook
+    request: a call made while the same one is in flight waits for it (single-flight), and a
+    call made later reuses its result for `ttl` seconds. Failed results are never reused.
+    Conversations are kept least recently used first, at most `max_threads` of them.
+    """
+
+    def __init__(self, ttl: float = 300, max_threads: int = 1000):
+        """
+        Initialize the memo.
+
+        Args:
+            ttl: Seconds a result is reused within its conversation
+            max_threads: Conversations whose results are kept
+        """
+        self.ttl = ttl
+        self.max_threads = max_threads
+        self._results: "OrderedDict[str, Dict[str, Tuple[float, Any]]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._metrics: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, tool: str, outcome: str):
+        counts = self._metrics.setdefault(tool, {"calls": 0, "webhook_calls": 0, "reused": 0, "joined": 0})
+        counts["calls"] += 1
+        counts[outcome] += 1
+
+    def _enter(self, thread_id: str, key: str, tool: str) -> Tuple[str, Any]:
+        """Return ("hit", result), ("join", future) or ("lead", future) for a call."""
+        with self._lock:
+            entry = self._results.get(thread_id, {}).get(key)
+            if entry is not None and entry[0] > time.time():
+                self._results.move_to_end(thread_id)
+                self._count(tool, "reused")
+                return "hit", entry[1]
+            future = self._inflight.get((thread_id, key))
+            if future is not None:
+                self._count(tool, "joined")
+                return "join", future
+            future = self._inflight[(thread_id, key)] = Future()
+            self._count(tool, "webhook_calls")
+            return "lead", future
+
+    def _leave(self, thread_id: str, key: str, future: Future, result: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            del self._inflight[(thread_id, key)]
+            if error is None and not _failed(result):
+                self._results.setdefault(thread_id, {})[key] = (time.time() + self.ttl, result)
+                self._results.move_to_end(thread_id)
+                while len(self._results) > self.max_threads:
+                    self._results.popitem(last=False)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def call(self, thread_id: str, key: str, tool: str, execute: Callable[[], Any]) -> Any:
+        """
+        Run a call through the memo.
+
+        Args:
+            thread_id: Conversation id
+            key: Key of the tool and validated payload, see cache.make_key
+            tool: Tool name, for the counters
+            execute: Function making the webhook request
+
+        Returns:
+            The result of this call, of the identical call in flight, or of an earlier identical call
+        """
+        outcome, value = self._enter(thread_id, key, tool)
+        if outcome == "hit":
+            return value
+        if outcome == "join":
+            return value.result()
+        try:
+            result = execute()
+        except BaseException as e:
+            self._leave(thread_id, key, value, error=e)
+            raise
+        self._leave(thread_id, key, value, result)
+        return result
+
+    async def acall(self, thread_id: str, key: str, tool: str, execute: Callable[[], Awaitable[Any]]) -> Any:
+        """Async version of call, `execute` returns an awaitable."""
+        outcome, value = self._enter(thread_id, key, tool)
+        if outcome == "hit":
+            return value
+        if outcome == "join":
+            return await asyncio.wrap_future(value)
+        try:
+            result = await execute()
+        except BaseException as e:
+            self._leave(thread_id, key, value, error=e)
+            raise
+        self._leave(thread_id, key, value, result)
+        return result
+
+    def forget(self, thread_id: str):
+        """Drop the results of a conversation."""
+        with self._lock:
+            self._results.pop(thread_id, None)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Return per tool the calls, webhook requests made, and requests saved by reuse or by joining an in-flight call."""
+        with self._lock:
+            return {
+                tool: {**counts, "saved": counts["reused"] + counts["joined"]}
+                for tool, counts in self._metrics.items()
+            }
+
+
+_tool_memo = None
+_tool_memo_lock = threading.Lock()
+
+
+def get_tool_memo() -> Optional[ToolMemo]:
+    """
+    Return the process-wide tool memo, or None if it is disabled.
+
+    AGENT_TOOL_MEMO_TTL sets how long a result is reused within a conversation, in seconds
+    (default 300, 0 disables the memo).
+    """
+    global _tool_memo
+    if _tool_memo is None:
+        with _tool_memo_lock:
+            if _tool_memo is None:
+                ttl = float(os.getenv("AGENT_TOOL_MEMO_TTL", "300"))
+                _tool_memo = ToolMemo(ttl) if ttl > 0 else False
+    return _tool_memo or None
+
+
+def get_memo_metrics() -> Dict[str, Dict[str, int]]:
+    """Return the calls and saved webhook requests per tool of the tool memo, empty if it is disabled."""
+    memo = get_tool_memo()
+    return memo.snapshot() if memo is not None else {}
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage
+
+from arguments import aprevalidate, prevalidate
+from tool_registry import registry
+
+
+def parallel_tools_enabled() -> bool:
+    """Tell whether agents may fan out independent tool calls (env AGENT_PARALLEL_TOOLS, default off)."""
+    return os.getenv("AGENT_PARALLEL_TOOLS", "0").lower() in ("1", "true", "yes")
+
+
+def _is_serial(name: str) -> bool:
+    spec = registry.specs.get(name)
+    return spec is not None and spec.serial
+
+
+class _Batch:
+    """
+    Ordering state of the tool calls emitted in one model turn.
+
+    A call may start once every serial call emitted before it has finished; a serial call
+    also waits for every call emitted before it. At most `max_concurrency` calls run at once.
+    """
+
+    def __init__(self, names: List[str], max_concurrency: int):
+        self.serial = [_is_serial(name) for name in names]
+        self.done = [False] * len(names)
+        self.running = 0
+        self.max_concurrency = max_concurrency
+
+    def can_start(self, index: int) -> bool:
+        if self.running >= self.max_concurrency:
+            return False
+        earlier = range(index)
+        if self.serial[index]:
+            return all(self.done[i] for i in earlier)
+        return all(self.done[i] for i in earlier if self.serial[i])
+
+    @property
+    def finished(self) -> bool:
+        return all(self.done)
+
+
+class ToolScheduler:
+    """
+    Runs the tool calls of one model turn concurrently, keeping serial tools in order.
+
+    Hooked into the ToolNode of an agent, so it applies whether the calls of a turn are
+    executed in one tool node run or as one task each. Results keep the order of the calls.
+
+    The batches are guarded by one lock shared by the sync and async interceptors of every
+    thread and event loop; async calls waiting for their turn are woken on their own loop.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_concurrency: Maximum concurrent calls per model turn (env AGENT_TOOL_CONCURRENCY, default 4)
+        """
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("AGENT_TOOL_CONCURRENCY", "4"))
+        self.max_concurrency = max(1, max_concurrency)
+        self._batches: Dict[Tuple[str, ...], _Batch] = {}
+        self._condition = threading.Condition()
+        # Async calls waiting for a batch to change, as (event loop, event)
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    @staticmethod
+    def _calls_of_turn(request) -> Tuple[List[str], List[str]]:
+        call_id = request.tool_call["id"]
+        state = request.state
+        messages = state.get("messages", []) if isinstance(state, dict) else getattr(state, "messages", state)
+        for message in reversed(messages or []):
+            if isinstance(message, AIMessage) and any(call["id"] == call_id for call in message.tool_calls):
+                return [call["id"] for call in message.tool_calls], [call["name"] for call in message.tool_calls]
+        return [call_id], [request.tool_call["name"]]
+
+    def _enter(self, request) -> Tuple[Tuple[str, ...], int]:
+        ids, names = self._calls_of_turn(request)
+        key = tuple(ids)
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _Batch(names, self.max_concurrency)
+        return key, ids.index(request.tool_call["id"])
+
+    def _start(self, key: Tuple[str, ...], index: int) -> bool:
+        batch = self._batches[key]
+        if not batch.can_start(index):
+            return False
+        batch.running += 1
+        return True
+
+    def _leave(self, key: Tuple[str, ...], index: int):
+        with self._condition:
+            batch = self._batches[key]
+            batch.running -= 1
+            batch.done[index] = True
+            if batch.finished:
+                del self._batches[key]
+            self._condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The loop of an abandoned waiter is already closed
+                pass
+
+    def wrap(self, request, execute):
+        """Sync interceptor, see ToolNode(wrap_tool_call=...)."""
+        with self._condition:
+            key, index = self._enter(request)
+            self._condition.wait_for(lambda: self._start(key, index))
+        try:
+            return execute(request)
+        finally:
+            self._leave(key, index)
+
+    async def awrap(self, request, execute):
+        """Async interceptor, see ToolNode(awrap_tool_call=...)."""
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            key, index = self._enter(request)
+        while True:
+            changed = asyncio.Event()
+            with self._condition:
+                if self._start(key, index):
+                    break
+                self._async_waiters.append((loop, changed))
+            await changed.wait()
+        try:
+            return await execute(request)
+        finally:
+            self._leave(key, index)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> ToolScheduler:
+    """Return the process-wide tool scheduler, creating it on first use."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = ToolScheduler()
+    return _scheduler
+
+
+def create_tool_node(tools: List[Any]):
+    """
+    Build the tool node of an agent, with the calls of each model turn scheduled by the process-wide scheduler.
+
+    Once scheduled, the arguments of each webhook call are validated and normalized first, and
+    an invalid call is answered with a correction instead of running (see arguments.check_arguments).
+    """
+    from langgraph.prebuilt import ToolNode
+
+    scheduler = get_scheduler()
+
+    def wrap(request, execute):
+        return scheduler.wrap(request, lambda scheduled: prevalidate(scheduled, execute))
+
+    async def awrap(request, execute):
+        return await scheduler.awrap(request, lambda scheduled: aprevalidate(scheduled, execute))
+
+    return ToolNode(tools, wrap_tool_call=wrap, awrap_tool_call=awrap)
@@ -0,0 +1,391 @@
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from tracing import llm_usage
+
+# Lower values are served first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+_priority: ContextVar[int] = ContextVar("request_priority", default=INTERACTIVE)
+
+
+def current_priority() -> int:
+    """Return the priority of the calls made in the current context (interactive by default)."""
+    return _priority.get()
+
+
+@contextmanager
+def request_priority(level: int):
+    """Run the calls made inside the block with the given priority, e.g. BACKGROUND for bulk or queued jobs."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """
+    Token bucket shared by the threads and event loops of a process.
+
+    The bucket refills at `rate` tokens per second up to `burst`. Callers that find it empty
+    wait in line, ordered by priority and then by arrival, so an interactive call overtakes the
+    background calls already waiting but never a call of its own priority.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Initialize the bucket, full.
+
+        Args:
+            rate: Tokens added per second
+            burst: Tokens the bucket holds, defaults to one second's worth (at least 1)
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: List[List[Any]] = []
+        self._arrivals = itertools.count()
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Dict[str, float]] = {}
+        self._throttled = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _join(self, cost: float, priority: int) -> List[Any]:
+        ticket = [priority, next(self._arrivals), min(cost, self.burst)]
+        with self._lock:
+            heapq.heappush(self._waiters, ticket)
+        return ticket
+
+    def _leave(self, ticket: List[Any]):
+        with self._lock:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+
+    def _poll(self, ticket: List[Any]) -> float:
+        """Take the tokens of a ticket if it is first in line and they are there; otherwise return the seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            self._refill(now)
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._waiters[0] is ticket and self._tokens >= ticket[2]:
+                self._tokens -= ticket[2]
+                heapq.heappop(self._waiters)
+                return 0.0
+            ahead = sum(waiter[2] for waiter in self._waiters if waiter < ticket)
+        # Re-checked at least once a second: a waiter ahead may give up or a higher priority one arrive
+        return min(1.0, max(0.001, (ahead + ticket[2] - self._tokens) / self.rate))
+
+    def _record(self, priority: int, waited: float, granted: bool):
+        with self._lock:
+            counts = self._metrics.setdefault(PRIORITY_NAMES.get(priority, str(priority)), {
+                "acquired": 0, "delayed": 0, "timeouts": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0
+            })
+            counts["acquired" if granted else "timeouts"] += 1
+            if waited > 0.001:
+                counts["delayed"] += 1
+                counts["wait_seconds"] += waited
+                counts["max_wait_seconds"] = max(counts["max_wait_seconds"], waited)
+
+    def acquire(self, cost: float = 1, priority: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Take `cost` tokens, waiting in line for them.
+
+        Args:
+            cost: Tokens to take, capped at the burst size
+            priority: INTERACTIVE or BACKGROUND, defaults to the priority of the current context
+            timeout: Seconds to wait at most, None to wait as long as needed
+
+        Returns:
+            Whether the tokens were taken; False if the timeout passed first
+        """
+        priority = current_priority() if priority is None else priority
+        start = time.monotonic()
+        ticket = self._join(cost, priority)
+        try:
+            while True:
+                delay = self._poll(ticket)
+                if delay == 0:
+                    self._record(priority, time.monotonic() - start, True)
+                    return True
+                if timeout is not None:
+                    remaining = start + timeout - time.monotonic()
+                    if remaining <= 0:
+                        self._leave(ticket)
+                        self._record(priority, timeout, False)
+                        return False
+                    delay = min(delay, remaining)
+                time.sleep(delay)
+        except BaseException:
+            self._leave(ticket)
+            raise
+
+    async def aacquire(self, cost: float = 1, priority: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        """Async version of acquire, it never blocks the event loop."""
+        priority = current_priority() if priority is None else priority
+        start = time.monotonic()
+        ticket = self._join(cost, priority)
+        try:
+            while True:
+                delay = self._poll(ticket)
+                if delay == 0:
+                    self._record(priority, time.monotonic() - start, True)
+                    return True
+                if timeout is not None:
+                    remaining = start + timeout - time.monotonic()
+                    if remaining <= 0:
+                        self._leave(ticket)
+                        self._record(priority, timeout, False)
+                        return False
+                    delay = min(delay, remaining)
+                await asyncio.sleep(delay)
+        except BaseException:
+            self._leave(ticket)
+            raise
+
+    def debit(self, cost: float):
+        """Take tokens already spent, e.g. the tokens a model call used; the bucket may go below zero."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= cost
+
+    def pause(self, seconds: float):
+        """Hold every caller for `seconds`, after the provider answered 429."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._throttled += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the limit, the current queue and, per priority, the calls let through, delayed and timed out."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "tokens": round(self._tokens, 2),
+                "waiting": len(self._waiters),
+                "throttled": self._throttled,
+                "priorities": {
+                    name: {**counts, "wait_seconds": round(counts["wait_seconds"], 3),
+                           "max_wait_seconds": round(counts["max_wait_seconds"], 3)}
+                    for name, counts in self._metrics.items()
+                }
+            }
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[float, Optional[float]]]:
+    """
+    Parse a "key=limit[:second],..." list, e.g. "*=5:10,hook.us1.make.com=2".
+
+    Returns:
+        The two numbers of each key, the second one None when missing. "*" applies to every
+        key not listed.
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, _, value = item.rpartition("=")
+        if not key:
+            raise ValueError(f"Invalid rate limit '{item}', expected key=limit[:limit]")
+        first, _, second = value.partition(":")
+        limits[key.strip()] = (float(first), float(second) if second else None)
+    return limits
+
+
+class ModelRateLimiter(BaseRateLimiter, BaseCallbackHandler):
+    """
+    Requests and tokens per minute of a chat model.
+
+    Passed to the model both as its rate limiter, which waits for a request slot before every
+    call, and as a callback, which charges the tokens the call used and holds the next calls
+    when the provider answers 429. Calls wait for a token budget that is not overdrawn, so a
+    burst of long prompts slows the following calls down instead of failing them.
+    """
+
+    def __init__(self, model: str, requests: TokenBucket, tokens: Optional[TokenBucket] = None):
+        """
+        Initialize the limiter.
+
+        Args:
+            model: Model name, for the metrics
+            requests: Bucket of requests
+            tokens: Bucket of prompt and completion tokens, if the model has a token limit
+        """
+        self.model = model
+        self.requests = requests
+        self.tokens = tokens
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        if self.tokens is not None and not self.tokens.acquire(1, timeout=None if blocking else 0):
+            return False
+        return self.requests.acquire(1, timeout=None if blocking else 0)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        if self.tokens is not None and not await self.tokens.aacquire(1, timeout=None if blocking else 0):
+            return False
+        return await self.requests.aacquire(1, timeout=None if blocking else 0)
+
+    def on_llm_end(self, response, **kwargs):
+        if self.tokens is not None:
+            usage = llm_usage(response)
+            # One token was taken up front to wait for a budget that is not overdrawn
+            self.tokens.debit(usage.get("input_tokens", 0) + usage.get("output_tokens", 0) - 1)
+
+    def on_llm_error(self, error, **kwargs):
+        if getattr(error, "status_code", None) == 429:
+            self.requests.pause(_retry_after(getattr(error, "response", None)))
+
+
+def _retry_after(response: Any, default: float = 1.0) -> float:
+    try:
+        return float(response.headers.get("retry-after", default))
+    except (AttributeError, TypeError, ValueError):
+        return default
+
+
+class RateLimiter:
+    """
+    Process-wide limits of the webhook hosts and the OpenAI models.
+
+    Webhook limits are in calls per second, with an optional burst; model limits are in
+    requests and tokens per minute, with bursts of up to ten seconds' worth. A host or model
+    without a limit is not paced.
+    """
+
+    def __init__(self, webhook_limits: Optional[Dict[str, Tuple[float, Optional[float]]]] = None,
+                 model_limits: Optional[Dict[str, Tuple[float, Optional[float]]]] = None,
+                 max_wait: Optional[float] = 30):
+        """
+        Initialize the limiter.
+
+        Args:
+            webhook_limits: Calls per second and burst per host, see parse_limits
+            model_limits: Requests and tokens per minute per model, see parse_limits
+            max_wait: Seconds an interactive webhook call waits in line before failing,
+                None to wait as long as needed. Background calls always wait.
+        """
+        self.webhook_limits = webhook_limits or {}
+        self.model_limits = model_limits or {}
+        self.max_wait = max_wait
+        self._hosts: Dict[str, Optional[TokenBucket]] = {}
+        self._models: Dict[str, Optional[ModelRateLimiter]] = {}
+        self._lock = threading.Lock()
+
+    def host_bucket(self, url: str) -> Optional[TokenBucket]:
+        """Return the bucket of a webhook URL's host, or None if the host has no limit."""
+        host = urlsplit(url).hostname or url
+        with self._lock:
+            if host not in self._hosts:
+                limit = self.webhook_limits.get(host, self.webhook_limits.get("*"))
+                self._hosts[host] = TokenBucket(*limit) if limit else None
+            return self._hosts[host]
+
+    def model_limiter(self, model: str) -> Optional[ModelRateLimiter]:
+        """Return the limiter of a model, or None if the model has no limit."""
+        with self._lock:
+            if model not in self._models:
+                limit = self.model_limits.get(model, self.model_limits.get("*"))
+                limiter = None
+                if limit:
+                    requests, tokens = limit
+                    limiter = ModelRateLimiter(
+                        model,
+                        TokenBucket(requests / 60, max(1.0, requests / 6)),
+                        TokenBucket(tokens / 60, max(1.0, tokens / 6)) if tokens else None
+                    )
+                self._models[model] = limiter
+            return self._models[model]
+
+    def _timeout(self) -> Optional[float]:
+        return self.max_wait if current_priority() == INTERACTIVE else None
+
+    def acquire_webhook(self, url: str) -> bool:
+        """Wait for a call slot of a webhook's host. Returns False if an interactive call waited too long."""
+        bucket = self.host_bucket(url)
+        return bucket is None or bucket.acquire(timeout=self._timeout())
+
+    async def aacquire_webhook(self, url: str) -> bool:
+        """Async version of acquire_webhook."""
+        bucket = self.host_bucket(url)
+        return bucket is None or await bucket.aacquire(timeout=self._timeout())
+
+    def throttled(self, url: str, response: Any):
+        """Hold the calls to a webhook's host after it answered 429, for its Retry-After or one second."""
+        bucket = self.host_bucket(url)
+        if bucket is not None:
+            bucket.pause(_retry_after(response))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return the state of every limited host and model used so far."""
+        with self._lock:
+            hosts = {host: bucket for host, bucket in self._hosts.items() if bucket is not None}
+            models = {model: limiter for model, limiter in self._models.items() if limiter is not None}
+        return {
+            "webhooks": {host: bucket.snapshot() for host, bucket in hosts.items()},
+            "models": {
+                model: {
+                    "requests": limiter.requests.snapshot(),
+                    "tokens": limiter.tokens.snapshot() if limiter.tokens is not None else None
+                }
+                for model, limiter in models.items()
+            }
+        }
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Return the process-wide rate limiter.
+
+    WEBHOOK_RATE_LIMITS sets calls per second per webhook host, e.g. "*=5:10,hook.us1.make.com=2"
+    (5 per second with bursts of 10 for every host, 2 for that one). OPENAI_RATE_LIMITS sets
+    requests and tokens per minute per model, e.g. "gpt-4.1=500:30000". RATE_LIMIT_MAX_WAIT sets
+    the seconds an interactive webhook call waits for its turn (default 30). Nothing is paced
+    by default.
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter(
+                    parse_limits(os.getenv("WEBHOOK_RATE_LIMITS", "")),
+                    parse_limits(os.getenv("OPENAI_RATE_LIMITS", "")),
+                    max_wait=float(os.getenv("RATE_LIMIT_MAX_WAIT", "30"))
+                )
+    return _rate_limiter
+
+
+def model_rate_limits(model: str) -> Dict[str, Any]:
+    """Return the keyword arguments that make a chat model respect its configured limits, empty if it has none."""
+    limiter = get_rate_limiter().model_limiter(model)
+    if limiter is None:
+        return {}
+    return {"rate_limiter": limiter, "callbacks": [limiter]}
+
+
+def get_rate_limit_metrics() -> Dict[str, Dict[str, Any]]:
+    """Return the state of the rate limits of the webhook hosts and models used so far."""
+    return get_rate_limiter().snapshot()
@@ -0,0 +1,94 @@
+import json
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+from langchain_core.messages import BaseMessage, HumanMessage, messages_from_dict
+
+
+class ServerBusyError(Exception):
+    """Raised when the agent server rejects a turn because it is at capacity."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RemoteAgent:
+    """
+    Client of the agent server (server.py) with the interface of Agent used by the chat.
+
+    The graphs run in the server's worker processes, so the UI process only keeps the HTTP
+    connection pool.
+    """
+
+    def __init__(self, base_url: str, user_role: str, timeout: float = 120):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: Server URL, e.g. http://localhost:8000
+            user_role: Role selected at login
+            timeout: Read timeout in seconds for a whole turn
+        """
+        self.base_url = base_url.rstrip("/")
+        self.user_role = user_role
+        self.client = httpx.Client(base_url=self.base_url, timeout=httpx.Timeout(timeout, connect=5))
+
+    def _body(self, messages: List[BaseMessage], thread_id: Optional[str]) -> Dict[str, Any]:
+        # The server keeps the conversation, only the new user message is sent
+        message = next(message for message in reversed(messages) if isinstance(message, HumanMessage))
+        return {"role": self.user_role, "message": str(message.content), "thread_id": thread_id}
+
+    @staticmethod
+    def _raise_for_status(response: httpx.Response):
+        if response.status_code == 503:
+            retry_after = response.headers.get("Retry-After")
+            response.read()
+            raise ServerBusyError(response.json().get("error", "Server busy"),
+                                  float(retry_after) if retry_after else None)
+        response.raise_for_status()
+
+    def invoke(self, messages: List[BaseMessage], thread_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run one turn on the server.
+
+        Returns:
+            The state after the turn, with the answer as the last message
+        """
+        thread_id = thread_id or str(uuid.uuid4())
+        response = self.client.post("/chat", json=self._body(messages, thread_id))
+        self._raise_for_status(response)
+        return {"messages": self.get_history(thread_id)}
+
+    def stream_answer(self, messages: List[BaseMessage], thread_id: Optional[str] = None) -> Iterator[str]:
+        """
+        Run one turn on the server and yield the tokens of the final answer as they arrive.
+
+        Raises:
+            ServerBusyError: If the server is at capacity
+            RuntimeError: If the turn fails on the server
+        """
+        with self.client.stream("POST", "/chat/stream", json=self._body(messages, thread_id)) as response:
+            self._raise_for_status(response)
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["type"] == "token":
+                    yield event["content"]
+                elif event["type"] == "error":
+                    if event["status"] == 503:
+                        raise ServerBusyError(event["error"])
+                    raise RuntimeError(event["error"])
+
+    def get_history(self, thread_id: str) -> List[BaseMessage]:
+        """Get the messages of a conversation from the server, empty if it has none yet."""
+        response = self.client.get(f"/threads/{thread_id}/messages", params={"role": self.user_role})
+        response.raise_for_status()
+        return messages_from_dict(response.json())
+
+    def end_conversation(self, thread_id: Optional[str]):
+        """Delete a conversation on the server."""
+        if thread_id:
+            self.client.delete(f"/threads/{thread_id}", params={"role": self.user_role}).raise_for_status()
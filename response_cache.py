@@ -0,0 +1,259 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from router import tokenize
+
+# A message with a number (DNI, legajo, amount, date) or an email is about that value, and its
+# answer may repeat it: the embedding folds numbers into one token, so it is never cached
+_PERSONAL = re.compile(r"\d|@")
+
+
+def normalize_message(text: str) -> str:
+    """Lowercase, strip accents, punctuation and filler words, so near-identical questions match."""
+    return " ".join(tokenize(text))
+
+
+class HashingEmbedder:
+    """
+    Local embedding of a message: hashed word and character trigram counts, L2 normalized.
+
+    It needs no model or network call and catches rewordings that share most words
+    ("¿qué podés hacer?" / "¿qué cosas podés hacer?"), but not synonyms.
+    """
+
+    def __init__(self, dimensions: int = 1024):
+        self.dimensions = dimensions
+
+    def _index(self, feature: str) -> int:
+        return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest(), "little") % self.dimensions
+
+    def __call__(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in text.split():
+            vector[self._index(word)] += 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                vector[self._index(padded[i:i + 3])] += 0.5
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class OpenAIEmbedder:
+    """Embedding of a message with an OpenAI embedding model, L2 normalized."""
+
+    def __init__(self, model: str = "text-embedding-3-small"):
+        from langchain_openai import OpenAIEmbeddings
+        self.embeddings = OpenAIEmbeddings(model=model)
+
+    def __call__(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+
+class VectorIndex:
+    """
+    Bounded in-process index of (vector, answer) entries with cosine similarity search.
+
+    Vectors live in a preallocated matrix so a lookup is one matrix-vector product. When the
+    index is full, the least recently used entry is evicted; entries also expire after `ttl`.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.vectors: Optional[np.ndarray] = None
+        self.answers: List[Optional[str]] = [None] * maxsize
+        self.expires_at = np.zeros(maxsize)
+        self.last_used = np.zeros(maxsize)
+
+    def search(self, vector: np.ndarray, threshold: float) -> Optional[str]:
+        if self.vectors is None:
+            return None
+        now = time.time()
+        similarities = self.vectors @ vector
+        similarities[self.expires_at <= now] = -1.0
+        best = int(np.argmax(similarities))
+        if similarities[best] < threshold:
+            return None
+        self.last_used[best] = now
+        return self.answers[best]
+
+    def add(self, vector: np.ndarray, answer: str):
+        if self.vectors is None:
+            self.vectors = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+        now = time.time()
+        # Reuse an expired or empty slot, otherwise evict the least recently used entry
+        expired = np.flatnonzero(self.expires_at <= now)
+        slot = int(expired[0]) if expired.size else int(np.argmin(self.last_used))
+        self.vectors[slot] = vector
+        self.answers[slot] = answer
+        # An answer may mention today's date, so none outlives the day it was written
+        self.expires_at[slot] = min(now + self.ttl, _next_midnight(now))
+        self.last_used[slot] = now
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.expires_at > time.time()))
+
+
+def _next_midnight(now: float) -> float:
+    day = datetime.fromtimestamp(now).date() + timedelta(days=1)
+    return datetime(day.year, day.month, day.day).timestamp()
+
+
+class ResponseCache:
+    """
+    Cache of answers to tool-free questions, keyed by agent (role, scope and model) and message embedding.
+
+    Only answers of turns that made no tool call or handoff are stored, so nothing that depends
+    on a webhook (absences, reminders, uploads) is ever served from the cache, and only first
+    turns of a conversation, whose answer does not depend on earlier messages. Messages with
+    numbers or emails are neither looked up nor stored, and answers expire at midnight.
+    """
+
+    def __init__(self, embed: Callable[[str], np.ndarray], threshold: float = 0.92,
+                 maxsize: int = 256, ttl: float = 3600):
+        """
+        Initialize the cache.
+
+        Args:
+            embed: Function mapping a normalized message to a unit vector
+            threshold: Minimum cosine similarity to serve a cached answer
+            maxsize: Maximum number of answers per agent
+            ttl: Seconds an answer is served, at most until midnight
+        """
+        self.embed = embed
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._indexes: Dict[Tuple[Any, ...], VectorIndex] = {}
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "stores": 0, "skipped": 0, "personal": 0, "lookup_seconds": 0.0}
+
+    def lookup(self, key: Tuple[Any, ...], message: str) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Find the cached answer to a message.
+
+        Args:
+            key: Agent that answers, as (role, scope, model)
+            message: User message
+
+        Returns:
+            The cached answer or None, and the message vector to pass to `store` on a miss
+            (None if the message is not cacheable)
+        """
+        start = time.perf_counter()
+        if _PERSONAL.search(message):
+            with self._lock:
+                self._metrics["personal"] += 1
+            return None, None
+        normalized = normalize_message(message)
+        if not normalized:
+            return None, None
+        vector = self.embed(normalized)
+        with self._lock:
+            index = self._indexes.get(key)
+            answer = index.search(vector, self.threshold) if index is not None else None
+            self._metrics["hits" if answer is not None else "misses"] += 1
+            self._metrics["lookup_seconds"] += time.perf_counter() - start
+        return answer, vector
+
+    def store(self, key: Tuple[Any, ...], vector: Optional[np.ndarray], answer: str, cacheable: bool):
+        """
+        Store the answer of a turn.
+
+        Args:
+            key: Agent that answered, as passed to `lookup`
+            vector: Vector returned by `lookup` for the turn's message
+            answer: Final answer of the turn
+            cacheable: Whether the turn qualifies, see `is_cacheable_turn`
+        """
+        with self._lock:
+            if not cacheable or vector is None or not answer:
+                self._metrics["skipped"] += 1
+                return
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = VectorIndex(self.maxsize, self.ttl)
+            index.add(vector, answer)
+            self._metrics["stores"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._metrics)
+            lookups = metrics["hits"] + metrics["misses"]
+            metrics["avg_lookup_ms"] = round(metrics.pop("lookup_seconds") / lookups * 1000, 3) if lookups else 0.0
+            metrics["entries"] = {"/".join(map(str, key)): len(index) for key, index in self._indexes.items()}
+            return metrics
+
+
+def is_cacheable_turn(messages: List[Any]) -> bool:
+    """
+    Tell whether the last turn of a conversation may be cached: it is the first turn and no
+    tool or handoff was called in it.
+    """
+    humans = [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+    if len(humans) != 1:
+        return False
+    for message in messages[humans[0] + 1:]:
+        if isinstance(message, ToolMessage) or (isinstance(message, AIMessage) and message.tool_calls):
+            return False
+    return True
+
+
+def create_response_cache(backend: Optional[str] = None) -> Optional[ResponseCache]:
+    """
+    Create the semantic response cache.
+
+    Args:
+        backend: Embedding backend, "hash" (local), "openai" or "off"
+            (env AGENT_RESPONSE_CACHE, default "off"). AGENT_RESPONSE_CACHE_THRESHOLD sets the
+            similarity threshold (default 0.92), AGENT_RESPONSE_CACHE_SIZE the answers per agent
+            (default 256), AGENT_RESPONSE_CACHE_TTL their lifetime in seconds (default 3600) and
+            AGENT_RESPONSE_CACHE_MODEL the OpenAI embedding model.
+
+    Returns:
+        The cache, or None if it is off
+    """
+    backend = backend or os.getenv("AGENT_RESPONSE_CACHE", "off")
+    if backend == "off":
+        return None
+    if backend == "hash":
+        embed = HashingEmbedder()
+    elif backend == "openai":
+        embed = OpenAIEmbedder(os.getenv("AGENT_RESPONSE_CACHE_MODEL", "text-embedding-3-small"))
+    else:
+        raise ValueError(f"Unknown response cache backend '{backend}', expected 'hash', 'openai' or 'off'")
+    return ResponseCache(
+        embed,
+        threshold=float(os.getenv("AGENT_RESPONSE_CACHE_THRESHOLD", "0.92")),
+        maxsize=int(os.getenv("AGENT_RESPONSE_CACHE_SIZE", "256")),
+        ttl=float(os.getenv("AGENT_RESPONSE_CACHE_TTL", "3600"))
+    )
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache, creating it on first use."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = create_response_cache() or False
+    return _response_cache or None
+
+
+def get_response_cache_metrics() -> Dict[str, Any]:
+    """Return hits, misses, stores and entries per agent of the response cache, empty if it is off."""
+    cache = get_response_cache()
+    return cache.metrics() if cache is not None else {}
@@ -0,0 +1,250 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.types import Command
+
+logger = logging.getLogger(__name__)
+
+# Label of the messages the router leaves to the supervisor (greetings, capability questions)
+SUPERVISOR = "supervisor"
+
+DEFAULT_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "router_examples.jsonl")
+
+_STOPWORDS = {
+    "a", "al", "de", "del", "el", "en", "es", "la", "las", "lo", "los", "me", "mi", "mis", "por",
+    "que", "se", "su", "un", "una", "y", "o", "con", "para", "tu", "te", "yo"
+}
+
+
+def router_enabled() -> bool:
+    """Tell whether the pre-router runs in front of the supervisor (env AGENT_ROUTER, default off)."""
+    return os.getenv("AGENT_ROUTER", "0").lower() in ("1", "true", "yes")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, strip accents and split a message into words, numbers become a <num> token."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    tokens = []
+    for word in re.findall(r"\w+", text):
+        if word.isdigit():
+            tokens.append("<num>")
+        elif word not in _STOPWORDS:
+            tokens.append(word)
+    return tokens
+
+
+def load_examples(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """Read labelled messages ({"message", "role", "agent"} per line) from JSONL files that exist."""
+    examples = []
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            examples.extend(json.loads(line) for line in f if line.strip())
+    return examples
+
+
+class KeywordRouter:
+    """
+    Naive Bayes classifier that picks the subagent of a message from its words and the user's role.
+
+    The role prior P(agent | role) and the word likelihoods P(word | agent) are counted from
+    labelled messages, with add-one smoothing, so training takes milliseconds and a prediction
+    is a few dictionary lookups.
+    """
+
+    def __init__(self, examples: Sequence[Dict[str, Any]]):
+        """
+        Train the router.
+
+        Args:
+            examples: Labelled messages, dictionaries with "message", "agent" and optionally "role"
+        """
+        self.labels = sorted({example["agent"] for example in examples})
+        self.word_counts: Dict[str, Counter] = defaultdict(Counter)
+        self.role_counts: Dict[Optional[str], Counter] = defaultdict(Counter)
+        for example in examples:
+            self.word_counts[example["agent"]].update(tokenize(example["message"]))
+            self.role_counts[example.get("role")][example["agent"]] += 1
+            self.role_counts[None][example["agent"]] += 1
+        self.vocabulary = set().union(*self.word_counts.values()) if self.word_counts else set()
+        self.totals = {label: sum(self.word_counts[label].values()) for label in self.labels}
+
+    def predict(self, message: str, role: Optional[str] = None) -> Tuple[str, float]:
+        """
+        Classify a message.
+
+        Args:
+            message: User message
+            role: Role selected at login, if known
+
+        Returns:
+            The most likely label and its posterior probability
+        """
+        if not self.labels:
+            return SUPERVISOR, 0.0
+        prior = self.role_counts.get(role) or self.role_counts[None]
+        prior_total = sum(prior.values())
+        vocabulary_size = len(self.vocabulary) + 1
+        tokens = [token for token in tokenize(message) if token in self.vocabulary]
+        scores = {}
+        for label in self.labels:
+            score = math.log((prior[label] + 1) / (prior_total + len(self.labels)))
+            for token in tokens:
+                score += math.log((self.word_counts[label][token] + 1) / (self.totals[label] + vocabulary_size))
+            scores[label] = score
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        confidence = 1 / sum(math.exp(score - top) for score in scores.values())
+        # Without a single known word the prediction is only the role prior
+        if not tokens:
+            confidence = min(confidence, 0.5)
+        return best, confidence
+
+
+class RouterMetrics:
+    """Counts of direct dispatches and supervisor fallbacks, and the time spent classifying."""
+
+    def __init__(self):
+        self.routed: Counter = Counter()
+        self.fallbacks = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, label: Optional[str], seconds: float):
+        with self._lock:
+            self.seconds += seconds
+            if label is None:
+                self.fallbacks += 1
+            else:
+                self.routed[label] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = sum(self.routed.values()) + self.fallbacks
+            return {
+                "calls": calls,
+                "routed": dict(self.routed),
+                "fallbacks": self.fallbacks,
+                "avg_ms": round(self.seconds / calls * 1000, 3) if calls else 0.0
+            }
+
+
+router_metrics = RouterMetrics()
+
+_router = None
+_router_lock = threading.Lock()
+_log_lock = threading.Lock()
+
+
+def get_router() -> KeywordRouter:
+    """
+    Return the process-wide router, trained on first use.
+
+    It is trained on the curated examples (env AGENT_ROUTER_DATA, default router_examples.jsonl)
+    plus the logged traffic of AGENT_ROUTER_LOG, if any.
+    """
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                paths = [os.getenv("AGENT_ROUTER_DATA", DEFAULT_DATA_PATH), os.getenv("AGENT_ROUTER_LOG")]
+                _router = KeywordRouter(load_examples(paths))
+    return _router
+
+
+def log_turn_routing(messages: Sequence[Any], role: Optional[str]):
+    """
+    Append the supervisor's routing decisions of the last turn to the traffic log (env AGENT_ROUTER_LOG).
+
+    Logged decisions are used as training examples the next time the router is trained.
+    Handoffs made by the router itself are skipped, so it never trains on its own output.
+
+    Args:
+        messages: Messages of the conversation after the turn
+        role: Role selected at login
+    """
+    path = os.getenv("AGENT_ROUTER_LOG")
+    if not path:
+        return
+    turn_start = max((i for i, message in enumerate(messages) if isinstance(message, HumanMessage)), default=None)
+    if turn_start is None:
+        return
+    request = str(messages[turn_start].content)
+    agents = []
+    for message in messages[turn_start + 1:]:
+        if not isinstance(message, AIMessage) or message.name != SUPERVISOR:
+            continue
+        if message.response_metadata.get("routed_by") == "router":
+            return
+        for call in message.tool_calls:
+            agent = call["name"].removeprefix("transfer_to_")
+            if call["name"].startswith("transfer_to_") and agent not in agents:
+                agents.append(agent)
+    with _log_lock, open(path, "a", encoding="utf-8") as f:
+        for agent in agents or [SUPERVISOR]:
+            f.write(json.dumps({"message": request, "role": role, "agent": agent}, ensure_ascii=False) + "\n")
+
+
+def create_router_node(agent_names: Sequence[str], user_role: Optional[str] = None,
+                       router: Optional[KeywordRouter] = None, threshold: Optional[float] = None):
+    """
+    Build the graph node that dispatches a new user message straight to a subagent.
+
+    When the router is confident that the message belongs to one of `agent_names`, the node
+    adds the same handoff messages the supervisor would and goes to that subagent, saving the
+    supervisor's routing call. Otherwise it goes to the supervisor.
+
+    Args:
+        agent_names: Subagents of the graph
+        user_role: Role selected at login, used as the prior
+        router: Trained router, the process-wide one by default
+        threshold: Minimum posterior probability to dispatch directly (env AGENT_ROUTER_THRESHOLD, default 0.85)
+
+    Returns:
+        Node function returning a Command
+    """
+    if threshold is None:
+        threshold = float(os.getenv("AGENT_ROUTER_THRESHOLD", "0.85"))
+
+    def route(state: Dict[str, Any]) -> Command:
+        router_ = router or get_router()
+        messages = state["messages"]
+        if not messages or not isinstance(messages[-1], HumanMessage):
+            return Command(goto=SUPERVISOR)
+
+        start = time.perf_counter()
+        label, confidence = router_.predict(str(messages[-1].content), user_role)
+        target = label if label in agent_names and confidence >= threshold else None
+        router_metrics.record(target, time.perf_counter() - start)
+        logger.debug("Router: %s (%.2f) -> %s", label, confidence, target or SUPERVISOR)
+        if target is None:
+            return Command(goto=SUPERVISOR)
+
+        tool_name = f"transfer_to_{target}"
+        call_id = f"call_{uuid.uuid4().hex[:12]}"
+        handoff = [
+            AIMessage(content="", name=SUPERVISOR, response_metadata={"routed_by": "router"}, tool_calls=[
+                {"name": tool_name, "args": {}, "id": call_id, "type": "tool_call"}
+            ]),
+            ToolMessage(content=f"Successfully transferred to {target}", name=tool_name, tool_call_id=call_id)
+        ]
+        return Command(goto=target, update={"messages": handoff})
+
+    return route
+
+
+def get_router_metrics() -> Dict[str, Any]:
+    """Return the direct dispatches, fallbacks and average classification time of the router."""
+    return router_metrics.snapshot()
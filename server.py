@@ -0,0 +1,496 @@
+"""
+Headless HTTP/WebSocket server for the role-specific agents.
+
+The front process only admits, queues and relays requests. The graphs run in a pool of worker
+processes, each with its own event loop, agents and checkpointer; a conversation is always
+served by the same worker (chosen from its thread id), so its checkpoint stays in one process.
+
+Admission is bounded per role: at most SERVER_ROLE_CONCURRENCY turns of a role run at once
+(e.g. "alumno=16,profesor=8,administrativo=4", or one number for every role, default 8), at most
+SERVER_MAX_QUEUE requests wait for a slot (default 64), and none waits more than
+SERVER_QUEUE_TIMEOUT seconds (default 10). Past those limits requests get a 503 with a
+Retry-After header instead of piling up. A turn whose client disconnects or times out is
+cancelled in its worker, so a freed slot is not still busy there.
+
+A thread id belongs to the role that started it; requests of another role get a 403.
+
+Endpoints:
+    POST   /chat                   {"role", "message", "thread_id"?} -> {"thread_id", "answer"}
+    POST   /chat/stream            same body, NDJSON events {"type": "token" | "done" | "error", ...}
+    WS     /ws                     one JSON request per turn, same events as /chat/stream
+    GET    /threads/{id}/messages  ?role=..., the messages of a conversation
+    DELETE /threads/{id}           ?role=..., delete a conversation
+    GET    /health                 workers, queue and per-role load
+
+Usage:
+    python server.py --workers 4 --port 8000
+    AGENT_SERVER_URL=http://localhost:8000 streamlit run chat.py
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from contextlib import aclosing, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from agent import ROLE_AGENTS
+from webhooks import aclose_transport
+
+logger = logging.getLogger(__name__)
+
+ROLES = tuple(ROLE_AGENTS)
+
+
+class ChatRequest(BaseModel):
+    role: str
+    message: str
+    thread_id: Optional[str] = None
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted within the queue limits."""
+
+
+def parse_role_limits(value: Optional[str], default: int = 8) -> Dict[str, int]:
+    """Parse "alumno=16,profesor=8" (or a single number for every role) into per-role limits."""
+    limits = dict.fromkeys(ROLES, default)
+    if not value:
+        return limits
+    if "=" not in value:
+        return dict.fromkeys(ROLES, int(value))
+    for item in value.split(","):
+        role, _, limit = item.partition("=")
+        limits[role.strip()] = int(limit)
+    return limits
+
+
+class Admission:
+    """
+    Per-role concurrency caps with a bounded, time-limited wait queue.
+
+    A request takes a slot of its role's semaphore; while all slots are taken it waits, unless
+    `max_queue` requests are already waiting or the slot does not free up within `queue_timeout`.
+    """
+
+    def __init__(self, limits: Dict[str, int], max_queue: int, queue_timeout: float):
+        self.limits = limits
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+        self._semaphores = {role: asyncio.Semaphore(limit) for role, limit in limits.items()}
+        self._running = dict.fromkeys(limits, 0)
+        self._served = dict.fromkeys(limits, 0)
+        self._rejected = dict.fromkeys(limits, 0)
+
+    @asynccontextmanager
+    async def slot(self, role: str):
+        semaphore = self._semaphores[role]
+        if semaphore.locked() and self.waiting >= self.max_queue:
+            self._rejected[role] += 1
+            raise Overloaded(f"Too many queued requests ({self.waiting})")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected[role] += 1
+            raise Overloaded(f"No {role} slot freed up within {self.queue_timeout:g} s") from None
+        finally:
+            self.waiting -= 1
+        self._running[role] += 1
+        try:
+            yield
+        finally:
+            self._running[role] -= 1
+            self._served[role] += 1
+            semaphore.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "roles": {
+                role: {
+                    "running": self._running[role],
+                    "limit": self.limits[role],
+                    "served": self._served[role],
+                    "rejected": self._rejected[role]
+                }
+                for role in self.limits
+            }
+        }
+
+
+def _create_agent(role: str, model_name: str, scope: str, model_factory: Optional[str]):
+    from agent import Agent
+
+    if model_factory:
+        module_name, _, attribute = model_factory.partition(":")
+        module = __import__(module_name, fromlist=[attribute])
+        return Agent(user_role=role, model=getattr(module, attribute)(), scope=scope)
+    return Agent(model_name=model_name, user_role=role, scope=scope)
+
+
+async def _handle(request: Dict[str, Any], agents: Dict[str, Any], outbox):
+    from langchain_core.messages import HumanMessage, messages_to_dict
+
+    request_id, kind, role, thread_id = request["id"], request["kind"], request["role"], request["thread_id"]
+    try:
+        agent = agents[role]
+        if kind == "chat":
+            parts = []
+            async for token in agent.astream_answer([HumanMessage(content=request["message"])], thread_id=thread_id):
+                parts.append(token)
+                if request.get("stream"):
+                    outbox.put((request_id, "token", token))
+            outbox.put((request_id, "done", "".join(parts)))
+        elif kind == "history":
+            outbox.put((request_id, "done", messages_to_dict(agent.get_history(thread_id))))
+        elif kind == "end":
+            await agent.aend_conversation(thread_id)
+            outbox.put((request_id, "done", None))
+    except Exception as e:
+        logger.exception("Request %s failed", request_id)
+        outbox.put((request_id, "error", str(e)))
+
+
+async def _serve(inbox, outbox, agents: Dict[str, Any]):
+    """Serve requests from `inbox` concurrently until a None arrives, cancelling the ones asked to."""
+    loop = asyncio.get_running_loop()
+    tasks: Dict[str, asyncio.Task] = {}
+    while True:
+        request = await loop.run_in_executor(None, inbox.get)
+        if request is None:
+            break
+        if request["kind"] == "cancel":
+            task = tasks.get(request["id"])
+            if task is not None:
+                task.cancel()
+            continue
+        task = asyncio.create_task(_handle(request, agents, outbox))
+        tasks[request["id"]] = task
+        task.add_done_callback(lambda _, request_id=request["id"]: tasks.pop(request_id, None))
+    if tasks:
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+    # The loop stops with the worker, its webhook connections are closed first
+    await aclose_transport()
+
+
+def _worker_main(inbox, outbox, model_name: str, scope: str, model_factory: Optional[str]):
+    """Entry point of a worker process: serve requests from `inbox` concurrently on one event loop."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    agents = {role: _create_agent(role, model_name, scope, model_factory) for role in ROLES}
+    asyncio.run(_serve(inbox, outbox, agents))
+
+
+class WorkerPool:
+    """
+    Pool of agent worker processes.
+
+    Requests go to the inbox of the worker that owns the thread id; every worker writes its
+    events to one outbox, read by a thread that hands them to the waiting request.
+    """
+
+    def __init__(self, workers: int, model_name: str = "gpt-4.1", scope: str = "full",
+                 model_factory: Optional[str] = None):
+        """
+        Initialize the pool.
+
+        Args:
+            workers: Number of worker processes
+            model_name: OpenAI model name of the agents
+            scope: Agent scope, see agent.build_graph
+            model_factory: "module:function" returning the chat model instead, e.g. a fake model for load tests
+        """
+        if os.getenv("AGENT_CHECKPOINTER", "memory") == "sqlite":
+            # The workers run every turn on the async path, which SqliteSaver does not implement
+            raise ValueError("AGENT_CHECKPOINTER=sqlite only supports the sync Agent.invoke path; "
+                             "run the server with AGENT_CHECKPOINTER=memory")
+        self.size = max(1, workers)
+        self.model_name = model_name
+        self.scope = scope
+        self.model_factory = model_factory
+        self._context = multiprocessing.get_context("spawn")
+        self._inboxes: List[Any] = []
+        self._processes: List[Any] = []
+        self._outbox = None
+        self._reader = None
+        self._pending: Dict[str, Any] = {}
+        self._ids = itertools.count()
+
+    def start(self):
+        self._outbox = self._context.Queue()
+        for _ in range(self.size):
+            inbox = self._context.Queue()
+            process = self._context.Process(
+                target=_worker_main,
+                args=(inbox, self._outbox, self.model_name, self.scope, self.model_factory),
+                daemon=True
+            )
+            process.start()
+            self._inboxes.append(inbox)
+            self._processes.append(process)
+        self._reader = threading.Thread(target=self._read_events, name="worker-events", daemon=True)
+        self._reader.start()
+
+    def stop(self):
+        for inbox in self._inboxes:
+            inbox.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        if self._outbox is not None:
+            self._outbox.put(None)
+            self._reader.join(timeout=10)
+        for queue in (*self._inboxes, self._outbox):
+            if queue is not None:
+                queue.close()
+                queue.join_thread()
+        self._inboxes, self._processes, self._outbox = [], [], None
+
+    def _read_events(self):
+        while True:
+            event = self._outbox.get()
+            if event is None:
+                return
+            target = self._pending.get(event[0])
+            if target is not None:
+                loop, queue = target
+                loop.call_soon_threadsafe(queue.put_nowait, event[1:])
+
+    def worker_of(self, thread_id: str) -> int:
+        return zlib.crc32(thread_id.encode("utf-8")) % self.size
+
+    async def submit(self, kind: str, role: str, thread_id: str, timeout: float, **fields) -> AsyncIterator:
+        """
+        Send a request to the worker of its thread and yield its (event, value) pairs up to "done" or "error".
+
+        If the caller stops before the last event (timeout or client disconnect), the worker is
+        told to cancel the request.
+
+        Raises:
+            asyncio.TimeoutError: If the worker sends no event within `timeout` seconds
+        """
+        request_id = f"{os.getpid()}-{next(self._ids)}"
+        queue = asyncio.Queue()
+        self._pending[request_id] = (asyncio.get_running_loop(), queue)
+        inbox = self._inboxes[self.worker_of(thread_id)]
+        finished = False
+        try:
+            inbox.put({"id": request_id, "kind": kind, "role": role, "thread_id": thread_id, **fields})
+            while True:
+                event, value = await asyncio.wait_for(queue.get(), timeout)
+                finished = event in ("done", "error")
+                yield event, value
+                if finished:
+                    return
+        finally:
+            del self._pending[request_id]
+            if not finished:
+                inbox.put({"id": request_id, "kind": "cancel"})
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "workers": self.size,
+            "alive": sum(process.is_alive() for process in self._processes),
+            "pending": len(self._pending)
+        }
+
+
+def create_app(pool: Optional[WorkerPool] = None, admission: Optional[Admission] = None,
+               request_timeout: Optional[float] = None) -> FastAPI:
+    """
+    Build the server application.
+
+    Args:
+        pool: Worker pool, by default SERVER_WORKERS processes (default: number of CPUs)
+            running AGENT_MODEL (default gpt-4.1) with AGENT_SCOPE
+        admission: Admission limits, by default from the SERVER_* environment variables
+        request_timeout: Seconds to wait for the next event of a worker (env SERVER_REQUEST_TIMEOUT, default 120)
+
+    Returns:
+        The FastAPI application, it starts and stops the pool with its lifespan
+    """
+    if pool is None:
+        pool = WorkerPool(
+            int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1))),
+            model_name=os.getenv("AGENT_MODEL", "gpt-4.1"),
+            scope=os.getenv("AGENT_SCOPE", "full"),
+            model_factory=os.getenv("AGENT_MODEL_FACTORY")
+        )
+    if request_timeout is None:
+        request_timeout = float(os.getenv("SERVER_REQUEST_TIMEOUT", "120"))
+    state = {"admission": admission}
+    # Role of each thread, as many as the workers' checkpointers keep
+    thread_roles: "OrderedDict[str, str]" = OrderedDict()
+    max_threads = int(os.getenv("AGENT_CHECKPOINT_MAX_THREADS", "1000")) * pool.size
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # The semaphores belong to the server's event loop, so they are created here
+        if state["admission"] is None:
+            state["admission"] = Admission(
+                parse_role_limits(os.getenv("SERVER_ROLE_CONCURRENCY")),
+                max_queue=int(os.getenv("SERVER_MAX_QUEUE", "64")),
+                queue_timeout=float(os.getenv("SERVER_QUEUE_TIMEOUT", "10"))
+            )
+        await asyncio.to_thread(pool.start)
+        yield
+        await asyncio.to_thread(pool.stop)
+        await aclose_transport()
+
+    app = FastAPI(title="Agente Universidad Austral", lifespan=lifespan)
+
+    def check_role(role: str):
+        if role not in ROLES:
+            raise HTTPException(422, f"Unknown role '{role}', expected one of {', '.join(ROLES)}")
+
+    def claim_thread(thread_id: str, role: str) -> bool:
+        """Bind a thread to the role of its first request. Returns False if it belongs to another role."""
+        owner = thread_roles.setdefault(thread_id, role)
+        thread_roles.move_to_end(thread_id)
+        while len(thread_roles) > max_threads:
+            thread_roles.popitem(last=False)
+        return owner == role
+
+    async def turn_events(request: ChatRequest, stream: bool) -> AsyncIterator[Dict[str, Any]]:
+        thread_id = request.thread_id or str(uuid.uuid4())
+        if not claim_thread(thread_id, request.role):
+            yield {"type": "error", "status": 403, "error": "The thread belongs to another role"}
+            return
+        try:
+            async with state["admission"].slot(request.role):
+                events = pool.submit("chat", request.role, thread_id, request_timeout,
+                                     message=request.message, stream=stream)
+                async for event, value in events:
+                    if event == "token":
+                        yield {"type": "token", "content": value}
+                    elif event == "done":
+                        yield {"type": "done", "thread_id": thread_id, "answer": value}
+                    else:
+                        yield {"type": "error", "status": 500, "error": value}
+        except Overloaded as e:
+            yield {"type": "error", "status": 503, "error": str(e)}
+        except asyncio.TimeoutError:
+            yield {"type": "error", "status": 504, "error": "The agent did not answer in time"}
+
+    async def call(kind: str, role: str, thread_id: str) -> Any:
+        check_role(role)
+        if thread_roles.get(thread_id, role) != role:
+            raise HTTPException(403, "The thread belongs to another role")
+        try:
+            async with aclosing(pool.submit(kind, role, thread_id, request_timeout)) as events:
+                async for event, value in events:
+                    if event == "error":
+                        raise HTTPException(500, value)
+                    return value
+        except asyncio.TimeoutError:
+            raise HTTPException(504, "The agent did not answer in time") from None
+
+    def error_response(event: Dict[str, Any]) -> JSONResponse:
+        headers = {"Retry-After": "1"} if event["status"] == 503 else None
+        return JSONResponse({"error": event["error"]}, status_code=event["status"], headers=headers)
+
+    @app.post("/chat")
+    async def chat(request: ChatRequest):
+        check_role(request.role)
+        async with aclosing(turn_events(request, stream=False)) as events:
+            async for event in events:
+                if event["type"] == "error":
+                    return error_response(event)
+                return {"thread_id": event["thread_id"], "answer": event["answer"]}
+
+    @app.post("/chat/stream")
+    async def chat_stream(request: ChatRequest):
+        check_role(request.role)
+        events = turn_events(request, stream=True)
+        # Rejections are answered with a status code before the stream starts
+        first = await anext(events)
+        if first["type"] == "error" and first["status"] in (403, 503):
+            await events.aclose()
+            return error_response(first)
+
+        async def lines():
+            # Closing the events on a client disconnect frees the role slot right away
+            async with aclosing(events):
+                yield json.dumps(first, ensure_ascii=False) + "\n"
+                async for event in events:
+                    yield json.dumps(event, ensure_ascii=False) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.websocket("/ws")
+    async def chat_socket(websocket: WebSocket):
+        await websocket.accept()
+        try:
+            while True:
+                try:
+                    request = ChatRequest(**await websocket.receive_json())
+                except ValueError as e:
+                    await websocket.send_json({"type": "error", "status": 422, "error": str(e)})
+                    continue
+                if request.role not in ROLES:
+                    await websocket.send_json({"type": "error", "status": 422, "error": f"Unknown role '{request.role}'"})
+                    continue
+                async with aclosing(turn_events(request, stream=True)) as events:
+                    async for event in events:
+                        await websocket.send_json(event)
+        except WebSocketDisconnect:
+            pass
+
+    @app.get("/threads/{thread_id}/messages")
+    async def thread_messages(thread_id: str, role: str):
+        return await call("history", role, thread_id)
+
+    @app.delete("/threads/{thread_id}")
+    async def delete_thread(thread_id: str, role: str):
+        await call("end", role, thread_id)
+        thread_roles.pop(thread_id, None)
+        return {"thread_id": thread_id, "deleted": True}
+
+    @app.get("/health")
+    async def health():
+        admission = state["admission"]
+        return {
+            "status": "ok" if pool.snapshot()["alive"] == pool.size else "degraded",
+            "time": time.time(),
+            "pool": pool.snapshot(),
+            "admission": admission.snapshot() if admission is not None else None
+        }
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, help="Agent worker processes (default SERVER_WORKERS or the CPU count)")
+    parser.add_argument("--model-factory", help="module:function returning the chat model, e.g. for a fake model")
+    args = parser.parse_args()
+
+    if args.workers is not None:
+        os.environ["SERVER_WORKERS"] = str(args.workers)
+    if args.model_factory:
+        os.environ["AGENT_MODEL_FACTORY"] = args.model_factory
+    uvicorn.run(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The graphs build OpenAI clients on import paths that are never called in the tests
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("AGENT_TRACING", "0")
@@ -0,0 +1,63 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+HEAVY = ["langchain_core", "langgraph", "numpy", "httpx", "pydantic"]
+
+
+def test_import_agent_loads_no_heavy_package():
+    code = f"import sys, json, agent; print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+    assert json.loads(result.stdout) == []
+
+
+def test_context_and_date_follow_the_static_prompt(monkeypatch):
+    import agent
+
+    class Day:
+        value = "2026-03-01"
+
+        @classmethod
+        def now(cls):
+            return cls
+
+        @classmethod
+        def strftime(cls, fmt):
+            return cls.value
+
+    monkeypatch.setattr(agent, "datetime", Day)
+    build = agent._with_context("STATIC", "Role: student. ")
+
+    (first,) = build({"messages": []})
+    Day.value = "2026-03-02"
+    second, message = build({"messages": ["hola"]})
+
+    assert first.content == "STATIC\nRole: student. Today's date is 2026-03-01."
+    # The date is read on every call, not when the graph is built
+    assert second.content.endswith("2026-03-02.")
+    assert message == "hola"
+
+
+def test_supervisor_prompt_prefix_is_the_same_for_every_role(monkeypatch):
+    import uuid
+
+    from langchain_core.messages import HumanMessage
+
+    from agent import Agent
+    from benchmarks.fake_model import FakeChatModel
+
+    monkeypatch.setenv("AGENT_RESPONSE_CACHE", "off")
+    model = FakeChatModel(latency=0, answer="Hola")
+    for role in ("alumno", "profesor", "administrativo"):
+        Agent(user_role=role, model=model, scope="full").invoke([HumanMessage(content="Hola")], thread_id=str(uuid.uuid4()))
+
+    prompts = [prompt for prompt in model._recent_prompts if "You are a team supervisor" in prompt]
+    assert len(prompts) == 3
+    shared = os.path.commonprefix(prompts)
+    # Tool catalog, routing and rules are all in the shared prefix, only the role follows
+    assert "When users ask how you can help" in shared
+    assert "Today's date" not in shared
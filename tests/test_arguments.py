@@ -0,0 +1,54 @@
+import pytest
+from pydantic import ValidationError
+
+from arguments import closest_choice
+from tools import ConsultaFaltas, ExamenRecordatorio
+
+MATERIAS = ("Microeconomia", "Contabilidad", "Derecho Comercial", "Estadística", "Finanzas Públicas")
+EXAMENES = ("Dirección Comercial", "Dirección Estratégica", "Dirección de Personas")
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("contabilidad", "Contabilidad"),
+    ("Estadistica", "Estadística"),
+    ("Estadísitca", "Estadística"),
+    ("Microeconomía", "Microeconomia"),
+    ("finanzas publicas", "Finanzas Públicas"),
+    ("Derecho Comercal", "Derecho Comercial"),
+])
+def test_case_accent_and_typo_differences_are_corrected(value, expected):
+    assert closest_choice(value, MATERIAS)[0] == expected
+
+
+@pytest.mark.parametrize("value, choices", [
+    ("Macroeconomía", MATERIAS),
+    ("Economía", MATERIAS),
+    ("Estadistica II", MATERIAS),
+    ("Derecho", MATERIAS),
+    ("Gestión de Personas", EXAMENES),
+    ("Dirección", EXAMENES),
+])
+def test_other_courses_are_not_swapped_for_a_choice(value, choices):
+    match, suggestions = closest_choice(value, choices)
+    assert match is None
+    assert suggestions
+
+
+def test_near_miss_fails_validation_with_suggestions():
+    with pytest.raises(ValidationError, match="Derecho Comercial"):
+        ConsultaFaltas(dni=44852795, materias=["Derecho"])
+    with pytest.raises(ValidationError, match="Dirección de Personas"):
+        ExamenRecordatorio(mail="a@austral.edu.ar", accion="Consulta", materia="Gestión de Personas")
+
+
+def test_only_values_that_would_fail_validation_count_as_normalized():
+    from arguments import collect_normalized
+    from tools import SIUTema
+
+    with collect_normalized() as normalized:
+        SIUTema(nombreProfesor="juan", materia="IA", horas="2", fecha="13/6")
+    assert normalized == []
+
+    with collect_normalized() as normalized:
+        ConsultaFaltas(dni=44852795, materias=["contabilidad"])
+    assert normalized == ["materias"]
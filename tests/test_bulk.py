@@ -0,0 +1,82 @@
+import csv
+import threading
+
+import pytest
+
+from bulk import read_rows, run_bulk, write_report
+from ratelimit import BACKGROUND, current_priority
+from tool_registry import registry
+
+
+def gasto(monto):
+    return {"fecha": "2025-03-01", "nombre": "Ana", "categoria": "Comida",
+            "descripcion": "Almuerzo", "monto": monto, "estado": "pendiente"}
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def invoke(name, arguments, use_cache=True):
+        with lock:
+            calls.append({"payload": arguments, "use_cache": use_cache, "priority": current_priority()})
+        if arguments["monto"] == "0":
+            return {"error": "HTTP 500", "status": "failed"}
+        return {"reembolsable": True}
+
+    monkeypatch.setattr(registry, "invoke", invoke)
+    return calls
+
+
+def test_nothing_is_submitted_if_a_row_is_invalid(submitted):
+    rows = [gasto("100"), {"fecha": "2025-03-02"}, gasto("200")]
+
+    report = run_bulk("procesar_redencion_gastos", rows)
+
+    assert submitted == []
+    assert report.counts == {"ok": 0, "failed": 0, "invalid": 1, "skipped": 2}
+    assert "nombre" in report.results[1]["error"]
+
+
+def test_valid_rows_are_submitted_in_the_background(submitted):
+    rows = [gasto(str(n)) for n in range(10)] + [{"monto": "5"}]
+    progress = []
+
+    report = run_bulk("procesar_redencion_gastos", rows, concurrency=3, skip_invalid=True,
+                      on_progress=lambda report: progress.append(report.done))
+
+    assert len(submitted) == 10
+    assert all(call["priority"] == BACKGROUND and not call["use_cache"] for call in submitted)
+    assert [result["row"] for result in report.results] == list(range(1, 12))
+    assert report.results[0]["status"] == "failed"
+    assert report.counts == {"ok": 9, "failed": 1, "invalid": 1, "skipped": 0}
+    assert progress == list(range(2, 12))
+
+
+def test_dry_run_only_validates(submitted):
+    report = run_bulk("procesar_redencion_gastos", [gasto("100")], dry_run=True)
+
+    assert submitted == []
+    assert report.counts["skipped"] == 1
+
+
+def test_only_registered_tools_are_accepted():
+    with pytest.raises(ValueError, match="Unknown tool"):
+        run_bulk("no_existe", [])
+
+
+def test_csv_report_has_one_line_per_row(submitted, tmp_path):
+    source = tmp_path / "gastos.csv"
+    with open(source, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(gasto("1")))
+        writer.writeheader()
+        writer.writerows([gasto("0"), gasto("50")])
+
+    report = run_bulk("procesar_redencion_gastos", read_rows(str(source)))
+    write_report(report, str(tmp_path / "resultado.csv"))
+    lines = read_rows(str(tmp_path / "resultado.csv"))
+
+    assert [(line["row"], line["status"], line["monto"]) for line in lines] == [("1", "failed", "0"), ("2", "ok", "50")]
+    assert lines[0]["error"] == "HTTP 500"
+    assert lines[1]["response"] == '{"reembolsable": true}'
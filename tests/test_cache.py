@@ -0,0 +1,67 @@
+import pytest
+
+import cache
+from cache import MISS, SQLiteCache, TTLCache, make_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_key_ignores_payload_order():
+    assert make_key("deuda", {"dni": "1", "mes": 2}) == make_key("deuda", {"mes": 2, "dni": "1"})
+    assert make_key("deuda", {"dni": "1"}) != make_key("pagos", {"dni": "1"})
+
+
+def test_ttl_cache_entries_expire(clock):
+    store = TTLCache()
+    store.set("a", None, ttl=10)
+
+    clock[0] += 9
+    assert store.get("a") is None
+    clock[0] += 1
+    assert store.get("a") is MISS
+
+
+def test_ttl_cache_evicts_the_least_recently_used(clock):
+    store = TTLCache(maxsize=2)
+    store.set("a", 1, ttl=60)
+    store.set("b", 2, ttl=60)
+    store.get("a")
+    store.set("c", 3, ttl=60)
+
+    assert store.get("b") is MISS
+    assert (store.get("a"), store.get("c")) == (1, 3)
+
+
+def test_sqlite_cache_entries_expire(tmp_path, clock):
+    store = SQLiteCache(str(tmp_path / "cache.db"))
+    store.set("a", {"saldo": 0}, ttl=10)
+
+    assert store.get("a") == {"saldo": 0}
+    clock[0] += 10
+    assert store.get("a") is MISS
+
+
+def test_sqlite_cache_evicts_the_least_recently_used(tmp_path, clock):
+    store = SQLiteCache(str(tmp_path / "cache.db"), maxsize=2)
+    store.set("a", 1, ttl=60)
+    clock[0] += 1
+    store.set("b", 2, ttl=60)
+    clock[0] += 1
+    store.get("a")
+    clock[0] += 1
+    store.set("c", 3, ttl=60)
+
+    assert store.get("b") is MISS
+    assert (store.get("a"), store.get("c")) == (1, 3)
+
+
+def test_sqlite_cache_is_shared_between_connections(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    SQLiteCache(path).set("a", [1, 2], ttl=60)
+
+    assert SQLiteCache(path).get("a") == [1, 2]
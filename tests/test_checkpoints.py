@@ -0,0 +1,40 @@
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+
+from checkpoints import BoundedMemorySaver
+
+
+def put(saver, thread_id):
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    saver.put(config, empty_checkpoint(), {}, {})
+
+
+def test_least_recently_used_threads_past_the_cap_are_deleted():
+    saver = BoundedMemorySaver(max_threads=2)
+    put(saver, "a")
+    put(saver, "b")
+    saver.get_tuple({"configurable": {"thread_id": "a", "checkpoint_ns": ""}})
+    put(saver, "c")
+
+    assert list(saver.last_used()) == ["a", "c"]
+    assert set(saver.storage) == {"a", "c"}
+
+
+def test_idle_threads_are_deleted_after_the_ttl():
+    now = [0.0]
+    saver = BoundedMemorySaver(max_threads=0, ttl=60, clock=lambda: now[0])
+    put(saver, "a")
+    now[0] = 30
+    put(saver, "b")
+    now[0] = 70
+    put(saver, "c")
+
+    assert set(saver.storage) == {"b", "c"}
+
+
+def test_server_rejects_the_sqlite_checkpointer(monkeypatch):
+    from server import WorkerPool
+
+    monkeypatch.setenv("AGENT_CHECKPOINTER", "sqlite")
+    with pytest.raises(ValueError, match="AGENT_CHECKPOINTER=memory"):
+        WorkerPool(1)
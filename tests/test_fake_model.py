@@ -0,0 +1,26 @@
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import tool
+
+from benchmarks.fake_model import FakeChatModel
+
+
+@tool
+def consultar(materia: str) -> str:
+    """Consulta una materia."""
+    return materia
+
+
+@tool
+def recordar(materia: str) -> str:
+    """Recuerda una materia."""
+    return materia
+
+
+def test_nested_list_of_calls_is_emitted_as_parallel_tool_calls():
+    model = FakeChatModel(latency=0, tool_calls=[
+        [{"name": "consultar", "args": {"materia": "IA"}}, {"name": "recordar", "args": {"materia": "IA"}}]
+    ])
+
+    message = model.bind_tools([consultar, recordar]).invoke([HumanMessage(content="hola")])
+
+    assert [call["name"] for call in message.tool_calls] == ["consultar", "recordar"]
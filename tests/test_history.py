@@ -0,0 +1,20 @@
+import logging
+import uuid
+
+from langchain_core.messages import HumanMessage
+
+from agent import Agent
+from benchmarks.fake_model import FakeChatModel
+
+
+def test_handoff_does_not_write_remaining_steps_to_the_outer_graph(caplog, monkeypatch):
+    monkeypatch.setenv("AGENT_RESPONSE_CACHE", "off")
+    model = FakeChatModel(latency=0, tool_calls=[{"name": "transfer_to_student_agent"}], answer="Listo")
+    agent = Agent(user_role="alumno", model=model)
+
+    with caplog.at_level(logging.WARNING, logger="langgraph"):
+        result = agent.invoke([HumanMessage(content="¿Cuántas faltas tengo?")], thread_id=str(uuid.uuid4()))
+
+    assert any(message.name == "student_agent" for message in result["messages"])
+    assert not [r for r in caplog.records if "unknown channel" in r.getMessage()]
+    assert not logging.getLogger("langgraph").filters
@@ -0,0 +1,22 @@
+import json
+import subprocess
+import sys
+
+from conftest import ROOT
+from jobs import JobQueue
+
+
+def test_status_cli_does_not_claim_jobs(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    queue = JobQueue(path)
+    job_id = queue.enqueue("crear_post_linkedin", {"contenido_texto": "Hola", "url_imagen": "https://x/y.png"})
+
+    result = subprocess.run(
+        [sys.executable, "jobs.py", job_id], cwd=ROOT, capture_output=True, text=True, check=True,
+        env={"AGENT_JOBS_DB": path, "PATH": ""}
+    )
+
+    assert json.loads(result.stdout)["status"] == "queued"
+    job = queue.get(job_id)
+    assert job["status"] == "queued"
+    assert job["attempts"] == 0
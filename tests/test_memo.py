@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import memo
+from memo import ToolMemo
+
+
+class Webhook:
+    """Counts the requests and answers with the request number."""
+
+    def __init__(self, result=None):
+        self.calls = 0
+        self.result = result
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        return self.result if self.result is not None else {"request": self.calls}
+
+
+def test_identical_calls_in_flight_share_one_request():
+    tool_memo = ToolMemo()
+    webhook = Webhook()
+
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(tool_memo.call, "t1", "k", "consultar_faltas", webhook) for _ in range(4)]
+        while tool_memo.snapshot().get("consultar_faltas", {}).get("calls", 0) < 4:
+            time.sleep(0.001)
+        webhook.release.set()
+        results = [future.result() for future in futures]
+
+    assert webhook.calls == 1
+    assert results == [{"request": 1}] * 4
+    assert tool_memo.snapshot()["consultar_faltas"] == {"calls": 4, "webhook_calls": 1, "reused": 0, "joined": 3, "saved": 3}
+
+
+def test_async_calls_in_flight_share_one_request():
+    tool_memo = ToolMemo()
+    calls = []
+
+    async def execute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"faltas": 2}
+
+    async def run():
+        return await asyncio.gather(*[tool_memo.acall("t1", "k", "consultar_faltas", execute) for _ in range(3)])
+
+    assert asyncio.run(run()) == [{"faltas": 2}] * 3
+    assert len(calls) == 1
+
+
+def test_results_are_reused_only_within_their_conversation(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(memo.time, "time", lambda: now[0])
+    tool_memo = ToolMemo(ttl=60)
+    webhook = Webhook()
+    webhook.release.set()
+
+    assert tool_memo.call("t1", "k", "consultar_faltas", webhook) == {"request": 1}
+    assert tool_memo.call("t1", "k", "consultar_faltas", webhook) == {"request": 1}
+    assert tool_memo.call("t2", "k", "consultar_faltas", webhook) == {"request": 2}
+    now[0] += 60
+    assert tool_memo.call("t1", "k", "consultar_faltas", webhook) == {"request": 3}
+    tool_memo.forget("t1")
+    assert tool_memo.call("t1", "k", "consultar_faltas", webhook) == {"request": 4}
+
+
+def test_failures_are_shared_but_not_reused():
+    tool_memo = ToolMemo()
+    webhook = Webhook({"error": "HTTP 500", "status": "failed"})
+    webhook.release.set()
+
+    tool_memo.call("t1", "k", "consultar_faltas", webhook)
+    tool_memo.call("t1", "k", "consultar_faltas", webhook)
+
+    assert webhook.calls == 2
+
+    def boom():
+        raise TimeoutError("webhook")
+
+    with pytest.raises(TimeoutError):
+        tool_memo.call("t1", "k", "consultar_faltas", boom)
+    assert tool_memo.call("t1", "k", "consultar_faltas", lambda: "ok") == "ok"
+
+
+def test_least_recently_used_conversations_are_dropped():
+    tool_memo = ToolMemo(max_threads=2)
+    for thread_id in ("t1", "t2", "t1", "t3"):
+        tool_memo.call(thread_id, "k", "consultar_faltas", lambda: thread_id)
+
+    assert list(tool_memo._results) == ["t1", "t3"]
+
+
+def test_conversation_is_read_from_the_graph_run():
+    from langchain_core.runnables import RunnableLambda
+
+    seen = RunnableLambda(lambda _: memo.current_thread_id()).invoke(None, {"configurable": {"thread_id": 42}})
+
+    assert seen == "42"
+    assert memo.current_thread_id() is None
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage
+
+import parallel
+from parallel import ToolScheduler
+
+
+@pytest.fixture(autouse=True)
+def serial_tools(monkeypatch):
+    monkeypatch.setattr(parallel, "_is_serial", lambda name: name.startswith("serial"))
+
+
+def turn(*names):
+    calls = [{"name": name, "args": {}, "id": f"call_{i}", "type": "tool_call"} for i, name in enumerate(names)]
+    state = {"messages": [AIMessage(content="", tool_calls=calls)]}
+    return [SimpleNamespace(tool_call=call, state=state) for call in calls]
+
+
+class Recorder:
+    """Tool executions that record when each call starts and ends."""
+
+    def __init__(self, seconds=0.05):
+        self.seconds = seconds
+        self.events = []
+        self._lock = threading.Lock()
+
+    def _log(self, event, request):
+        with self._lock:
+            self.events.append((event, request.tool_call["name"]))
+
+    def execute(self, request):
+        self._log("start", request)
+        time.sleep(self.seconds)
+        self._log("end", request)
+        return request.tool_call["name"]
+
+    async def aexecute(self, request):
+        self._log("start", request)
+        await asyncio.sleep(self.seconds)
+        self._log("end", request)
+        return request.tool_call["name"]
+
+    def position(self, event, name):
+        return self.events.index((event, name))
+
+
+def assert_serial_order(recorder):
+    # serial_a runs alone first, the two lookups together, serial_b after both
+    assert recorder.position("end", "serial_a") < recorder.position("start", "lookup_1")
+    assert recorder.position("end", "serial_a") < recorder.position("start", "lookup_2")
+    assert recorder.position("start", "lookup_2") < recorder.position("end", "lookup_1")
+    assert recorder.position("end", "lookup_1") < recorder.position("start", "serial_b")
+    assert recorder.position("end", "lookup_2") < recorder.position("start", "serial_b")
+
+
+def test_async_calls_keep_serial_tools_in_order():
+    scheduler, recorder = ToolScheduler(max_concurrency=4), Recorder()
+    requests = turn("serial_a", "lookup_1", "lookup_2", "serial_b")
+
+    async def run():
+        # Started in reverse, so the order comes from the scheduler
+        return await asyncio.gather(*(scheduler.awrap(r, recorder.aexecute) for r in reversed(requests)))
+
+    assert asyncio.run(run()) == ["serial_b", "lookup_2", "lookup_1", "serial_a"]
+    assert_serial_order(recorder)
+    assert not scheduler._batches
+
+
+def test_sync_calls_keep_serial_tools_in_order():
+    scheduler, recorder = ToolScheduler(max_concurrency=4), Recorder()
+    threads = [threading.Thread(target=scheduler.wrap, args=(r, recorder.execute))
+               for r in reversed(turn("serial_a", "lookup_1", "lookup_2", "serial_b"))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert_serial_order(recorder)
+    assert not scheduler._batches
+
+
+def test_max_concurrency_bounds_the_calls_of_a_turn():
+    scheduler, recorder = ToolScheduler(max_concurrency=1), Recorder(seconds=0.01)
+
+    async def run():
+        await asyncio.gather(*(scheduler.awrap(r, recorder.aexecute) for r in turn("a", "b", "c")))
+
+    asyncio.run(run())
+
+    assert [event for event, _ in recorder.events] == ["start", "end"] * 3
+
+
+def test_sync_and_async_calls_of_a_turn_share_the_order():
+    scheduler, recorder = ToolScheduler(max_concurrency=4), Recorder()
+    serial, lookup = turn("serial_a", "lookup_1")
+
+    async def run_lookup():
+        return await scheduler.awrap(lookup, recorder.aexecute)
+
+    thread = threading.Thread(target=scheduler.wrap, args=(serial, recorder.execute))
+    thread.start()
+    # An async call on another loop is woken when the sync call finishes
+    assert asyncio.run(asyncio.wait_for(run_lookup(), 5)) == "lookup_1"
+    thread.join(5)
+
+    assert recorder.position("end", "serial_a") < recorder.position("start", "lookup_1")
+    assert not scheduler._batches
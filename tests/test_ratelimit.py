@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+
+from ratelimit import BACKGROUND, INTERACTIVE, TokenBucket, current_priority, parse_limits, request_priority
+
+
+def empty_bucket(rate=20.0):
+    bucket = TokenBucket(rate, burst=1)
+    assert bucket.acquire()
+    return bucket
+
+
+def wait_in_line(bucket, order, name, priority):
+    # Return once the call is in line, so that the arrival order is the order of the calls
+    joined = threading.Event()
+    join = bucket._join
+
+    def join_and_signal(cost, priority):
+        ticket = join(cost, priority)
+        joined.set()
+        return ticket
+
+    bucket._join = join_and_signal
+    thread = threading.Thread(target=lambda: bucket.acquire(priority=priority) and order.append(name))
+    thread.start()
+    assert joined.wait(5)
+    del bucket._join
+    return thread
+
+
+def test_interactive_calls_overtake_background_ones():
+    bucket = empty_bucket()
+    order = []
+
+    threads = [
+        wait_in_line(bucket, order, "background", BACKGROUND),
+        wait_in_line(bucket, order, "interactive", INTERACTIVE)
+    ]
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ["interactive", "background"]
+    priorities = bucket.snapshot()["priorities"]
+    assert priorities["background"]["delayed"] == 1
+    assert priorities["background"]["max_wait_seconds"] > priorities["interactive"]["max_wait_seconds"]
+
+
+def test_calls_of_the_same_priority_keep_their_order():
+    bucket = empty_bucket()
+    order = []
+
+    threads = [wait_in_line(bucket, order, n, INTERACTIVE) for n in range(3)]
+    for thread in threads:
+        thread.join(5)
+
+    assert order == [0, 1, 2]
+
+
+def test_timed_out_call_leaves_the_line():
+    bucket = empty_bucket(rate=1)
+
+    assert not bucket.acquire(timeout=0.01)
+    assert bucket.snapshot()["waiting"] == 0
+    assert bucket.snapshot()["priorities"]["interactive"]["timeouts"] == 1
+
+
+def test_priority_comes_from_the_context():
+    bucket = empty_bucket(rate=1000)
+    assert current_priority() == INTERACTIVE
+
+    async def run():
+        with request_priority(BACKGROUND):
+            return current_priority(), await bucket.aacquire()
+
+    assert asyncio.run(run()) == (BACKGROUND, True)
+    assert current_priority() == INTERACTIVE
+    assert "background" in bucket.snapshot()["priorities"]
+
+
+def test_pause_holds_every_caller():
+    bucket = TokenBucket(1000, burst=10)
+    bucket.pause(0.05)
+
+    start = time.monotonic()
+    assert bucket.acquire()
+
+    assert time.monotonic() - start >= 0.04
+    assert bucket.snapshot()["throttled"] == 1
+
+
+def test_limits_are_parsed_per_host():
+    assert parse_limits("*=5:10, hook.us1.make.com=2") == {"*": (5.0, 10.0), "hook.us1.make.com": (2.0, None)}
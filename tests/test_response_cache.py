@@ -0,0 +1,74 @@
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pytest
+from langchain_core.messages import HumanMessage
+
+import response_cache
+from agent import Agent
+from benchmarks.fake_model import FakeChatModel
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = response_cache.create_response_cache("hash")
+    monkeypatch.setattr(response_cache, "_response_cache", cache)
+    return cache
+
+
+def test_first_turn_is_served_from_cache(cache):
+    model = FakeChatModel(latency=0, answer="¡Hola! ¿En qué te ayudo?")
+    agent = Agent(user_role="alumno", model=model)
+    agent.invoke([HumanMessage(content="hola")], thread_id=str(uuid.uuid4()))
+    calls = len(model._recent_prompts)
+
+    answer = agent.invoke([HumanMessage(content="hola")], thread_id=str(uuid.uuid4()))
+
+    assert len(model._recent_prompts) == calls
+    assert answer["messages"][-1].content == "¡Hola! ¿En qué te ayudo?"
+
+
+def test_follow_up_turn_is_not_served_from_cache(cache):
+    model = FakeChatModel(latency=0, answer="Respuesta")
+    agent = Agent(user_role="alumno", model=model)
+    agent.invoke([HumanMessage(content="Consulta")], thread_id=str(uuid.uuid4()))
+
+    thread_id = str(uuid.uuid4())
+    agent.invoke([HumanMessage(content="buenas tardes")], thread_id=thread_id)
+    calls = len(model._recent_prompts)
+    agent.invoke([HumanMessage(content="Consulta")], thread_id=thread_id)
+
+    # The model answered the follow-up with the thread's history, instead of the cached first turn
+    assert len(model._recent_prompts) > calls
+    history = agent.get_history(thread_id)
+    assert [m.content for m in history if isinstance(m, HumanMessage)] == ["buenas tardes", "Consulta"]
+
+
+def test_messages_with_different_numbers_do_not_share_an_entry(cache):
+    key = ("alumno", "full", "gpt-4.1")
+    answer, vector = cache.lookup(key, "mi DNI es 123")
+    cache.store(key, vector, "Tu DNI es 123", cacheable=True)
+
+    assert cache.lookup(key, "mi DNI es 456") == (None, None)
+    assert cache.metrics()["stores"] == 0
+
+
+def test_entries_are_kept_per_role_scope_and_model(cache):
+    answer, vector = cache.lookup(("alumno", "full", "gpt-4.1"), "¿qué podés hacer?")
+    cache.store(("alumno", "full", "gpt-4.1"), vector, "Puedo consultar tus faltas", cacheable=True)
+
+    assert cache.lookup(("alumno", "full", "gpt-4.1"), "¿qué podés hacer?")[0] == "Puedo consultar tus faltas"
+    for key in (("profesor", "full", "gpt-4.1"), ("alumno", "single", "gpt-4.1"), ("alumno", "full", "gpt-4.1-mini")):
+        assert cache.lookup(key, "¿qué podés hacer?")[0] is None
+
+
+def test_answers_expire_at_midnight(monkeypatch):
+    index = response_cache.VectorIndex(maxsize=2, ttl=24 * 3600)
+    late = datetime(2025, 6, 13, 23, 59).timestamp()
+    monkeypatch.setattr(response_cache.time, "time", lambda: late)
+    index.add(np.ones(4, dtype=np.float32) / 2, "Hoy es 13/06")
+    assert index.search(np.ones(4, dtype=np.float32) / 2, 0.9) == "Hoy es 13/06"
+
+    monkeypatch.setattr(response_cache.time, "time", lambda: late + 120)
+    assert index.search(np.ones(4, dtype=np.float32) / 2, 0.9) is None
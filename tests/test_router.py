@@ -0,0 +1,36 @@
+import uuid
+
+from langchain_core.messages import HumanMessage
+
+from agent import build_graph
+from benchmarks.fake_model import FakeChatModel
+from checkpoints import BoundedMemorySaver
+
+
+def run_turn(monkeypatch, threshold):
+    monkeypatch.setenv("AGENT_ROUTER_THRESHOLD", str(threshold))
+    graph = build_graph(FakeChatModel(latency=0, answer="Tenés 2 faltas"), "alumno", checkpointer=BoundedMemorySaver(),
+                        router=True)
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    return graph, graph.invoke({"messages": [HumanMessage(content="¿Cuántas faltas tengo en Contabilidad?")]}, config)
+
+
+def test_router_is_the_only_entry_point(monkeypatch):
+    graph, _ = run_turn(monkeypatch, 0)
+
+    assert [edge.target for edge in graph.get_graph().edges if edge.source == "__start__"] == ["router"]
+
+
+def test_router_dispatches_to_the_subagent(monkeypatch):
+    _, result = run_turn(monkeypatch, 0)
+
+    names = [message.name for message in result["messages"]]
+    assert result["messages"][1].response_metadata.get("routed_by") == "router"
+    assert "student_agent" in names
+    assert names[-1] == "supervisor"
+
+
+def test_router_falls_back_to_the_supervisor(monkeypatch):
+    _, result = run_turn(monkeypatch, 1.01)
+
+    assert [message.name for message in result["messages"][1:]] == ["supervisor"]
@@ -0,0 +1,205 @@
+import asyncio
+import queue
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import HumanMessage
+
+import webhooks
+from remote_agent import RemoteAgent, ServerBusyError
+from server import ROLES, Admission, WorkerPool, _serve, create_app
+
+
+class FakePool:
+    """Pool that answers in the front process, after `delay` seconds, with the tokens of `answer`."""
+
+    size = 1
+
+    def __init__(self, answer=("Ho", "la"), delay=0.0):
+        self.answer = answer
+        self.delay = delay
+        self.requests = []
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def snapshot(self):
+        return {"workers": 1, "alive": 1, "pending": 0}
+
+    async def submit(self, kind, role, thread_id, timeout, **fields):
+        self.requests.append((kind, role, thread_id))
+        if kind == "chat":
+            await asyncio.wait_for(asyncio.sleep(self.delay), timeout)
+            if fields.get("stream"):
+                for token in self.answer:
+                    yield "token", token
+            yield "done", "".join(self.answer)
+        elif kind == "history":
+            yield "done", []
+        else:
+            yield "done", None
+
+
+def client(pool=None, admission=None, request_timeout=5):
+    return TestClient(create_app(pool or FakePool(), admission, request_timeout))
+
+
+def test_chat_answers_through_the_pool():
+    with client() as http:
+        response = http.post("/chat", json={"role": "alumno", "message": "hola", "thread_id": "t1"})
+
+    assert response.json() == {"thread_id": "t1", "answer": "Hola"}
+
+
+def test_full_role_is_rejected_with_503():
+    admission = Admission(dict.fromkeys(ROLES, 0), max_queue=0, queue_timeout=0.1)
+    with client(admission=admission) as http:
+        response = http.post("/chat", json={"role": "alumno", "message": "hola"})
+        stream = http.post("/chat/stream", json={"role": "alumno", "message": "hola"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert stream.status_code == 503
+
+
+def test_slow_worker_is_answered_with_504():
+    with client(FakePool(delay=1), request_timeout=0.05) as http:
+        response = http.post("/chat", json={"role": "alumno", "message": "hola"})
+
+    assert response.status_code == 504
+
+
+def test_thread_is_bound_to_the_role_that_started_it():
+    pool = FakePool()
+    with client(pool) as http:
+        http.post("/chat", json={"role": "alumno", "message": "hola", "thread_id": "t1"})
+        chat = http.post("/chat", json={"role": "profesor", "message": "hola", "thread_id": "t1"})
+        stream = http.post("/chat/stream", json={"role": "profesor", "message": "hola", "thread_id": "t1"})
+        history = http.get("/threads/t1/messages", params={"role": "profesor"})
+        deleted = http.delete("/threads/t1", params={"role": "alumno"})
+        reused = http.post("/chat", json={"role": "profesor", "message": "hola", "thread_id": "t1"})
+
+    assert (chat.status_code, stream.status_code, history.status_code) == (403, 403, 403)
+    assert deleted.status_code == 200
+    assert reused.status_code == 200
+    assert [request[1] for request in pool.requests] == ["alumno", "alumno", "profesor"]
+
+
+def fake_worker_pool():
+    pool = WorkerPool(1)
+    inbox = queue.Queue()
+    pool._inboxes = [inbox]
+    return pool, inbox
+
+
+def test_timed_out_request_is_cancelled_in_the_worker():
+    pool, inbox = fake_worker_pool()
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            async for _ in pool.submit("chat", "alumno", "t1", 0.05, message="hola"):
+                pass
+
+    asyncio.run(run())
+
+    request, cancel = inbox.get_nowait(), inbox.get_nowait()
+    assert cancel == {"id": request["id"], "kind": "cancel"}
+    assert not pool._pending
+
+
+def test_disconnected_request_is_cancelled_and_finished_one_is_not():
+    pool, inbox = fake_worker_pool()
+
+    async def run(events):
+        submitted = pool.submit("chat", "alumno", "t1", 5, message="hola")
+        first = asyncio.ensure_future(anext(submitted))
+        await asyncio.sleep(0)
+        (loop, pending), = pool._pending.values()
+        for event in events:
+            pending.put_nowait(event)
+        await first
+        if events[-1][0] == "done":
+            async for _ in submitted:
+                pass
+        await submitted.aclose()
+
+    asyncio.run(run([("token", "Ho")]))
+    request, cancel = inbox.get_nowait(), inbox.get_nowait()
+    assert cancel == {"id": request["id"], "kind": "cancel"}
+
+    asyncio.run(run([("token", "Ho"), ("done", "Hola")]))
+    inbox.get_nowait()
+    assert inbox.empty()
+
+
+def test_worker_cancels_a_running_turn():
+    started, cancelled = asyncio.Event(), []
+
+    class SlowAgent:
+        async def astream_answer(self, messages, thread_id=None):
+            started.set()
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.append(thread_id)
+                raise
+            yield "tarde"
+
+    inbox, outbox = queue.Queue(), queue.Queue()
+
+    async def run():
+        inbox.put({"id": "r1", "kind": "chat", "role": "alumno", "thread_id": "t1", "message": "hola"})
+        serving = asyncio.ensure_future(_serve(inbox, outbox, {"alumno": SlowAgent()}))
+        await asyncio.wait_for(started.wait(), 5)
+        inbox.put({"id": "r1", "kind": "cancel"})
+        inbox.put(None)
+        await asyncio.wait_for(serving, 5)
+
+    asyncio.run(run())
+
+    assert cancelled == ["t1"]
+    assert outbox.empty()
+
+
+def test_remote_agent_streams_and_reports_a_busy_server():
+    with client() as http:
+        agent = RemoteAgent("http://testserver", "alumno")
+        agent.client = http
+        tokens = list(agent.stream_answer([HumanMessage(content="hola")], thread_id="t1"))
+        history = agent.get_history("t1")
+
+    assert tokens == ["Ho", "la"]
+    assert history == []
+
+    admission = Admission(dict.fromkeys(ROLES, 0), max_queue=0, queue_timeout=0.1)
+    with client(admission=admission) as http:
+        agent = RemoteAgent("http://testserver", "alumno")
+        agent.client = http
+        with pytest.raises(ServerBusyError) as busy:
+            list(agent.stream_answer([HumanMessage(content="hola")], thread_id="t1"))
+
+    assert busy.value.retry_after == 1
+
+
+def test_worker_closes_its_webhook_connections_when_it_stops(monkeypatch):
+    transport = webhooks.WebhookTransport()
+    monkeypatch.setattr(webhooks, "_transport", transport)
+    clients = []
+
+    class WebhookAgent:
+        async def astream_answer(self, messages, thread_id=None):
+            loop = asyncio.get_running_loop()
+            clients.append(transport._async_client(loop))
+            transport._release(loop)
+            yield "ok"
+
+    inbox, outbox = queue.Queue(), queue.Queue()
+    inbox.put({"id": "r1", "kind": "chat", "role": "alumno", "thread_id": "t1", "message": "hola"})
+    inbox.put(None)
+    asyncio.run(_serve(inbox, outbox, {"alumno": WebhookAgent()}))
+
+    assert outbox.get_nowait() == ("r1", "done", "ok")
+    assert clients[0].is_closed
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import tiers
+from benchmarks.fake_model import FakeChatModel
+from tiers import ANSWER, ROUTING, TieredModel, TierMetrics, invalid_tool_call, node_model_names, tiered
+from tools import consultar_faltas
+
+FALTAS = [{"name": "consultar_faltas", "args": {"dni": 44852795}}]
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = TierMetrics()
+    monkeypatch.setattr(tiers, "tier_metrics", metrics)
+    return metrics
+
+
+def models(invalid_rate):
+    small = FakeChatModel(latency=0, tool_calls=FALTAS, invalid_tool_call_rate=invalid_rate)
+    large = FakeChatModel(latency=0, tool_calls=FALTAS)
+    return small, large
+
+
+def test_valid_tool_calls_stay_on_the_small_model(metrics):
+    small, large = models(0)
+    model = TieredModel("student_agent", small, large, tools=[consultar_faltas])
+    messages = [HumanMessage(content="¿Cuántas faltas tengo? DNI 44852795")]
+
+    response = model({"messages": messages}).invoke(messages)
+
+    assert response.tool_calls[0]["args"] == {"dni": 44852795}
+    assert (len(small._recent_prompts), len(large._recent_prompts)) == (1, 0)
+    assert metrics.snapshot() == {"student_agent": {"small": 1, "large": 0, "escalated": 0}}
+
+
+def test_invalid_tool_calls_are_made_again_with_the_large_model(metrics):
+    small, large = models(1)
+    model = TieredModel("student_agent", small, large, tools=[consultar_faltas])
+    messages = [HumanMessage(content="¿Cuántas faltas tengo? DNI 44852795")]
+
+    response = model({"messages": messages}).invoke(messages)
+    async_response = asyncio.run(model({"messages": messages}).ainvoke(messages))
+
+    assert response.tool_calls[0]["args"] == {"dni": 44852795}
+    assert async_response.tool_calls[0]["args"] == {"dni": 44852795}
+    assert (len(small._recent_prompts), len(large._recent_prompts)) == (2, 2)
+    assert metrics.snapshot()["student_agent"]["escalated"] == 2
+
+
+def test_answers_after_a_tool_result_go_to_the_large_model(metrics):
+    small, large = models(0)
+    model = TieredModel("supervisor", small, large, answers=True)
+    messages = [HumanMessage(content="Hola"), ToolMessage(content="{}", tool_call_id="1")]
+
+    assert model({"messages": messages}) is model._large
+    assert metrics.snapshot()["supervisor"]["large"] == 1
+
+
+def test_invalid_calls_are_told_apart():
+    tools = {"consultar_faltas": consultar_faltas}
+
+    def call(name, args):
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": "1"}])
+
+    assert invalid_tool_call(call("consultar_faltas", {"dni": 1}), tools) is None
+    assert invalid_tool_call(call("consultar_faltas", {}), tools).startswith("invalid arguments for consultar_faltas")
+    assert invalid_tool_call(call("borrar_todo", {}), tools) == "unknown tool borrar_todo"
+    assert invalid_tool_call(AIMessage(content="", invalid_tool_calls=[
+        {"name": "consultar_faltas", "args": "{dni", "id": "1", "error": None}
+    ]), tools) == "unparsable arguments for consultar_faltas"
+    assert invalid_tool_call(AIMessage(content="Hola"), tools) is None
+
+
+def test_nodes_without_a_small_model_use_the_large_one(monkeypatch):
+    monkeypatch.setenv("AGENT_NODE_MODELS", "routing=gpt-4.1-nano,professor_agent=gpt-4.1")
+    names = node_model_names("gpt-4.1", ["student_agent", "professor_agent"])
+
+    assert names == {ROUTING: "gpt-4.1-nano", ANSWER: "gpt-4.1",
+                     "student_agent": "gpt-4.1-mini", "professor_agent": "gpt-4.1"}
+
+    large = FakeChatModel(latency=0)
+    assert tiered("professor_agent", {ANSWER: large}, large) is large
+    assert isinstance(tiered(ROUTING, {ROUTING: FakeChatModel(latency=0), ANSWER: large}, large), TieredModel)
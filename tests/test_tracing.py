@@ -0,0 +1,119 @@
+import json
+import uuid
+
+import httpx
+import pytest
+from langchain_core.messages import HumanMessage
+
+import ratelimit
+import webhooks
+from agent import Agent
+from benchmarks.fake_model import FakeChatModel
+from ratelimit import RateLimiter
+from tracing import get_prompt_cache_metrics, get_session_summary, summarize_spans
+
+
+@pytest.fixture
+def traced(monkeypatch, tmp_path):
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setenv("AGENT_TRACING", "1")
+    monkeypatch.setenv("AGENT_TRACE_FILE", str(path))
+    monkeypatch.setenv("AGENT_RESPONSE_CACHE", "off")
+    monkeypatch.setenv("WEBHOOK_CACHE", "off")
+    monkeypatch.setenv("AGENT_TOOL_MEMO_TTL", "0")
+    monkeypatch.setattr(ratelimit, "_rate_limiter", RateLimiter({}))
+    transport = webhooks.WebhookTransport()
+    transport.client = httpx.Client(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, json={"faltas": 2})
+    ))
+    monkeypatch.setattr(webhooks, "_transport", transport)
+    yield path
+    transport.close()
+
+
+def spans_of(path):
+    (line,) = path.read_text(encoding="utf-8").splitlines()
+    otlp = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    return {span["spanId"]: span for span in otlp}
+
+
+def kind(span):
+    return next(a["value"]["stringValue"] for a in span["attributes"] if a["key"] == "agent.span_kind")
+
+
+def test_turn_is_exported_with_the_webhook_under_its_tool(traced):
+    model = FakeChatModel(latency=0, answer="Tenés 2 faltas", tool_calls=[
+        {"name": "transfer_to_student_agent"},
+        {"name": "consultar_faltas", "args": {"dni": 44852795}}
+    ])
+    agent = Agent(user_role="alumno", model=model)
+    thread_id = str(uuid.uuid4())
+
+    agent.invoke([HumanMessage(content="¿Cuántas faltas tengo?")], thread_id=thread_id)
+
+    spans = spans_of(traced)
+    by_kind = {}
+    for span in spans.values():
+        by_kind.setdefault(kind(span), []).append(span)
+    (turn,) = by_kind["turn"]
+    (tool,) = [span for span in by_kind["tool"] if span["name"] == "tool consultar_faltas"]
+    (webhook,) = by_kind["webhook"]
+    assert "parentSpanId" not in turn
+    assert webhook["parentSpanId"] == tool["spanId"]
+    assert webhook["kind"] == 3
+    assert len({span["traceId"] for span in spans.values()}) == 1
+    # The handoff travels as an exception but is not a failed span
+    assert all(span["status"]["code"] == 1 for span in spans.values())
+    assert {span["name"] for span in by_kind["node"]} >= {"supervisor", "student_agent"}
+
+    summary = get_session_summary(thread_id)
+    assert summary["turns"] == 1
+    assert summary["tool_calls"] == len(by_kind["tool"])
+    assert summary["webhook_calls"] == 1
+    assert summary["model_calls"] == len(by_kind["llm"])
+    assert summary["prompt_tokens"] > 0
+    assert summary["errors"] == 0
+
+
+def test_summary_adds_up_the_spans():
+    def span(kind, ms, error=None, **attributes):
+        return {"kind": kind, "start": 0, "end": int(ms * 1e6), "error": error, "attributes": attributes}
+
+    summary = summarize_spans([
+        span("turn", 100),
+        span("llm", 30, prompt_tokens=2000, cached_prompt_tokens=1024, completion_tokens=10),
+        span("llm", 20, prompt_tokens=500, completion_tokens=5),
+        span("tool", 40),
+        span("webhook", 35, error="HTTP 500"),
+        span("tool", 5, error="ValueError: dni")
+    ])
+
+    assert summary["duration_ms"] == 100
+    assert summary["model_calls"] == 2
+    assert summary["prompt_tokens"] == 2500
+    assert summary["cached_prompt_tokens"] == 1024
+    assert summary["tool_calls"] == 2
+    assert summary["webhook_errors"] == 1
+    # A failed webhook is reported by its tool, it is not counted twice
+    assert summary["errors"] == 1
+
+
+def test_cached_prompt_tokens_are_recorded_per_agent(traced, monkeypatch):
+    import tracing
+
+    metrics = tracing.PromptCacheMetrics()
+    monkeypatch.setattr(tracing, "prompt_cache_metrics", metrics)
+    model = FakeChatModel(latency=0, answer="Hola", cache_min_tokens=128)
+    agent = Agent(user_role="alumno", model=model)
+
+    agent.invoke([HumanMessage(content="Hola")], thread_id=str(uuid.uuid4()))
+    first = get_prompt_cache_metrics()["supervisor"]
+    agent.invoke([HumanMessage(content="Hola")], thread_id=str(uuid.uuid4()))
+    second = get_prompt_cache_metrics()["supervisor"]
+
+    assert (first["calls"], first["cached_tokens"]) == (1, 0)
+    assert second["calls"] == 2
+    assert second["hits"] == 1
+    assert 0 < second["cached_tokens"] < second["prompt_tokens"]
+    assert second["uncached_tokens"] == second["prompt_tokens"] - second["cached_tokens"]
+    assert second["cached_share"] == round(second["cached_tokens"] / second["prompt_tokens"], 3)
@@ -0,0 +1,56 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from transcript import Transcript, TranscriptEntry, entries_from_messages
+
+
+def fill(transcript, count):
+    for n in range(count):
+        transcript.append("user", f"mensaje {n}")
+
+
+def test_old_entries_are_dropped_without_a_spill_dir(monkeypatch):
+    monkeypatch.delenv("CHAT_TRANSCRIPT_DIR", raising=False)
+    transcript = Transcript("s1", max_entries=3)
+    fill(transcript, 5)
+
+    assert len(transcript) == 3
+    assert transcript.dropped == 2
+    assert [entry.content for entry in transcript.last(10)] == ["mensaje 2", "mensaje 3", "mensaje 4"]
+
+
+def test_old_entries_are_spilled_and_read_back_on_demand(tmp_path):
+    transcript = Transcript("s1", max_entries=3, spill_dir=str(tmp_path))
+    fill(transcript, 8)
+
+    assert len(transcript._entries) == 3
+    assert len(transcript) == 8
+    assert transcript.dropped == 0
+    assert [entry.content for entry in transcript.last(2)] == ["mensaje 6", "mensaje 7"]
+    assert [entry.content for entry in transcript.last(5)] == [f"mensaje {n}" for n in range(3, 8)]
+    assert transcript.last(100)[0] == TranscriptEntry("user", "mensaje 0")
+
+
+def test_clear_deletes_the_spill_file(tmp_path):
+    transcript = Transcript("s1", max_entries=1, spill_dir=str(tmp_path))
+    fill(transcript, 3)
+    assert (tmp_path / "s1.jsonl").exists()
+
+    transcript.clear()
+
+    assert len(transcript) == 0
+    assert not (tmp_path / "s1.jsonl").exists()
+
+
+def test_only_user_messages_and_supervisor_answers_are_kept():
+    messages = [
+        HumanMessage(content="¿Cuántas faltas tengo?"),
+        AIMessage(content="", name="supervisor", tool_calls=[{"name": "transfer_to_student_agent", "args": {}, "id": "1"}]),
+        ToolMessage(content="{\"faltas\": 2}", tool_call_id="1"),
+        AIMessage(content="Tenés 2 faltas en Contabilidad", name="student_agent"),
+        AIMessage(content="Tenés 2 faltas", name="supervisor")
+    ]
+
+    assert entries_from_messages(messages) == [
+        TranscriptEntry("user", "¿Cuántas faltas tengo?"),
+        TranscriptEntry("assistant", "Tenés 2 faltas")
+    ]
@@ -0,0 +1,197 @@
+import asyncio
+import uuid
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+import ratelimit
+import webhooks
+from agent import Agent
+from benchmarks.fake_model import FakeChatModel
+from ratelimit import RateLimiter
+from webhooks import get_breaker, post_webhook
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    # One call slot per host, refilled too slowly to matter in a test
+    limiter = RateLimiter({"*": (0.001, 1)}, max_wait=0)
+    monkeypatch.setattr(ratelimit, "_rate_limiter", limiter)
+    return limiter
+
+
+def test_open_circuit_does_not_take_a_rate_limit_token(limiter):
+    url = f"http://{uuid.uuid4().hex}.invalid/hook"
+    breaker = get_breaker(url)
+    for _ in range(breaker.threshold):
+        breaker.record_failure()
+
+    assert post_webhook(url, {})["error"].startswith("The webhook is temporarily unavailable")
+    assert limiter.acquire_webhook(url)
+
+
+def test_rate_limited_trial_is_given_back_to_the_breaker(limiter):
+    url = f"http://{uuid.uuid4().hex}.invalid/hook"
+    breaker = get_breaker(url)
+    breaker.reset_timeout = 0
+    for _ in range(breaker.threshold):
+        breaker.record_failure()
+    assert limiter.acquire_webhook(url)
+
+    assert post_webhook(url, {})["error"].startswith("Too many requests")
+    assert breaker.allow()
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    transport = webhooks.WebhookTransport()
+    monkeypatch.setattr(webhooks, "_transport", transport)
+    yield transport
+    transport.close()
+
+
+def test_aclose_closes_the_pool_of_the_running_loop(transport):
+    async def run():
+        loop = asyncio.get_running_loop()
+        client = transport._async_client(loop)
+        transport._release(loop)
+        await webhooks.aclose_transport()
+        return client, loop in transport._async_clients
+
+    client, kept = asyncio.run(run())
+
+    assert client.is_closed
+    assert not kept
+
+
+def test_idle_only_close_keeps_a_pool_with_requests_in_flight(transport):
+    async def run():
+        loop = asyncio.get_running_loop()
+        client = transport._async_client(loop)
+        await transport.aclose(idle_only=True)
+        busy = client.is_closed
+        transport._release(loop)
+        await transport.aclose(idle_only=True)
+        return busy, client.is_closed
+
+    assert asyncio.run(run()) == (False, True)
+
+
+def test_ending_a_conversation_closes_the_idle_pool(transport):
+    agent = Agent(user_role="alumno", model=FakeChatModel(latency=0, answer="Hola"))
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        client = transport._async_client(loop)
+        transport._release(loop)
+        await agent.ainvoke([HumanMessage(content="hola")], thread_id="t1")
+        await agent.aend_conversation("t1")
+        return client.is_closed, await agent.graph.aget_state({"configurable": {"thread_id": "t1"}})
+
+    closed, state = asyncio.run(run())
+
+    assert closed
+    assert not state.values
+
+
+class ScriptedTransport:
+    """Answers each post with the next status code of a script, recording the calls."""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def _respond(self, url):
+        self.calls += 1
+        status = self.statuses.pop(0)
+        if status is None:
+            raise webhooks.httpx.ConnectTimeout("timed out")
+        return webhooks.httpx.Response(status, json={"ok": status}, request=webhooks.httpx.Request("POST", url))
+
+    def post(self, url, json=None, timeout=None):
+        return self._respond(url)
+
+    async def apost(self, url, json=None, timeout=None):
+        return self._respond(url)
+
+
+@pytest.fixture
+def scripted(monkeypatch):
+    monkeypatch.setattr(ratelimit, "_rate_limiter", RateLimiter({}))
+    delays = []
+    monkeypatch.setattr(webhooks.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr(webhooks.time, "sleep", delays.append)
+
+    def install(*statuses):
+        transport = ScriptedTransport(*statuses)
+        monkeypatch.setattr(webhooks, "_transport", transport)
+        return transport
+
+    install.delays = delays
+    return install
+
+
+def test_server_failures_are_retried_with_exponential_backoff(scripted):
+    transport = scripted(503, None, 200)
+    url = f"http://{uuid.uuid4().hex}.invalid/hook"
+
+    assert post_webhook(url, {}, retries=2, backoff=0.5) == {"ok": 200}
+    assert transport.calls == 3
+    assert scripted.delays == [0.5, 1.0]
+    assert get_breaker(url).failures == 0
+
+
+def test_client_errors_and_spent_retries_are_not_retried(scripted):
+    transport = scripted(404, 500, 500)
+    url = f"http://{uuid.uuid4().hex}.invalid/hook"
+
+    assert post_webhook(url, {}, retries=3)["status"] == "failed"
+    assert transport.calls == 1
+    assert post_webhook(url, {}, retries=1)["status"] == "failed"
+    assert transport.calls == 3
+
+
+def test_async_retries_do_not_block_the_loop(scripted, monkeypatch):
+    transport = scripted(502, 200)
+    delays = []
+
+    async def sleep(seconds):
+        delays.append(seconds)
+
+    monkeypatch.setattr(webhooks.asyncio, "sleep", sleep)
+    url = f"http://{uuid.uuid4().hex}.invalid/hook"
+
+    assert asyncio.run(webhooks.apost_webhook(url, {}, retries=1, backoff=0.25)) == {"ok": 200}
+    assert transport.calls == 2
+    assert delays == [0.25]
+    assert scripted.delays == []
+
+
+def test_half_open_breaker_lets_one_trial_through_then_closes(scripted):
+    transport = scripted(200)
+    url = f"http://{uuid.uuid4().hex}.invalid/hook"
+    breaker = get_breaker(url)
+    for _ in range(breaker.threshold):
+        breaker.record_failure()
+    assert post_webhook(url, {})["error"].startswith("The webhook is temporarily unavailable")
+    assert transport.calls == 0
+
+    breaker.opened_at -= breaker.reset_timeout
+    assert post_webhook(url, {}) == {"ok": 200}
+    assert breaker.metrics()["state"] == "closed"
+
+
+def test_failed_trial_reopens_the_breaker(scripted):
+    scripted(500)
+    url = f"http://{uuid.uuid4().hex}.invalid/hook"
+    breaker = get_breaker(url)
+    for _ in range(breaker.threshold):
+        breaker.record_failure()
+    breaker.opened_at -= breaker.reset_timeout
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()
+    assert post_webhook(url, {})["status"] == "failed"
+    assert breaker.metrics()["state"] == "open"
+    assert breaker.metrics()["times_opened"] == 2
@@ -0,0 +1,174 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel, ValidationError
+
+# Model calls of the supervisor (and of the single agent) are split in two tiers: the routing
+# call that reads the user's message and delegates, and the answer call written after a
+# subagent or tool reported back. Subagent calls extract tool arguments and use the node's tier.
+ROUTING = "routing"
+ANSWER = "answer"
+
+DEFAULT_SMALL_MODEL = "gpt-4.1-mini"
+
+
+def model_tiers_enabled() -> bool:
+    """Tell whether routing and tool calls use a small model (env AGENT_MODEL_TIERS, default off)."""
+    return os.getenv("AGENT_MODEL_TIERS", "0").lower() in ("1", "true", "yes")
+
+
+def node_model_names(model_name: str, agent_names: Sequence[str]) -> Dict[str, str]:
+    """
+    Return the model name of each node: routing, answer and every subagent.
+
+    The answer uses `model_name`; routing and the subagents use AGENT_SMALL_MODEL (default
+    gpt-4.1-mini). AGENT_NODE_MODELS overrides single nodes, e.g.
+    "routing=gpt-4.1-nano,professor_agent=gpt-4.1".
+    """
+    small = os.getenv("AGENT_SMALL_MODEL", DEFAULT_SMALL_MODEL)
+    names = {ROUTING: small, ANSWER: model_name, **{name: small for name in agent_names}}
+    for item in filter(None, (part.strip() for part in os.getenv("AGENT_NODE_MODELS", "").split(","))):
+        node, _, model = item.partition("=")
+        if not model:
+            raise ValueError(f"Invalid node model '{item}', expected node=model")
+        names[node.strip()] = model.strip()
+    return names
+
+
+class TierMetrics:
+    """Counts the model calls of each node per tier and the calls escalated to the large model."""
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, node: str, outcome: str):
+        with self._lock:
+            counts = self._counts.setdefault(node, {"small": 0, "large": 0, "escalated": 0})
+            counts[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Return per node the calls answered by the small model, by the large one, and escalated."""
+        with self._lock:
+            return {node: dict(counts) for node, counts in self._counts.items()}
+
+
+tier_metrics = TierMetrics()
+
+
+def get_tier_metrics() -> Dict[str, Dict[str, int]]:
+    """Return the model calls per node and tier, and the escalations."""
+    return tier_metrics.snapshot()
+
+
+def invalid_tool_call(message: Any, tools: Dict[str, Any]) -> Optional[str]:
+    """
+    Check the tool calls of a model response against the bound tools.
+
+    Returns:
+        Why a call is invalid (unparsable arguments, unknown tool or arguments that fail the
+        tool's schema), or None if every call is valid
+    """
+    if not isinstance(message, AIMessage):
+        return None
+    if message.invalid_tool_calls:
+        return f"unparsable arguments for {message.invalid_tool_calls[0].get('name')}"
+    for call in message.tool_calls:
+        tool = tools.get(call["name"])
+        if tool is None:
+            return f"unknown tool {call['name']}"
+        schema = getattr(tool, "tool_call_schema", None)
+        if isinstance(schema, type) and issubclass(schema, BaseModel):
+            try:
+                schema.model_validate(call["args"])
+            except ValidationError as e:
+                return f"invalid arguments for {call['name']}: {e.error_count()} errors"
+    return None
+
+
+class TieredModel:
+    """
+    Dynamic model of a ReAct agent that picks a small or a large chat model for every call.
+
+    Routing and tool argument extraction go to the small model; when a node also writes the
+    answer to the user (`answers`), the call made after a tool result goes to the large one. A
+    small-model response with an invalid tool call is discarded and the call is made again
+    with the large model, so a malformed call never reaches a tool.
+
+    Passed as `model` to create_react_agent, which calls it with the state of every step, and
+    to create_supervisor, which binds its handoff tools with bind_tools.
+    """
+
+    def __init__(self, node: str, small: Any, large: Any, answers: bool = False,
+                 tools: Optional[List[Any]] = None, **bind_kwargs: Any):
+        """
+        Initialize the tiered model.
+
+        Args:
+            node: Node name, for the metrics
+            small: Chat model for routing and tool calls
+            large: Chat model for answers and escalations
+            answers: Whether the node writes the answer to the user after its tools report back
+            tools: Tools to bind to both models
+            bind_kwargs: Extra bind_tools arguments, e.g. parallel_tool_calls
+        """
+        self.node = node
+        self.small = small
+        self.large = large
+        self.answers = answers
+        self.bind_kwargs = bind_kwargs
+        self.tools = {getattr(tool, "name", None): tool for tool in tools or []}
+        self._small = small.bind_tools(tools, **bind_kwargs) if tools else small
+        self._large = large.bind_tools(tools, **bind_kwargs) if tools else large
+        self._escalating = RunnableLambda(self._call, afunc=self._acall, name=f"{node}_tiered_model")
+
+    def bind_tools(self, tools: List[Any], **kwargs: Any) -> "TieredModel":
+        return TieredModel(self.node, self.small, self.large, self.answers, list(tools),
+                           **{**self.bind_kwargs, **kwargs})
+
+    def __call__(self, state: Any, runtime: Any = None) -> Any:
+        messages = state["messages"] if isinstance(state, dict) else state.messages
+        if self.answers and messages and isinstance(messages[-1], ToolMessage):
+            tier_metrics.record(self.node, "large")
+            return self._large
+        return self._escalating
+
+    def _escalate(self, response: Any) -> bool:
+        reason = invalid_tool_call(response, self.tools)
+        tier_metrics.record(self.node, "escalated" if reason else "small")
+        return reason is not None
+
+    def _call(self, messages: Any, config: Any) -> Any:
+        response = self._small.invoke(messages, config)
+        if self._escalate(response):
+            return self._large.invoke(messages, config)
+        return response
+
+    async def _acall(self, messages: Any, config: Any) -> Any:
+        response = await self._small.ainvoke(messages, config)
+        if self._escalate(response):
+            return await self._large.ainvoke(messages, config)
+        return response
+
+
+def tiered(node: str, models: Dict[str, Any], default: Any, answers: bool = False,
+           tools: Optional[List[Any]] = None, **bind_kwargs: Any) -> Any:
+    """
+    Return the model of a node: a TieredModel if the node has a small model, else the large one.
+
+    Args:
+        node: ROUTING for the supervisor or single agent, or a subagent name
+        models: Chat model per node, see build_graph
+        default: Chat model of the nodes missing from `models`
+        answers: Whether the node also writes the answer to the user
+        tools: Tools to bind to a TieredModel, which create_react_agent does not bind itself
+        bind_kwargs: Extra bind_tools arguments of the TieredModel
+    """
+    small = models.get(node, default)
+    large = models.get(ANSWER, default)
+    if small is large:
+        return large
+    return TieredModel("supervisor" if node == ROUTING else node, small, large, answers, tools, **bind_kwargs)
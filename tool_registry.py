@@ -0,0 +1,296 @@
+import inspect
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Type, Union
+
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel
+
+from cache import MISS, cache_metrics, get_cache, make_key
+from jobs import background_jobs_enabled, get_job_queue, start_job_worker
+from memo import current_thread_id, get_tool_memo
+from webhooks import apost_webhook, post_webhook
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "webhooks.json")
+
+
+def _not_configured(name: str) -> Dict[str, Any]:
+    return {
+        "error": f"No webhook configured for tool '{name}'",
+        "status": "failed"
+    }
+
+
+class WebhookConfig(BaseModel):
+    """Per-environment settings of a webhook tool, loaded from the config file."""
+    url: str
+    # Read timeout, the connection itself must be opened within connect_timeout
+    timeout: float = 10
+    connect_timeout: float = 3
+    # Retries only apply to idempotent calls
+    retries: int = 0
+    backoff: float = 0.5
+    # Seconds a successful response is reused for the same payload, 0 disables caching
+    cache_ttl: float = 0
+
+
+class WebhookToolSpec(BaseModel):
+    """Declaration of a webhook tool: its name, input model and description."""
+    name: str
+    args_schema: Type[BaseModel]
+    description: str
+    # Tells whether a validated payload is a pure read, that can be retried and cached
+    idempotent: Union[bool, Callable[[BaseModel], bool]] = False
+    # Mutating tool whose calls must run one at a time, in the order the model emitted them
+    serial: bool = False
+    # Slow side-effect tool whose calls are queued and posted by the job worker, when background jobs are on
+    background: bool = False
+
+    def is_idempotent(self, payload: BaseModel) -> bool:
+        return self.idempotent(payload) if callable(self.idempotent) else self.idempotent
+
+
+class WebhookToolRegistry:
+    """
+    Registry of the webhook tools.
+
+    Tools are declared in code with their Pydantic input model, while the URL, timeout and
+    retry policy come from a JSON config file, so they can be swapped per environment by
+    reloading the config without re-importing the tools.
+    """
+
+    def __init__(self):
+        self.specs: Dict[str, WebhookToolSpec] = {}
+        self.tools: Dict[str, StructuredTool] = {}
+        self.configs: Dict[str, WebhookConfig] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, args_schema: Type[BaseModel], description: str,
+                 idempotent: Union[bool, Callable[[BaseModel], bool]] = False,
+                 serial: bool = False, background: bool = False) -> StructuredTool:
+        """
+        Declare a webhook tool and generate its LangChain tool.
+
+        Args:
+            name: Tool name, also the key of its entry in the config file
+            args_schema: Pydantic model that validates the webhook payload
+            description: Tool description shown to the model
+            idempotent: Whether calls are pure reads, or a check of whether a given payload is.
+                Only idempotent calls are retried, and cached when the tool has a cache_ttl.
+            serial: Whether calls never run concurrently with other calls of the same model turn,
+                for mutating tools whose order matters (see parallel.ToolScheduler)
+            background: Whether calls are queued and answered with a job id instead of awaited,
+                for slow side effects like mails and posts (see jobs.py, only when AGENT_BACKGROUND_JOBS is on)
+
+        Returns:
+            The generated tool
+        """
+        spec = WebhookToolSpec(
+            name=name,
+            args_schema=args_schema,
+            description=inspect.cleandoc(description),
+            idempotent=idempotent,
+            serial=serial,
+            background=background
+        )
+
+        def run(**kwargs) -> Any:
+            if spec.background and background_jobs_enabled():
+                return self.enqueue(name, kwargs)
+            return self.invoke(name, kwargs)
+
+        async def arun(**kwargs) -> Any:
+            if spec.background and background_jobs_enabled():
+                return self.enqueue(name, kwargs)
+            return await self.ainvoke(name, kwargs)
+
+        webhook_tool = StructuredTool.from_function(
+            func=run,
+            coroutine=arun,
+            name=spec.name,
+            description=spec.description,
+            args_schema=spec.args_schema
+        )
+        self.specs[name] = spec
+        self.tools[name] = webhook_tool
+        return webhook_tool
+
+    def load_config(self, path: Optional[str] = None):
+        """
+        Load the webhook settings from a JSON config file.
+
+        Args:
+            path: Config file path. Defaults to the WEBHOOKS_CONFIG environment variable,
+                  or webhooks.json next to this module.
+        """
+        path = path or os.getenv("WEBHOOKS_CONFIG", DEFAULT_CONFIG_PATH)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        defaults = data.get("defaults", {})
+        configs = {
+            name: WebhookConfig(**{**defaults, **settings})
+            for name, settings in data.get("tools", {}).items()
+        }
+        with self._lock:
+            self.configs = configs
+
+    def get_config(self, name: str) -> Optional[WebhookConfig]:
+        """Return the current settings of a tool, or None if it is not configured."""
+        with self._lock:
+            return self.configs.get(name)
+
+    def _prepare(self, name: str, arguments: Dict[str, Any], use_cache: bool):
+        spec = self.specs[name]
+        config = self.get_config(name)
+
+        # Validate data with Pydantic model
+        payload = spec.args_schema(**arguments)
+        data = payload.model_dump() or None
+        idempotent = spec.is_idempotent(payload)
+
+        cache_key = None
+        if use_cache and idempotent and config is not None and config.cache_ttl > 0:
+            cache_key = make_key(name, data)
+        return data, config, cache_key, idempotent
+
+    def _cached(self, name: str, cache_key: Optional[str]) -> Any:
+        cache = get_cache()
+        if cache_key is None or cache is None:
+            return MISS
+        value = cache.get(cache_key)
+        cache_metrics.record(name, value is not MISS)
+        return value
+
+    def _store(self, cache_key: Optional[str], config: WebhookConfig, result: Any):
+        cache = get_cache()
+        if cache_key is None or cache is None:
+            return
+        if isinstance(result, dict) and result.get("status") == "failed":
+            return
+        cache.set(cache_key, result, config.cache_ttl)
+
+    @staticmethod
+    def _memo(idempotent: bool):
+        # Identical reads of one conversation share a request, see memo.ToolMemo
+        thread_id = current_thread_id()
+        if not idempotent or thread_id is None:
+            return None, None
+        return get_tool_memo(), thread_id
+
+    def invoke(self, name: str, arguments: Dict[str, Any], use_cache: bool = True) -> Any:
+        """
+        Validate the arguments of a tool and post them to its webhook.
+
+        Idempotent calls are retried on server failures, served from the response cache
+        while fresh when the tool has a cache_ttl, and shared by identical calls of the same
+        conversation (see memo.ToolMemo).
+
+        Args:
+            name: Registered tool name
+            arguments: Tool arguments
+            use_cache: Set to False to always call the webhook
+
+        Returns:
+            The webhook response, or a dictionary with "error" and "status": "failed"
+
+        Raises:
+            pydantic.ValidationError: If the arguments do not match the tool's model
+        """
+        payload, config, cache_key, idempotent = self._prepare(name, arguments, use_cache)
+        if config is None:
+            return _not_configured(name)
+
+        cached = self._cached(name, cache_key)
+        if cached is not MISS:
+            return cached
+
+        def post():
+            result = post_webhook(
+                config.url,
+                payload,
+                timeout=config.timeout,
+                connect_timeout=config.connect_timeout,
+                retries=config.retries if idempotent else 0,
+                backoff=config.backoff
+            )
+            self._store(cache_key, config, result)
+            return result
+
+        memo, thread_id = self._memo(idempotent and use_cache)
+        if memo is None:
+            return post()
+        return memo.call(thread_id, make_key(name, payload), name, post)
+
+    def enqueue(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validate the arguments of a tool and queue its webhook call for the background job worker.
+
+        Args:
+            name: Registered tool name
+            arguments: Tool arguments
+
+        Returns:
+            A dictionary with "status": "queued" and the "job_id" to check with the status tool,
+            or with "error" and "status": "failed" if the tool is not configured
+
+        Raises:
+            pydantic.ValidationError: If the arguments do not match the tool's model
+        """
+        payload, config, _, _ = self._prepare(name, arguments, use_cache=False)
+        if config is None:
+            return _not_configured(name)
+        job_id = get_job_queue().enqueue(name, payload)
+        # This process drains the queue too, so queued calls run without a separate worker
+        start_job_worker()
+        return {
+            "status": "queued",
+            "job_id": job_id,
+            "message": "The task was queued and will run in the background, "
+                       "its result can be checked later with consultar_estado_tarea"
+        }
+
+    async def ainvoke(self, name: str, arguments: Dict[str, Any], use_cache: bool = True) -> Any:
+        """Async version of invoke, used when the tools run inside an async graph."""
+        payload, config, cache_key, idempotent = self._prepare(name, arguments, use_cache)
+        if config is None:
+            return _not_configured(name)
+
+        cached = self._cached(name, cache_key)
+        if cached is not MISS:
+            return cached
+
+        async def post():
+            result = await apost_webhook(
+                config.url,
+                payload,
+                timeout=config.timeout,
+                connect_timeout=config.connect_timeout,
+                retries=config.retries if idempotent else 0,
+                backoff=config.backoff
+            )
+            self._store(cache_key, config, result)
+            return result
+
+        memo, thread_id = self._memo(idempotent and use_cache)
+        if memo is None:
+            return await post()
+        return await memo.acall(thread_id, make_key(name, payload), name, post)
+
+
+registry = WebhookToolRegistry()
+
+
+def register_webhook_tool(name: str, args_schema: Type[BaseModel], description: str,
+                          idempotent: Union[bool, Callable[[BaseModel], bool]] = False,
+                          serial: bool = False, background: bool = False) -> StructuredTool:
+    """Declare a webhook tool in the default registry. See WebhookToolRegistry.register."""
+    if not registry.configs:
+        registry.load_config()
+    return registry.register(name, args_schema, description, idempotent, serial, background)
+
+
+def load_webhook_config(path: Optional[str] = None):
+    """Reload the webhook settings of the default registry. See WebhookToolRegistry.load_config."""
+    registry.load_config(path)
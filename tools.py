@@ -1,23 +1,18 @@
-import requests
-from langchain_core.tools import tool
-from typing import Dict, Any
 from pydantic import BaseModel
-from typing import Literal, List
+from typing import List
+from arguments import Capitalized, DayMonth, choice
+from tool_registry import register_webhook_tool
 
 
 class EmployeeLearningStatus(BaseModel):
     nombre: str
     apellido: str 
     sector: str
-    capacitacion: Literal["SI", "NO"]
+    capacitacion: choice("SI", "NO")
 
-@tool
-def add_employee_learning_status(
-    nombre: str,
-    apellido: str,
-    sector: str, 
-    capacitacion: Literal["SI", "NO"]
-) -> Dict[Any, Any]:
+add_employee_learning_status = register_webhook_tool(
+    "add_employee_learning_status",
+    EmployeeLearningStatus,
     """
     Add an employee's learning status via webhook.
     
@@ -33,40 +28,7 @@ def add_employee_learning_status(
     Raises:
         Exception: If the request fails
     """
-    WEBHOOK_URL = "https://hook.us1.make.com/glaoqvgpbznxve282fplcv4ubzt1bqcg"
-    
-    try:
-        # Validate data with Pydantic model
-        payload = EmployeeLearningStatus(
-            nombre=nombre,
-            apellido=apellido,
-            sector=sector,
-            capacitacion=capacitacion
-        )
-
-        response = requests.post(
-            WEBHOOK_URL,
-            json=payload.model_dump(),
-            headers={
-                "Content-Type": "application/json"
-            },
-            timeout=10
-        )
-        
-        response.raise_for_status()
-        
-        # Try to parse as JSON, if it fails return the text response
-        try:
-            return response.json()
-        except ValueError:
-            # If response is not JSON, return it as text
-            return response.text
-        
-    except requests.RequestException as e:
-        return {
-            "error": str(e),
-            "status": "failed"
-        }
+)
     
 
 class MailDraft(BaseModel):
@@ -75,12 +37,9 @@ class MailDraft(BaseModel):
     asunto: str 
     contenido: str
 
-@tool
-def create_one_mail_draft(
-    mail: str,
-    asunto: str,
-    contenido: str
-) -> Dict[Any, Any]:
+create_one_mail_draft = register_webhook_tool(
+    "create_one_mail_draft",
+    MailDraft,
     """
     Create ONE mail draft via webhook. Use this tool only once.
     
@@ -95,45 +54,14 @@ def create_one_mail_draft(
     Raises:
         Exception: If the request fails
     """
-    WEBHOOK_URL = "https://hook.us1.make.com/ttuc08gt5xsckmp4dkw4zn224avxqpu4"
-    
-    try:
-        # Validate data with Pydantic model
-        payload = MailDraft(
-            mail=mail,
-            asunto=asunto,
-            contenido=contenido
-        )
-
-        response = requests.post(
-            WEBHOOK_URL,
-            json=payload.model_dump(),
-            headers={
-                "Content-Type": "application/json"
-            },
-            timeout=10
-        )
-        
-        response.raise_for_status()
-        
-        # Try to parse as JSON, if it fails return the text response
-        try:
-            return response.json()
-        except ValueError:
-            # If response is not JSON, return it as text
-            return response.text
-        
-    except requests.RequestException as e:
-        return {
-            "error": str(e),
-            "status": "failed"
-        }
+)
 
 class SIUTema(BaseModel):
-    nombreProfesor: str
+    nombreProfesor: Capitalized
     materia: str
     horas: str
-    fecha: str
+    # Sent as día/mes, the model may write "13/6", "2025-06-13" or "13 de junio"
+    fecha: DayMonth
 
 class EventoAcademico(BaseModel):
     profesor: str
@@ -141,13 +69,9 @@ class EventoAcademico(BaseModel):
     evento: str
     fecha: str
 
-@tool
-def subir_tema_siu(
-    nombreProfesor: str,
-    materia: str,
-    horas: str,
-    fecha: str
-) -> Dict[Any, Any]:
+subir_tema_siu = register_webhook_tool(
+    "subir_tema_siu",
+    SIUTema,
     """
     Automatiza la carga de clases dictadas en la materia de IA usando Webhooks, Google Sheets y
     filtros inteligentes, ahorrando tiempo y evitando errores.
@@ -165,48 +89,11 @@ def subir_tema_siu(
     Raises:
         Exception: If the request fails
     """
-    WEBHOOK_URL = "https://hook.us2.make.com/trx3m5faw6wjel067qhu9wer4sww88oa"
-    
-    try:
-        # Validate data with Pydantic model
-        payload = SIUTema(
-            nombreProfesor=nombreProfesor[0].upper() + nombreProfesor[1:] if nombreProfesor else "",
-            materia=materia,
-            horas=horas,
-            fecha=fecha
-        )
+)
 
-        response = requests.post(
-            WEBHOOK_URL,
-            json=payload.model_dump(),
-            headers={
-                "Content-Type": "application/json"
-            },
-            timeout=10
-        )
-        
-        response.raise_for_status()
-        
-        # Try to parse as JSON, if it fails return the text response
-        try:
-            return response.json()
-        except ValueError:
-            # If response is not JSON, return it as text
-            return response.text
-        
-    except requests.RequestException as e:
-        return {
-            "error": str(e),
-            "status": "failed"
-        }
-
-@tool
-def crear_recordatorio_evento(
-    profesor: str,
-    materia: str,
-    evento: str,
-    fecha: str
-) -> Dict[Any, Any]:
+crear_recordatorio_evento = register_webhook_tool(
+    "crear_recordatorio_evento",
+    EventoAcademico,
     """
     Permite a un profesor registrar un evento académico y notificar a los alumnos de la materia Big Data
     y IA. Registra el evento en el calendario (vía Google Sheets) y crea recordatorios por alumno, la tool
@@ -224,56 +111,20 @@ def crear_recordatorio_evento(
         
     Raises:
         Exception: If the request fails
-    """
-    WEBHOOK_URL = "https://hook.us2.make.com/oiwt4mbbldx7rrtqv0qx6epqo7257tuj"
-    
-    try:
-        # Validate data with Pydantic model
-        payload = EventoAcademico(
-            profesor=profesor,
-            materia=materia,
-            evento=evento,
-            fecha=fecha
-        )
-
-        response = requests.post(
-            WEBHOOK_URL,
-            json=payload.model_dump(),
-            headers={
-                "Content-Type": "application/json"
-            },
-            timeout=10
-        )
-        
-        response.raise_for_status()
-        
-        # Try to parse as JSON, if it fails return the text response
-        try:
-            return response.json()
-        except ValueError:
-            # If response is not JSON, return it as text
-            return response.text
-        
-    except requests.RequestException as e:
-        return {
-            "error": str(e),
-            "status": "failed"
-        }
+    """,
+    background=True
+)
 
 
 class ArchivoMateria(BaseModel):
-    accion: Literal["subir", "ocultar", "visibilizar", "eliminar"]
+    accion: choice("subir", "ocultar", "visibilizar", "eliminar")
     materia: str
     clase: str
     nombre_archivo: str
 
-@tool
-def gestionar_archivo_materia(
-    accion: Literal["subir", "ocultar", "visibilizar", "eliminar"],
-    materia: str,
-    clase: str,
-    nombre_archivo: str
-) -> Dict[Any, Any]:
+gestionar_archivo_materia = register_webhook_tool(
+    "gestionar_archivo_materia",
+    ArchivoMateria,
     """
     Permite a los profesores gestionar archivos en el campus virtual mediante cuatro acciones: subir, ocultar, visibilizar o eliminar.
     
@@ -288,41 +139,9 @@ def gestionar_archivo_materia(
         
     Raises:
         Exception: If the request fails
-    """
-    WEBHOOK_URL = "https://hook.us2.make.com/jb68sug209rt7e71sx8toou5to3jsjyt"
-    
-    try:
-        # Validate data with Pydantic model
-        payload = ArchivoMateria(
-            accion=accion,
-            materia=materia,
-            clase=clase,
-            nombre_archivo=nombre_archivo
-        )
-
-        response = requests.post(
-            WEBHOOK_URL,
-            json=payload.model_dump(),
-            headers={
-                "Content-Type": "application/json"
-            },
-            timeout=10
-        )
-        
-        response.raise_for_status()
-        
-        # Try to parse as JSON, if it fails return the text response
-        try:
-            return response.json()
-        except ValueError:
-            # If response is not JSON, return it as text
-            return response.text
-        
-    except requests.RequestException as e:
-        return {
-            "error": str(e),
-            "status": "failed"
-        }
+    """,
+    serial=True
+)
 
 class RedencionGastos(BaseModel):
     fecha: str
@@ -332,15 +151,9 @@ class RedencionGastos(BaseModel):
     monto: str
     estado: str
 
-@tool
-def procesar_redencion_gastos(
-    fecha: str,
-    nombre: str,
-    categoria: str,
-    descripcion: str,
-    monto: str,
-    estado: str
-) -> Dict[Any, Any]:
+procesar_redencion_gastos = register_webhook_tool(
+    "procesar_redencion_gastos",
+    RedencionGastos,
     """
     Procesa una factura para determinar si es reembolsable o no reembolsable según las políticas universitarias.
     Clasifica automáticamente: Viáticos, Comida y Capacitación como reembolsables; Personal como no reembolsable.
@@ -359,53 +172,16 @@ def procesar_redencion_gastos(
     Raises:
         Exception: If the request fails
     """
-    WEBHOOK_URL = "https://hook.us2.make.com/7s7p05c28rltncn9bk61y6n9tyg6obr1"
-    
-    try:
-        # Validate data with Pydantic model
-        payload = RedencionGastos(
-            fecha=fecha,
-            nombre=nombre,
-            categoria=categoria,
-            descripcion=descripcion,
-            monto=monto,
-            estado=estado
-        )
-
-        response = requests.post(
-            WEBHOOK_URL,
-            json=payload.model_dump(),
-            headers={
-                "Content-Type": "application/json"
-            },
-            timeout=10
-        )
-        
-        response.raise_for_status()
-        
-        # Try to parse as JSON, if it fails return the text response
-        try:
-            return response.json()
-        except ValueError:
-            # If response is not JSON, return it as text
-            return response.text
-        
-    except requests.RequestException as e:
-        return {
-            "error": str(e),
-            "status": "failed"
-        }
+)
 
 
 class PostLinkedIn(BaseModel):
     contenido_texto: str
     url_imagen: str
 
-@tool
-def crear_post_linkedin(
-    contenido_texto: str,
-    url_imagen: str
-) -> Dict[Any, Any]:
+crear_post_linkedin = register_webhook_tool(
+    "crear_post_linkedin",
+    PostLinkedIn,
     """
     Genera y publica contenido profesional en LinkedIn usando IA para crear texto alineado con la comunicación institucional.
     
@@ -418,48 +194,22 @@ def crear_post_linkedin(
         
     Raises:
         Exception: If the request fails
-    """
-    WEBHOOK_URL = "https://hook.us2.make.com/6296k4pv2n8y1742al1b8ois4j9e9p39"
-    
-    try:
-        # Validate data with Pydantic model
-        payload = PostLinkedIn(
-            contenido_texto=contenido_texto,
-            url_imagen=url_imagen
-        )
+    """,
+    background=True
+)
 
-        response = requests.post(
-            WEBHOOK_URL,
-            json=payload.model_dump(),
-            headers={
-                "Content-Type": "application/json"
-            },
-            timeout=10
-        )
-        
-        response.raise_for_status()
-        
-        # Try to parse as JSON, if it fails return the text response
-        try:
-            return response.json()
-        except ValueError:
-            # If response is not JSON, return it as text
-            return response.text
-        
-    except requests.RequestException as e:
-        return {
-            "error": str(e),
-            "status": "failed"
-        }
 
+class RecordatorioHorasSIU(BaseModel):
+    """The webhook takes no input, it is triggered with an empty request."""
 
 class ProfesorPendiente(BaseModel):
     nombre: str
     horasFaltantes: int
     horasRegistradas: int
 
-@tool
-def enviar_recordatorio_horas_siu() -> Dict[str, Any]:
+enviar_recordatorio_horas_siu = register_webhook_tool(
+    "enviar_recordatorio_horas_siu",
+    RecordatorioHorasSIU,
     """
     Sends a reminder email to professors who have not yet logged their teaching hours. Returns a JSON with the send status and a list of professors still missing hours.
     
@@ -473,42 +223,17 @@ def enviar_recordatorio_horas_siu() -> Dict[str, Any]:
         
     Raises:
         Exception: If the request fails
-    """
-    WEBHOOK_URL = "https://hook.us2.make.com/4ccbfb6xuhdjhhbl1qpiltwwe5y7mt0u"
-    
-    try:
-        response = requests.post(
-            WEBHOOK_URL,
-            headers={
-                "Content-Type": "application/json"
-            },
-            timeout=10
-        )
-        
-        response.raise_for_status()
-        
-        # Try to parse as JSON, if it fails return the text response
-        try:
-            return response.json()
-        except ValueError:
-            # If response is not JSON, return it as text
-            return response.text
-        
-    except requests.RequestException as e:
-        return {
-            "error": str(e),
-            "status": "failed"
-        }
+    """,
+    background=True
+)
 
 class ConsultaFaltas(BaseModel):
     dni: int
-    materias: List[Literal["Microeconomia", "Contabilidad", "Derecho Comercial", "Estadística", "Finanzas Públicas"]]
+    materias: List[choice("Microeconomia", "Contabilidad", "Derecho Comercial", "Estadística", "Finanzas Públicas")] = []
 
-@tool
-def consultar_faltas(
-    dni: int,
-    materias: List[Literal["Microeconomia", "Contabilidad", "Derecho Comercial", "Estadística", "Finanzas Públicas"]] = []
-) -> Dict[str, Any]:
+consultar_faltas = register_webhook_tool(
+    "consultar_faltas",
+    ConsultaFaltas,
     """
     Informa cuántas faltas tiene un alumno en una o más materias. Recibe un DNI y, opcionalmente, los nombres de las materias.
     Devuelve la cantidad de faltas por materia e indica si está en riesgo de quedar libre.
@@ -523,51 +248,18 @@ def consultar_faltas(
         
     Raises:
         Exception: If the request fails
-    """
-    WEBHOOK_URL = "https://hook.us2.make.com/ylv76tbneejnnxgnv77mmfwuciyslohm"
-    
-    try:
-        # Validate data with Pydantic model
-        payload = ConsultaFaltas(
-            dni=dni,
-            materias=materias
-        )
-
-        response = requests.post(
-            WEBHOOK_URL,
-            json=payload.model_dump(),
-            headers={
-                "Content-Type": "application/json"
-            },
-            timeout=10
-        )
-        
-        response.raise_for_status()
-        
-        # Try to parse as JSON, if it fails return the text response
-        try:
-            return response.json()
-        except ValueError:
-            # If response is not JSON, return it as text
-            return response.text
-        
-    except requests.RequestException as e:
-        return {
-            "error": str(e),
-            "status": "failed"
-        }
+    """,
+    idempotent=True
+)
 
 class ExamenRecordatorio(BaseModel):
     mail: str
-    accion: Literal["Recordatorio", "Consulta"]
-    materia: Literal["Dirección Comercial", "Dirección Estratégica", "Dirección de Personas"]
+    accion: choice("Recordatorio", "Consulta")
+    materia: choice("Dirección Comercial", "Dirección Estratégica", "Dirección de Personas")
 
-@tool
-def gestionar_recordatorio_examen(
-    mail: str,
-    accion: Literal["Recordatorio", "Consulta"],
-    materia: Literal["Dirección Comercial", "Dirección Estratégica", "Dirección de Personas"]
-) -> Dict[Any, Any]:
+gestionar_recordatorio_examen = register_webhook_tool(
+    "gestionar_recordatorio_examen",
+    ExamenRecordatorio,
     """
     Automatiza el envío de recordatorios por correo electrónico a estudiantes sobre exámenes próximos. 
     La herramienta calcula cuántos días faltan hasta la fecha del examen y envía un mail exactamente 
@@ -584,37 +276,7 @@ def gestionar_recordatorio_examen(
         
     Raises:
         Exception: If the request fails
-    """
-    WEBHOOK_URL = "https://hook.us2.make.com/cdqfv7c25zbl8j8ylsvgm8r14yarsfc1"
-    
-    try:
-        # Validate data with Pydantic model
-        payload = ExamenRecordatorio(
-            mail=mail,
-            accion=accion,
-            materia=materia
-        )
-
-        response = requests.post(
-            WEBHOOK_URL,
-            json=payload.model_dump(),
-            headers={
-                "Content-Type": "application/json"
-            },
-            timeout=10
-        )
-        
-        response.raise_for_status()
-        
-        # Try to parse as JSON, if it fails return the text response
-        try:
-            return response.json()
-        except ValueError:
-            # If response is not JSON, return it as text
-            return response.text
-        
-    except requests.RequestException as e:
-        return {
-            "error": str(e),
-            "status": "failed"
-        }
\ No newline at end of file
+    """,
+    # Only lookups are idempotent, "Recordatorio" sends a mail every time
+    idempotent=lambda payload: payload.accion == "Consulta"
+)
\ No newline at end of file
@@ -0,0 +1,414 @@
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables.config import var_child_runnable_config
+from langgraph.errors import GraphBubbleUp
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "multiagent-austral"
+
+_file_lock = threading.Lock()
+
+
+def tracing_enabled() -> bool:
+    """Tell whether turns are traced (env AGENT_TRACING, default on)."""
+    return os.getenv("AGENT_TRACING", "1").lower() not in ("0", "false", "no")
+
+
+def llm_usage(response) -> Dict[str, Any]:
+    """Return the usage metadata of a chat model result, from its messages or the provider's token_usage."""
+    usage = {}
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if getattr(message, "usage_metadata", None):
+                usage = message.usage_metadata
+    if not usage and response.llm_output:
+        token_usage = response.llm_output.get("token_usage") or {}
+        usage = {
+            "input_tokens": token_usage.get("prompt_tokens", 0),
+            "output_tokens": token_usage.get("completion_tokens", 0),
+            "input_token_details": {
+                "cache_read": (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+            }
+        }
+    return usage
+
+
+class TurnTracer(BaseCallbackHandler):
+    """
+    Record the spans of one conversation turn.
+
+    Passed as a callback of the graph run, it opens a span for the turn, for every graph node
+    (e.g. "supervisor/agent", "professor_agent/tools"), every model call (latency and
+    prompt/completion tokens) and every tool call. Webhook requests made by the tools are
+    added as children of their tool span by `record_webhook`.
+    """
+
+    # Keep the spans in order and on the thread that produced them
+    run_inline = True
+
+    def __init__(self, thread_id: str):
+        """
+        Initialize the tracer.
+
+        Args:
+            thread_id: Conversation id, added to every span and used for the session summary
+        """
+        self.thread_id = thread_id
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[Dict[str, Any]] = []
+        self._open: Dict[Any, Dict[str, Any]] = {}
+        self._parents: Dict[Any, Any] = {}
+        self._active_namespaces = set()
+        self._root = self._span("turn", "turn", None, {"thread_id": thread_id})
+        self._lock = threading.RLock()
+
+    def _span(self, name: str, kind: str, parent: Optional[Dict[str, Any]], attributes: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "kind": kind,
+            "span_id": secrets.token_hex(8),
+            "parent_span_id": parent["span_id"] if parent else None,
+            "start": time.time_ns(),
+            "end": None,
+            "attributes": attributes,
+            "error": None
+        }
+
+    def _parent_span(self, parent_run_id) -> Dict[str, Any]:
+        # Walk up the runs until one that has a span, nested runnables are not traced
+        while parent_run_id is not None:
+            span = self._open.get(parent_run_id)
+            if span is not None:
+                return span
+            parent_run_id = self._parents.get(parent_run_id)
+        return self._root
+
+    def _start(self, run_id, parent_run_id, name: str, kind: str, attributes: Dict[str, Any]):
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            span = self._span(name, kind, self._parent_span(parent_run_id), attributes)
+            self._open[run_id] = span
+
+    def _end(self, run_id, error: Optional[BaseException] = None, **attributes):
+        with self._lock:
+            span = self._open.pop(run_id, None)
+            if span is None:
+                return
+            span["end"] = time.time_ns()
+            span["attributes"].update(attributes)
+            # Handoffs and interrupts travel up the graph as exceptions, they are not failures
+            if error is not None and not isinstance(error, GraphBubbleUp):
+                span["error"] = f"{type(error).__name__}: {error}"
+            self._active_namespaces.discard(span["attributes"].get("namespace"))
+            self.spans.append(span)
+            return span
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        namespace = metadata.get("langgraph_checkpoint_ns", "")
+        with self._lock:
+            # Only the run of the node itself, a subagent node wraps a subgraph run with the same namespace
+            if node and kwargs.get("name") == node and namespace not in self._active_namespaces:
+                self._active_namespaces.add(namespace)
+                hop = "/".join(part.split(":")[0] for part in namespace.split("|") if part) or node
+                self._start(run_id, parent_run_id, hop, "node", {"node": node, "namespace": namespace})
+            else:
+                self._parents[run_id] = parent_run_id
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        model = metadata.get("ls_model_name") or kwargs.get("name") or "model"
+        namespace = metadata.get("langgraph_checkpoint_ns", "")
+        self._start(run_id, parent_run_id, f"llm {model}", "llm", {
+            "model": model,
+            "node": metadata.get("langgraph_node"),
+            # Supervisor or subagent that made the call, i.e. which system prompt was sent
+            "agent": namespace.split("|")[0].split(":")[0] or metadata.get("langgraph_node") or model,
+            "input_messages": sum(len(batch) for batch in messages)
+        })
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = llm_usage(response)
+        # Prompt tokens the provider served from its prefix cache
+        cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        span = self._end(
+            run_id,
+            prompt_tokens=usage.get("input_tokens", 0),
+            cached_prompt_tokens=cached,
+            completion_tokens=usage.get("output_tokens", 0)
+        )
+        if span is not None:
+            prompt_cache_metrics.record(span["attributes"]["agent"], usage.get("input_tokens", 0), cached)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "tool")
+        self._start(run_id, parent_run_id, f"tool {name}", "tool", {"tool": name})
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def add_webhook_span(self, parent_run_id, url: str, start: int, end: int, status: Optional[int],
+                         request_bytes: int, response_bytes: int, error: Optional[str]):
+        """Add the span of a webhook request made while the tool run `parent_run_id` was open."""
+        with self._lock:
+            span = self._span(f"webhook {urlsplit(url).path}", "webhook", self._parent_span(parent_run_id), {
+                "url.path": urlsplit(url).path,
+                "http.status_code": status,
+                "request_bytes": request_bytes,
+                "response_bytes": response_bytes
+            })
+            span["start"], span["end"], span["error"] = start, end, error
+            self.spans.append(span)
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Close the turn, export its spans and add it to the session summary.
+
+        Returns:
+            The summary of the turn
+        """
+        with self._lock:
+            now = time.time_ns()
+            for span in self._open.values():
+                span["end"] = now
+                self.spans.append(span)
+            self._open.clear()
+            self._root["end"] = now
+            self.spans.append(self._root)
+        summary = summarize_spans(self.spans)
+        session_stats.record(self.thread_id, summary)
+        export_spans(self)
+        return summary
+
+
+def create_tracer(thread_id: str) -> Optional[TurnTracer]:
+    """Return a tracer for a turn of the conversation, or None if tracing is disabled."""
+    return TurnTracer(thread_id) if tracing_enabled() else None
+
+
+def record_webhook(url: str, start: int, end: int, status: Optional[int] = None,
+                   request_bytes: int = 0, response_bytes: int = 0, error: Optional[str] = None):
+    """
+    Record a webhook request in the tracer of the turn that made it, if any.
+
+    The tracer and the calling tool run are found in the runnable config of the tool,
+    so nothing has to be passed down to the webhook helpers.
+
+    Args:
+        url: Webhook URL
+        start: Start time in nanoseconds since the epoch
+        end: End time in nanoseconds since the epoch
+        status: HTTP status code, None if no response was received
+        request_bytes: Size of the request body
+        response_bytes: Size of the response body
+        error: Error description if the request failed
+    """
+    config = var_child_runnable_config.get() or {}
+    manager = config.get("callbacks")
+    for handler in getattr(manager, "handlers", None) or []:
+        if isinstance(handler, TurnTracer):
+            handler.add_webhook_span(manager.parent_run_id, url, start, end, status,
+                                     request_bytes, response_bytes, error)
+            return
+
+
+def summarize_spans(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate the spans of a turn: duration, model calls and tokens, tool and webhook calls."""
+    summary = {
+        "duration_ms": 0.0,
+        "model_calls": 0,
+        "prompt_tokens": 0,
+        "cached_prompt_tokens": 0,
+        "completion_tokens": 0,
+        "model_ms": 0.0,
+        "tool_calls": 0,
+        "tool_ms": 0.0,
+        "webhook_calls": 0,
+        "webhook_errors": 0,
+        "webhook_ms": 0.0,
+        "errors": 0
+    }
+    for span in spans:
+        duration = (span["end"] - span["start"]) / 1e6
+        kind = span["kind"]
+        summary["errors"] += int(span["error"] is not None and kind != "webhook")
+        if kind == "turn":
+            summary["duration_ms"] = duration
+        elif kind == "llm":
+            summary["model_calls"] += 1
+            summary["model_ms"] += duration
+            summary["prompt_tokens"] += span["attributes"].get("prompt_tokens", 0)
+            summary["cached_prompt_tokens"] += span["attributes"].get("cached_prompt_tokens", 0)
+            summary["completion_tokens"] += span["attributes"].get("completion_tokens", 0)
+        elif kind == "tool":
+            summary["tool_calls"] += 1
+            summary["tool_ms"] += duration
+        elif kind == "webhook":
+            summary["webhook_calls"] += 1
+            summary["webhook_ms"] += duration
+            summary["webhook_errors"] += int(span["error"] is not None)
+    return summary
+
+
+class SessionStats:
+    """Per-conversation totals of the traced turns, for the most recent conversations."""
+
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, thread_id: str, turn: Dict[str, Any]):
+        with self._lock:
+            session = self._sessions.setdefault(thread_id, {"turns": 0})
+            session["turns"] += 1
+            for key, value in turn.items():
+                session[key] = session.get(key, 0) + value
+            session["last_turn_ms"] = turn["duration_ms"]
+            self._sessions.move_to_end(thread_id)
+            while len(self._sessions) > self.maxsize:
+                self._sessions.popitem(last=False)
+
+    def get(self, thread_id: str) -> Dict[str, Any]:
+        with self._lock:
+            session = dict(self._sessions.get(thread_id, {}))
+        if session:
+            session["avg_turn_ms"] = session["duration_ms"] / session["turns"]
+            session = {key: round(value, 1) if isinstance(value, float) else value for key, value in session.items()}
+        return session
+
+
+session_stats = SessionStats()
+
+
+class PromptCacheMetrics:
+    """Prompt tokens per model call and how many of them the provider read from its prefix cache, per agent."""
+
+    def __init__(self):
+        self._agents: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, agent: str, prompt_tokens: int, cached_tokens: int):
+        with self._lock:
+            totals = self._agents.setdefault(agent, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "hits": 0})
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["cached_tokens"] += cached_tokens
+            totals["hits"] += int(cached_tokens > 0)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                agent: {
+                    **totals,
+                    "uncached_tokens": totals["prompt_tokens"] - totals["cached_tokens"],
+                    "cached_share": round(totals["cached_tokens"] / totals["prompt_tokens"], 3) if totals["prompt_tokens"] else 0.0
+                }
+                for agent, totals in self._agents.items()
+            }
+
+
+prompt_cache_metrics = PromptCacheMetrics()
+
+
+def get_prompt_cache_metrics() -> Dict[str, Dict[str, Any]]:
+    """Return the cached and uncached prompt tokens of the traced model calls, per supervisor or subagent."""
+    return prompt_cache_metrics.snapshot()
+
+
+def get_session_summary(thread_id: str) -> Dict[str, Any]:
+    """Return the aggregated timing and token counts of a conversation, empty if it was not traced."""
+    return session_stats.get(thread_id)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(tracer: TurnTracer) -> Dict[str, Any]:
+    """Convert the spans of a turn to the OTLP/JSON trace format of OpenTelemetry."""
+    spans = []
+    for span in tracer.spans:
+        attributes = {"agent.thread_id": tracer.thread_id, "agent.span_kind": span["kind"], **span["attributes"]}
+        otlp_span = {
+            "traceId": tracer.trace_id,
+            "spanId": span["span_id"],
+            "name": span["name"],
+            # SPAN_KIND_CLIENT for webhook requests, SPAN_KIND_INTERNAL otherwise
+            "kind": 3 if span["kind"] == "webhook" else 1,
+            "startTimeUnixNano": str(span["start"]),
+            "endTimeUnixNano": str(span["end"]),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in attributes.items() if value is not None
+            ],
+            "status": {"code": 2, "message": span["error"]} if span["error"] else {"code": 1}
+        }
+        if span["parent_span_id"]:
+            otlp_span["parentSpanId"] = span["parent_span_id"]
+        spans.append(otlp_span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}]
+        }]
+    }
+
+
+def _post_otlp(endpoint: str, body: Dict[str, Any]):
+    import httpx
+    try:
+        httpx.post(endpoint, json=body, timeout=5).raise_for_status()
+    except httpx.HTTPError as e:
+        logger.warning("Could not export trace to %s: %s", endpoint, e)
+
+
+def export_spans(tracer: TurnTracer):
+    """
+    Export the spans of a finished turn.
+
+    AGENT_TRACE_FILE appends one OTLP/JSON document per turn to a local file (JSON lines), and
+    AGENT_TRACE_ENDPOINT posts it to an OpenTelemetry collector (e.g. http://localhost:4318/v1/traces)
+    in the background. Without either variable the spans only feed the session summary.
+    """
+    path = os.getenv("AGENT_TRACE_FILE")
+    endpoint = os.getenv("AGENT_TRACE_ENDPOINT")
+    if not path and not endpoint:
+        return
+    body = to_otlp(tracer)
+    if path:
+        with _file_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(body, ensure_ascii=False) + "\n")
+    if endpoint:
+        threading.Thread(target=_post_otlp, args=(endpoint, body), daemon=True).start()
+
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+from collections import deque
+from typing import Iterable, List, NamedTuple, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+
+class TranscriptEntry(NamedTuple):
+    """One message shown in the chat: "user" or "assistant" and its text."""
+    role: str
+    content: str
+
+
+def entries_from_messages(messages: Iterable[BaseMessage]) -> List[TranscriptEntry]:
+    """Keep the user messages and the supervisor answers of a conversation, as transcript entries."""
+    entries = []
+    for message in messages:
+        if isinstance(message, HumanMessage) and message.content:
+            entries.append(TranscriptEntry("user", str(message.content)))
+        elif isinstance(message, AIMessage) and message.content and message.name == "supervisor":
+            entries.append(TranscriptEntry("assistant", str(message.content)))
+    return entries
+
+
+class Transcript:
+    """
+    Display-only transcript of one chat session, kept apart from the graph state.
+
+    Only the text of the user messages and answers is stored, never tool results or handoffs.
+    At most `max_entries` are kept in memory; older entries are appended to a JSONL file under
+    `spill_dir` and read back only when the user asks for them, or dropped without a spill_dir.
+    """
+
+    def __init__(self, session_id: str, max_entries: Optional[int] = None, spill_dir: Optional[str] = None):
+        """
+        Initialize the transcript.
+
+        Args:
+            session_id: Conversation id, names the spill file
+            max_entries: Entries kept in memory (env CHAT_TRANSCRIPT_MAX, default 200)
+            spill_dir: Directory for older entries (env CHAT_TRANSCRIPT_DIR, default none: dropped)
+        """
+        if max_entries is None:
+            max_entries = int(os.getenv("CHAT_TRANSCRIPT_MAX", "200"))
+        spill_dir = spill_dir if spill_dir is not None else os.getenv("CHAT_TRANSCRIPT_DIR")
+        self.max_entries = max(1, max_entries)
+        self.spill_path = os.path.join(spill_dir, f"{session_id}.jsonl") if spill_dir else None
+        self._entries: "deque[TranscriptEntry]" = deque()
+        self._spilled = 0
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def append(self, role: str, content: str):
+        """Add a message to the transcript, spilling the oldest entries past the cap."""
+        with self._lock:
+            self._entries.append(TranscriptEntry(role, content))
+            overflow = [self._entries.popleft() for _ in range(len(self._entries) - self.max_entries)]
+            if not overflow:
+                return
+            if self.spill_path is None:
+                self._dropped += len(overflow)
+                return
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for entry in overflow:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._spilled += len(overflow)
+
+    def __len__(self) -> int:
+        """Number of entries that can be shown, in memory and spilled."""
+        with self._lock:
+            return len(self._entries) + self._spilled
+
+    @property
+    def dropped(self) -> int:
+        """Number of old entries that were discarded for lack of a spill directory."""
+        return self._dropped
+
+    def last(self, count: int) -> List[TranscriptEntry]:
+        """
+        Return the most recent entries, oldest first.
+
+        Args:
+            count: Number of entries, spilled entries are read from disk only if needed
+
+        Returns:
+            Up to `count` entries
+        """
+        with self._lock:
+            entries = list(self._entries)[-count:] if count > 0 else []
+            missing = min(count - len(entries), self._spilled)
+            if missing <= 0:
+                return entries
+            with open(self.spill_path, encoding="utf-8") as f:
+                spilled = deque(f, maxlen=missing)
+        return [TranscriptEntry(*json.loads(line)) for line in spilled] + entries
+
+    def clear(self):
+        """Forget every entry and delete the spill file."""
+        with self._lock:
+            self._entries.clear()
+            self._spilled = 0
+            self._dropped = 0
+            if self.spill_path is not None and os.path.exists(self.spill_path):
+                os.remove(self.spill_path)
@@ -0,0 +1,487 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional, Union
+from urllib.parse import urlsplit
+
+import httpx
+
+from ratelimit import get_rate_limiter
+from tracing import record_webhook
+
+
+def _http2_available() -> bool:
+    """Check whether the optional `h2` package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class WebhookTransport:
+    """
+    Shared HTTP transport for the Make.com webhooks.
+
+    Keeps one keep-alive connection pool per host (httpx pools connections by origin),
+    negotiates HTTP/2 when the server and the `h2` package allow it, and records per-host
+    metrics on how many requests reused an already open connection.
+    """
+
+    def __init__(self, pool_size=None, keepalive=None, keepalive_expiry=None, http2=None):
+        """
+        Initialize the transport.
+
+        Args:
+            pool_size: Maximum number of open connections (env WEBHOOK_POOL_SIZE, default 20)
+            keepalive: Maximum number of idle keep-alive connections (env WEBHOOK_KEEPALIVE, default pool_size)
+            keepalive_expiry: Seconds an idle connection is kept open (env WEBHOOK_KEEPALIVE_EXPIRY, default 30)
+            http2: Enable HTTP/2 when available (env WEBHOOK_HTTP2, default on)
+        """
+        if pool_size is None:
+            pool_size = int(os.getenv("WEBHOOK_POOL_SIZE", "20"))
+        if keepalive is None:
+            keepalive = int(os.getenv("WEBHOOK_KEEPALIVE", str(pool_size)))
+        if keepalive_expiry is None:
+            keepalive_expiry = float(os.getenv("WEBHOOK_KEEPALIVE_EXPIRY", "30"))
+        if http2 is None:
+            http2 = os.getenv("WEBHOOK_HTTP2", "1").lower() not in ("0", "false", "no")
+
+        self.limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2 and _http2_available()
+        self.client = httpx.Client(
+            limits=self.limits,
+            http2=self.http2,
+            headers={"Content-Type": "application/json"}
+        )
+        self._async_clients = weakref.WeakKeyDictionary()
+        # Requests in flight on the async pool of each event loop
+        self._in_flight = weakref.WeakKeyDictionary()
+        self._metrics: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _host_metrics(self, host: str) -> Dict[str, int]:
+        return self._metrics.setdefault(host, {
+            "requests": 0,
+            "new_connections": 0,
+            "reused_connections": 0,
+            "http2_requests": 0,
+            "errors": 0
+        })
+
+    def _record(self, host: str, opened_connection: bool, http_version: Optional[str], failed: bool):
+        with self._lock:
+            metrics = self._host_metrics(host)
+            metrics["requests"] += 1
+            if opened_connection:
+                metrics["new_connections"] += 1
+            elif not failed:
+                metrics["reused_connections"] += 1
+            if http_version == "HTTP/2":
+                metrics["http2_requests"] += 1
+            if failed:
+                metrics["errors"] += 1
+
+    @staticmethod
+    def _trace(url: str, start: int, response: Optional[httpx.Response] = None,
+               error: Optional[httpx.HTTPError] = None):
+        # Webhook span of the tool run that made the request, when the turn is traced
+        try:
+            request = response.request if response is not None else error.request
+        except RuntimeError:
+            # Errors raised before the request was built carry no request
+            request = None
+        record_webhook(
+            url, start, time.time_ns(),
+            status=response.status_code if response is not None else None,
+            request_bytes=len(request.content) if request is not None else 0,
+            response_bytes=len(response.content) if response is not None else 0,
+            error=(str(error) or type(error).__name__) if error is not None
+            else None if response.is_success else f"HTTP {response.status_code}"
+        )
+
+    def post(self, url: str, json: Optional[Dict[str, Any]] = None,
+             timeout: Union[float, httpx.Timeout] = 10) -> httpx.Response:
+        """
+        Send a POST request through the shared connection pool.
+
+        Args:
+            url: Webhook URL
+            json: JSON body to send, if any
+            timeout: Request timeout in seconds, or an httpx.Timeout
+
+        Returns:
+            The httpx response
+
+        Raises:
+            httpx.HTTPError: If the request fails
+        """
+        host = urlsplit(url).netloc
+        opened = []
+
+        def trace(event_name, info):
+            if event_name == "connection.connect_tcp.started":
+                opened.append(True)
+
+        start = time.time_ns()
+        try:
+            response = self.client.post(url, json=json, timeout=timeout, extensions={"trace": trace})
+        except httpx.HTTPError as e:
+            self._record(host, bool(opened), None, failed=True)
+            self._trace(url, start, error=e)
+            raise
+        self._record(host, bool(opened), response.http_version, failed=False)
+        self._trace(url, start, response)
+        return response
+
+    def _async_client(self, loop: asyncio.AbstractEventLoop) -> httpx.AsyncClient:
+        # Async connections are bound to the event loop that opened them, so each loop
+        # gets its own pool with the same limits. The caller holds a request in flight
+        # until it calls _release.
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(
+                    limits=self.limits,
+                    http2=self.http2,
+                    headers={"Content-Type": "application/json"}
+                )
+                self._async_clients[loop] = client
+            self._in_flight[loop] = self._in_flight.get(loop, 0) + 1
+            return client
+
+    def _release(self, loop: asyncio.AbstractEventLoop):
+        with self._lock:
+            self._in_flight[loop] -= 1
+
+    async def apost(self, url: str, json: Optional[Dict[str, Any]] = None,
+                    timeout: Union[float, httpx.Timeout] = 10) -> httpx.Response:
+        """
+        Async version of post, using the connection pool of the running event loop.
+
+        Args:
+            url: Webhook URL
+            json: JSON body to send, if any
+            timeout: Request timeout in seconds, or an httpx.Timeout
+
+        Returns:
+            The httpx response
+
+        Raises:
+            httpx.HTTPError: If the request fails
+        """
+        host = urlsplit(url).netloc
+        opened = []
+
+        async def trace(event_name, info):
+            if event_name == "connection.connect_tcp.started":
+                opened.append(True)
+
+        loop = asyncio.get_running_loop()
+        start = time.time_ns()
+        try:
+            response = await self._async_client(loop).post(url, json=json, timeout=timeout, extensions={"trace": trace})
+        except httpx.HTTPError as e:
+            self._record(host, bool(opened), None, failed=True)
+            self._trace(url, start, error=e)
+            raise
+        finally:
+            self._release(loop)
+        self._record(host, bool(opened), response.http_version, failed=False)
+        self._trace(url, start, response)
+        return response
+
+    def metrics(self) -> Dict[str, Dict[str, int]]:
+        """Return a snapshot of the per-host connection metrics."""
+        with self._lock:
+            return {host: dict(values) for host, values in self._metrics.items()}
+
+    def close(self):
+        """Close the pooled connections of the sync client."""
+        self.client.close()
+
+    async def aclose(self, idle_only: bool = False):
+        """
+        Close the async connection pool of the running event loop.
+
+        Call it before the loop stops, otherwise its connections are never closed. The next
+        request of the loop opens a new pool.
+
+        Args:
+            idle_only: Keep the pool if a request of this loop is in flight, e.g. when one
+                conversation of a loop that serves many ends
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if idle_only and self._in_flight.get(loop, 0):
+                return
+            client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> WebhookTransport:
+    """Return the process-wide webhook transport, creating it on first use."""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = WebhookTransport()
+    return _transport
+
+
+async def aclose_transport(idle_only: bool = False):
+    """Close the async webhook connections of the running event loop, if the transport was used. See WebhookTransport.aclose."""
+    if _transport is not None:
+        await _transport.aclose(idle_only)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one webhook.
+
+    After `threshold` consecutive failures the circuit opens and calls fail immediately
+    instead of waiting on a scenario that is down. After `reset_timeout` seconds one trial
+    call is let through (half-open): if it succeeds the circuit closes again, otherwise it
+    stays open for another period.
+    """
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30):
+        """
+        Initialize the breaker.
+
+        Args:
+            threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial call
+        """
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Tell whether a call may go through, counting it as rejected otherwise."""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """Give back a call allowed but not made, so that a half-open breaker lets the next one try."""
+        with self._lock:
+            if self.state == "half_open":
+                self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.times_opened,
+                "rejected_calls": self.rejected
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    """
+    Return the circuit breaker of a webhook URL.
+
+    Breakers are configured with WEBHOOK_BREAKER_THRESHOLD (default 5 failures) and
+    WEBHOOK_BREAKER_RESET (default 30 seconds).
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(url)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                threshold=int(os.getenv("WEBHOOK_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("WEBHOOK_BREAKER_RESET", "30"))
+            )
+            _breakers[url] = breaker
+        return breaker
+
+
+def _parse_response(response: httpx.Response) -> Any:
+    response.raise_for_status()
+
+    # Try to parse as JSON, if it fails return the text response
+    try:
+        return response.json()
+    except ValueError:
+        # If response is not JSON, return it as text
+        return response.text
+
+
+def _is_server_failure(error: httpx.HTTPError) -> bool:
+    # Connection errors, timeouts, 5xx and rate limiting mean the hook is unhealthy;
+    # other 4xx responses are answers to a bad request
+    return isinstance(error, httpx.TransportError) or (
+        isinstance(error, httpx.HTTPStatusError)
+        and (error.response.status_code >= 500 or error.response.status_code == 429)
+    )
+
+
+def _timeout(timeout: float, connect_timeout: Optional[float]) -> httpx.Timeout:
+    return httpx.Timeout(timeout, connect=connect_timeout if connect_timeout is not None else timeout)
+
+
+def _backoff_delay(backoff: float, attempt: int) -> float:
+    # Full jitter, so that retries of many sessions do not hit the hook at the same time
+    return random.uniform(0, backoff * (2 ** attempt))
+
+
+def _circuit_open() -> Dict[str, Any]:
+    return {
+        "error": "The webhook is temporarily unavailable, try again later",
+        "status": "failed"
+    }
+
+
+def _rate_limited() -> Dict[str, Any]:
+    return {
+        "error": "Too many requests to the webhook right now, try again in a moment",
+        "status": "failed"
+    }
+
+
+def post_webhook(url: str, payload: Optional[Dict[str, Any]] = None, timeout: float = 10,
+                 retries: int = 0, backoff: float = 0.5, connect_timeout: Optional[float] = None) -> Any:
+    """
+    Post a payload to a Make.com webhook using the shared transport.
+
+    Calls go through the webhook's circuit breaker, so a scenario that keeps failing is
+    answered immediately with an error instead of blocking the turn, and wait for the rate
+    limit of the webhook's host, if one is configured (see ratelimit.get_rate_limiter).
+
+    Args:
+        url: Webhook URL
+        payload: JSON payload, or None to send an empty request
+        timeout: Read timeout in seconds
+        retries: Number of extra attempts on connection errors, timeouts, 5xx and 429 responses.
+                 Only pass retries for idempotent calls.
+        backoff: Upper bound in seconds of the first retry delay, doubled on every attempt
+        connect_timeout: Connect timeout in seconds, defaults to the read timeout
+
+    Returns:
+        The parsed JSON response, the response text if it is not JSON,
+        or a dictionary with "error" and "status": "failed" if the request fails
+    """
+    breaker = get_breaker(url)
+    limiter = get_rate_limiter()
+    attempt = 0
+    while True:
+        # The breaker goes first, so a call it rejects does not take a token of the rate limit
+        if not breaker.allow():
+            return _circuit_open()
+        if not limiter.acquire_webhook(url):
+            breaker.release()
+            return _rate_limited()
+        try:
+            result = _parse_response(get_transport().post(url, json=payload, timeout=_timeout(timeout, connect_timeout)))
+        except httpx.HTTPError as e:
+            server_failure = _is_server_failure(e)
+            if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+                limiter.throttled(url, e.response)
+            if server_failure:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if not server_failure or attempt >= retries:
+                return {
+                    "error": str(e),
+                    "status": "failed"
+                }
+            time.sleep(_backoff_delay(backoff, attempt))
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+
+async def apost_webhook(url: str, payload: Optional[Dict[str, Any]] = None, timeout: float = 10,
+                        retries: int = 0, backoff: float = 0.5, connect_timeout: Optional[float] = None) -> Any:
+    """Async version of post_webhook, it never blocks the event loop."""
+    breaker = get_breaker(url)
+    limiter = get_rate_limiter()
+    attempt = 0
+    while True:
+        # The breaker goes first, so a call it rejects does not take a token of the rate limit
+        if not breaker.allow():
+            return _circuit_open()
+        if not await limiter.aacquire_webhook(url):
+            breaker.release()
+            return _rate_limited()
+        try:
+            result = _parse_response(await get_transport().apost(url, json=payload, timeout=_timeout(timeout, connect_timeout)))
+        except httpx.HTTPError as e:
+            server_failure = _is_server_failure(e)
+            if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+                limiter.throttled(url, e.response)
+            if server_failure:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if not server_failure or attempt >= retries:
+                return {
+                    "error": str(e),
+                    "status": "failed"
+                }
+            await asyncio.sleep(_backoff_delay(backoff, attempt))
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+
+def get_webhook_metrics() -> Dict[str, Dict[str, int]]:
+    """Return the per-host connection reuse metrics of the shared transport."""
+    return get_transport().metrics()
+
+
+def get_breaker_metrics() -> Dict[str, Dict[str, Any]]:
+    """Return the state of the circuit breaker of every webhook called so far, keyed by URL path."""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {urlsplit(url).path: breaker.metrics() for url, breaker in breakers.items()}